@@ -1,3 +1,6 @@
+import time
+# Taken before the other imports, for --profile-startup.
+startup_started = time.perf_counter()
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
@@ -7,14 +10,51 @@ import sys
 import json
 import datetime
 import re
+import itertools
+import subprocess
+import cProfile
+import tempfile
+import shutil
+from highlighter import Highlighter
+from gutter import LineNumbers, Minimap
+from text_hooks import EditHooks
+from document import Document
+from large_file import LineIndex, LargeFileView, resident_memory
+import file_io
+from file_tree import LazyFileTree
+import fs_watcher
+import find_in_files
+import trigram_index
+import replace_all
+import autosave
+import tab_memory
+from table import ColumnStore, TableView
+from runner import ProcessRunner, WorkerPool
+from completion import CompletionEngine, BufferWords
+from pryzma_parser import BlockTree, is_folded, toggle_fold, unfold_line
+import syntax_rules
+from startup_profile import StartupProfile
+from instrumentation import Instruments, PaintLatency, LoopLag
 
 
 class TextEditor:
-    def __init__(self, master):
+    def __init__(self, master, startup=None):
         self.master = master
+        self.startup = startup or StartupProfile(time.perf_counter())
+        self.instruments = Instruments()
+        self.instruments.wrap(self, ["handle_key_release", "highlight_words", "update_suggestions", "show_suggestions", "update_status_bar",
+                                     "load_file", "file_loaded", "save_file", "write_file", "file_written"])
+        self.paint_latency = PaintLatency(self.instruments)
+        self.loop_lag = LoopLag(self.instruments, self.master)
+        self.loop_lag.start()
+        self.perf_panel = None
+        self.perf_job = None
+        self.profiler = None
         self.create_status_bar()
         self.master.title("IC Text Editor")
+        self.master.protocol("WM_DELETE_WINDOW", self.exit)
         self.notebook = ttk.Notebook(self.master)
+        self.notebook.bind("<<NotebookTabChanged>>", self.tab_changed)
         self.master.bind('<Control-Shift-N>', lambda event: self.create_tab())
         self.master.bind('<Control-Shift-C>', lambda event: self.close_tab())
         self.master.bind('<Control-Shift-S>', lambda event: self.save_file())
@@ -25,38 +65,134 @@ class TextEditor:
         self.master.bind('<Alt_L>', lambda event: self.auto_complete())
         self.master.bind('<Control-Shift-L>', lambda event: self.edit_all_occurrences())
         self.master.bind('<Control-Shift-R>', lambda event: self.run())
+        self.master.bind('<Control-Shift-P>', lambda event: self.quick_open())
+        self.master.bind('<Control-Shift-K>', lambda event: self.toggle_fold_at_cursor())
         self.text_areas = []
+        self.edit_hooks = []
+        self.documents = []
+        self.highlighters = []
+        self.line_numbers = []
+        self.minimaps = []
+        self.block_trees = []
+        self.outline_items = {}
+        self.outline_shown = None
+        self.outline_job = None
+        self.tab_journals = []
+        self.large_file_views = {}
+        self.io_worker = file_io.IOWorker(self.master)
+        self.search_worker = file_io.IOWorker(self.master)
+        self.search_panel = None
+        self.folder_search = None
+        self.trigram_index = None
+        self.index_worker = file_io.IOWorker(self.master)
+        self.max_search_results = 10000
         self.tab = 0
         self.app_dir = os.path.dirname(sys.argv[0])
         self.highlight_rules = {}
+        self.compiled_rules = {}
+        self.completion = CompletionEngine()
+        self.buffer_words = []
+        self.completion_delay = 120
+        self.completion_job = None
         self.highlighting = tk.IntVar(value=1)
+        self.show_line_numbers = tk.IntVar(value=1)
+        self.show_minimap = tk.IntVar(value=1)
         self.syntax_files = []
+        self.large_file_threshold = 50 * 1024 * 1024
+        self.tree_ignore = [".git", "node_modules", "__pycache__"]
+        self.watch_interval = 1000
+        self.python_executable = sys.executable or "python"
+        self.output_max_lines = 10000
+        self.output_panel = None
+        self.process_runner = None
+        self.output_job = None
+        self.warm_workers = 0
+        self.worker_max_runs = 20
+        self.worker_pool = None
+        self.run_times = {False: None, True: None}
+        self.pryzma_interpreter_path = None
+        self.autosave_interval = 500
+        self.autosave_job = None
+        self.restore_session = True
+        self.session_directory = None
+        self.hibernated_tabs = {}
+        self.table_views = {}
+        self.file_formats = {}
+        self.hex_previews = set()
+        self.tab_used = {}
+        self.buffer_sizes = {}
+        self.use_clock = 0
+        self.tab_memory_budget = 256 * 1024 * 1024
+        self.spill_directory = None
+        self.spill_count = itertools.count()
         self.load_config(self.app_dir + "./config.json")
+        self.startup.mark("config")
+        self.use_warm_workers = tk.IntVar(value=1 if self.warm_workers > 0 else 0)
+        self.toggle_warm_workers()
+        self.session = autosave.Session(self.session_directory)
+        self.last_view = None
         self.create_tab()
         self.tab = self.notebook.index("current")
         self.init_menu()
 
         self.suggestions_popup = None
         self.suggestions_listbox = None
+        self.shown_suggestions = []
         self.last_word = None
 
-        self.current_text = self.text_areas[self.tab].get("1.0", tk.END).split()
+        self.current_text = list(self.documents[self.tab].words())
         self.current_word = ""
         self.suggestions = [word for word in self.highlight_rules.keys() if word.startswith(self.current_word)]
         self.create_file_tree()
         self.notebook.pack(side=tk.RIGHT, expand=tk.YES, fill=tk.BOTH)
+        self.startup.mark("ui")
+        # Syntax files, the file tree and the last session load once the
+        # window is on screen.
+        self.painted = False
+        self.master.bind("<Expose>", self.first_paint)
+        self.master.after(1000, self.first_paint)
+        self.memory_job = self.master.after(2000, self.poll_buffer_memory)
 
 
     def create_status_bar(self):
-        self.status_bar = tk.Frame(root, bd=1, relief=tk.SUNKEN)
+        self.status_bar = tk.Frame(self.master, bd=1, relief=tk.SUNKEN)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.status_label = tk.Label(self.status_bar, text="Line: 1, Column: 0")
         self.status_label.pack(side=tk.RIGHT)
 
+        self.memory_label = tk.Label(self.status_bar, text="")
+        self.memory_label.pack(side=tk.RIGHT)
+
+        self.info_label = tk.Label(self.status_bar, text="")
+        self.info_label.pack(side=tk.LEFT)
+
+        self.progress_bar = ttk.Progressbar(self.status_bar, length=120, maximum=1.0)
+
+    def set_status(self, text):
+        self.info_label.config(text=text)
+
+    def show_progress(self, text):
+        self.set_status(text)
+        self.progress_bar.config(value=0)
+        self.progress_bar.pack(side=tk.LEFT, padx=4)
+
+    def update_progress(self, fraction):
+        self.progress_bar.config(value=fraction)
+
+    def hide_progress(self):
+        self.progress_bar.pack_forget()
+
+    def io_failed(self, message):
+        self.hide_progress()
+        self.set_status("")
+        messagebox.showerror("Error", message)
+
     def update_status_bar(self, event=None):
         text_widget = self.text_areas[self.tab]
         line, column = map(int, text_widget.index(tk.INSERT).split('.'))
+        if text_widget in self.large_file_views:
+            line += self.large_file_views[text_widget].first - 1
         self.status_label.config(text=f"Line: {line}, Column: {column}")
 
 
@@ -71,43 +207,100 @@ class TextEditor:
                                                          "Do you want to replace all occurrences or only exact matches?\n"
                                                          "Click 'Yes' for All, 'No' for Exact Matches.")
                 
-                content = text_widget.get("1.0", tk.END)
+                document = self.documents[self.tab]
                 
                 if replace_method == 'yes':
-                    updated_content = content.replace(selected_text, new_text)
+                    pattern = re.compile(re.escape(selected_text))
                 else:
-                    pattern = r'\b' + re.escape(selected_text) + r'\b'
-                    updated_content = re.sub(pattern, new_text, content)
+                    pattern = re.compile(r'\b' + re.escape(selected_text) + r'\b')
                 
-                text_widget.delete("1.0", tk.END)
-                text_widget.insert("1.0", updated_content)
+                matches = list(document.finditer(pattern))
+                if not matches:
+                    messagebox.showinfo("Edit All Occurrences", f"No occurrences of '{selected_text}' found.")
+                    return
+                if not messagebox.askyesno("Edit All Occurrences", f"Replace {len(matches)} occurrences of '{selected_text}'?"):
+                    return
+                self.replace_matches(text_widget, document, matches, new_text)
         else:
             messagebox.showwarning("Warning", "Please select a word to edit all occurrences.")
 
 
 
-    
+    def replace_matches(self, text_widget, document, matches, new_text):
+        # Edits go in from the end so earlier offsets stay valid, and the
+        # whole replace-all is one undo step.
+        edits = replace_all.buffer_edits(document, matches, new_text)
+        indices = [(document.position(start), document.position(end), text) for start, end, text in edits]
+        top = text_widget.yview()[0]
+        hooks = self.edit_hooks[self.text_areas.index(text_widget)]
+        hooks.undo.begin_group()
+        try:
+            for (start_line, start_column), (end_line, end_column), text in reversed(indices):
+                text_widget.replace(f"{start_line}.{start_column}", f"{end_line}.{end_column}", text)
+        finally:
+            hooks.undo.end_group()
+        text_widget.yview_moveto(top)
+        self.set_status(f"Replaced {len(matches)} occurrences")
+
+    def replace_in_files(self):
+        selection = self.file_tree.selection()
+        paths = [self.file_tree.item(item, "values")[0] for item in selection] or [self.lazy_tree.root_path]
+        query = simpledialog.askstring("Replace in Files", "Find:")
+        if not query:
+            return
+        new_text = simpledialog.askstring("Replace in Files", f"Replace '{query}' with:")
+        if new_text is None:
+            return
+        whole_word = messagebox.askquestion("Choose Replacement Method",
+                                            "Do you want to replace all occurrences or only exact matches?\n"
+                                            "Click 'Yes' for All, 'No' for Exact Matches.") == 'no'
+        replace = replace_all.FileReplace(paths, query, new_text, whole_word, self.tree_ignore, self.modified_paths())
+        self.set_status("Counting occurrences...")
+        self.search_worker.submit(replace.preview,
+                                  lambda count: self.confirm_file_replace(replace, count),
+                                  lambda e: self.io_failed(f"Replace failed: {str(e)}"))
+
+    def modified_paths(self):
+        return {os.path.abspath(self.notebook.tab(tab, option="text")) for tab in range(len(self.text_areas)) if self.tab_journals[tab].modified}
+
+    def confirm_file_replace(self, replace, count):
+        # A tab may have been edited while the files were counted.
+        replace.skip(self.modified_paths(), "open with unsaved changes")
+        count = sum(replace.counts.values())
+        skipped = "".join(f"\n{path}: {reason}" for path, reason in list(replace.skipped.items())[:10])
+        if len(replace.skipped) > 10:
+            skipped += f"\n... and {len(replace.skipped) - 10} more"
+        if skipped:
+            skipped = f"\n\nSkipped {len(replace.skipped)} files:{skipped}"
+        if not count:
+            if skipped:
+                messagebox.showinfo("Replace in Files", f"No occurrences to replace.{skipped}")
+            self.set_status("No occurrences found")
+            return
+        if not messagebox.askyesno("Replace in Files", f"Replace {count} occurrences in {len(replace.counts)} files?{skipped}"):
+            self.set_status("Replace cancelled")
+            return
+        self.show_progress(f"Replacing in {len(replace.counts)} files...")
+        self.search_worker.submit(replace.run,
+                                  lambda replaced: self.files_replaced(replace),
+                                  lambda e: self.io_failed(f"Replace failed: {str(e)}"),
+                                  self.update_progress)
+
+    def files_replaced(self, replace):
+        self.hide_progress()
+        skipped = f", skipped {len(replace.skipped)} files" if replace.skipped else ""
+        self.set_status(f"Replaced {replace.replaced} occurrences in {len(replace.counts)} files{skipped}")
+
     def open_folder(self):
         folder_path = filedialog.askdirectory()
         if folder_path:
             self.repopulate_tree(folder_path)
+            self.index_folder(self.lazy_tree.root_path)
 
     def repopulate_tree(self, path):
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
-        self.insert_node('', path)
-
-    def insert_node(self, parent, path):
-        folder_name = os.path.basename(path)
-        full_path = path
-        node = self.file_tree.insert(parent, 'end', text=folder_name, open=True, values=(full_path,))
-
         try:
-            for entry in os.listdir(path):
-                full_path = os.path.join(path, entry)
-                if os.path.isdir(full_path):
-                    self.insert_node(node, full_path)
-        except Exception as e:
+            self.lazy_tree.set_root(os.path.abspath(path))
+        except OSError:
             messagebox.showerror("Error", f"Error accessing directory {path}")
 
 
@@ -118,17 +311,73 @@ class TextEditor:
             self.open_file_from_tree(full_path)
 
     def open_file_from_tree(self, file_path):
-        with open(file_path, "r") as file:
-            content = file.read()
-            self.create_tab()
-            self.text_areas[len(self.text_areas)-1].delete("1.0", tk.END)
-            self.text_areas[len(self.text_areas)-1].insert("1.0", content)
-            self.notebook.tab(len(self.text_areas)-1, text=file_path)
-            self.highlight_words(event=None)
+        self.load_file(file_path)
 
 
     def refresh_file_tree(self):
-        self.populate_tree()
+        self.report_watch = True
+        self.poll_file_system()
+
+    def poll_file_system(self):
+        if self.watch_job is not None:
+            self.master.after_cancel(self.watch_job)
+            self.watch_job = None
+        if self.watch_polling:
+            return
+        self.watch_polling = True
+        directories, files = self.watcher.prepare(self.lazy_tree.watched_directories())
+        self.watch_worker.submit(lambda progress: fs_watcher.poll(directories, files, self.watcher.ignore),
+                                 self.file_system_polled,
+                                 self.file_system_poll_failed)
+
+    def file_system_polled(self, result):
+        self.watch_polling = False
+        tree_changes, changed_files = self.watcher.apply(result)
+        for path, entries, renamed in tree_changes:
+            self.lazy_tree.update_directory(path, entries, renamed)
+        for path, stamp in changed_files:
+            self.file_changed_on_disk(path, stamp)
+        if self.report_watch:
+            self.report_watch = False
+            self.set_status(f"File tree up to date: {self.watcher.last_watched} directories and files watched, poll took {self.watcher.last_duration * 1000:.1f} ms")
+        self.watch_job = self.master.after(self.watch_interval, self.poll_file_system)
+
+    def file_system_poll_failed(self, error):
+        self.watch_polling = False
+        self.watch_job = self.master.after(self.watch_interval, self.poll_file_system)
+
+    def file_changed_on_disk(self, path, stamp):
+        for text_widget in self.text_areas:
+            if self.notebook.tab(text_widget, option="text") != path or text_widget in self.large_file_views or text_widget in self.hibernated_tabs:
+                continue
+            modified = self.tab_journals[self.text_areas.index(text_widget)].modified
+            if stamp is None:
+                self.set_status(f"File deleted on disk: {path}")
+            elif modified and not messagebox.askyesno("File changed", f"{path} was changed on disk, and this tab has unsaved changes.\n"
+                                                                      "Reload it and discard your changes?", icon=messagebox.WARNING):
+                self.set_status(f"Kept your changes to {path}; saving will overwrite the version on disk")
+            elif modified or messagebox.askyesno("File changed", f"{path} was changed on disk. Reload it?"):
+                self.io_worker.submit(lambda progress: file_io.read_document(path, progress),
+                                      lambda result, text_widget=text_widget: self.file_reloaded(text_widget, path, result),
+                                      lambda e: self.io_failed(f"Failed to reload file: {str(e)}"))
+
+    def file_reloaded(self, text_widget, file_path, result):
+        if text_widget not in self.text_areas:
+            return
+        content, self.file_formats[text_widget] = result
+        cursor = text_widget.index(tk.INSERT)
+        top = text_widget.yview()[0]
+        journal = self.tab_journals[self.text_areas.index(text_widget)]
+        journal.recording = False
+        text_widget.delete("1.0", tk.END)
+        text_widget.insert("1.0", content)
+        journal.recording = True
+        journal.saved(file_path)
+        self.edit_hooks[self.text_areas.index(text_widget)].undo.clear()
+        text_widget.mark_set(tk.INSERT, cursor)
+        text_widget.yview_moveto(top)
+        self.watcher.watch_file(file_path)
+        self.set_status(f"File reloaded: {file_path}")
 
     def create_file_tree(self):
         self.tree_frame = ttk.Frame(self.master)
@@ -138,30 +387,25 @@ class TextEditor:
         self.file_tree.pack(expand=True, fill=tk.BOTH)
         
         self.file_tree.bind("<Double-1>", self.on_tree_double_click)
+        self.lazy_tree = LazyFileTree(self.file_tree, file_io.IOWorker(self.master), self.tree_ignore)
+
+        self.outline = ttk.Treeview(self.tree_frame, show="tree", height=12)
+        self.outline.pack(fill=tk.BOTH)
+        self.outline.bind("<Double-1>", self.on_outline_double_click)
         
-        self.populate_tree()
 
-    def populate_tree(self):
-        try:
-            path = "."
-            self.file_tree.delete(*self.file_tree.get_children())
-            abspath = os.path.abspath(path)
-            root_node = self.file_tree.insert('', 'end', text=abspath, open=True, values=(abspath,))
-            self.process_directory(root_node, abspath)
-        except Exception:
-            path = self.app_dir
-            self.file_tree.delete(*self.file_tree.get_children())
-            abspath = os.path.abspath(path)
-            root_node = self.file_tree.insert('', 'end', text=abspath, open=True, values=(abspath,))
-            self.process_directory(root_node, abspath)
-
-    def process_directory(self, parent, path):
-        for p in os.listdir(path):
-            abspath = os.path.join(path, p)
-            isdir = os.path.isdir(abspath)
-            oid = self.file_tree.insert(parent, 'end', text=p, open=False, values=(abspath,))
-            if isdir:
-                self.process_directory(oid, abspath)
+        self.watcher = fs_watcher.FileSystemWatcher(self.tree_ignore)
+        self.watch_worker = file_io.IOWorker(self.master)
+        self.watch_job = None
+        self.watch_polling = False
+        self.report_watch = False
+        self.watch_job = self.master.after(self.watch_interval, self.poll_file_system)
+
+    def populate_tree(self, on_loaded=None):
+        if os.access(".", os.R_OK | os.X_OK):
+            self.lazy_tree.set_root(os.path.abspath("."), on_loaded)
+        else:
+            self.lazy_tree.set_root(os.path.abspath(self.app_dir), on_loaded)
 
 
     def changeBg(self):
@@ -180,8 +424,13 @@ class TextEditor:
         search_query = simpledialog.askstring("Find", "Enter search query:")
 
         if search_query:
-            search_results = text_widget.search(search_query, "1.0", tk.END)
-            if search_results:
+            document = self.documents[self.tab]
+            pattern = re.compile(re.escape(search_query))
+            self.minimaps[self.tab].set_hits(document.match_lines(pattern))
+            match = next(document.finditer(pattern), None)
+            if match:
+                line, column = document.position(match[0])
+                search_results = f"{line}.{column}"
                 text_widget.tag_remove(tk.SEL, "1.0", tk.END)
                 text_widget.tag_add(tk.SEL, search_results, f"{search_results}+{len(search_query)}c")
                 text_widget.mark_set(tk.INSERT, search_results)
@@ -190,26 +439,190 @@ class TextEditor:
             else:
                 messagebox.showinfo("Info", f"'{search_query}' not found in text.")
 
+    def find_in_folder(self):
+        if self.search_panel is None:
+            self.create_search_panel()
+        self.search_entry.focus_set()
+
+    def create_search_panel(self):
+        self.search_panel = tk.Frame(self.master, bd=1, relief=tk.SUNKEN)
+        self.search_panel.pack(side=tk.BOTTOM, fill=tk.X, after=self.status_bar)
+
+        controls = tk.Frame(self.search_panel)
+        controls.pack(fill=tk.X)
+        self.search_query = tk.StringVar()
+        self.search_regex = tk.IntVar(value=0)
+        self.search_whole_word = tk.IntVar(value=0)
+        self.search_entry = tk.Entry(controls, textvariable=self.search_query)
+        self.search_entry.pack(side=tk.LEFT, expand=tk.YES, fill=tk.X)
+        self.search_entry.bind("<Return>", lambda event: self.start_folder_search())
+        tk.Checkbutton(controls, text="Regex", variable=self.search_regex).pack(side=tk.LEFT)
+        tk.Checkbutton(controls, text="Whole word", variable=self.search_whole_word).pack(side=tk.LEFT)
+        tk.Button(controls, text="Search", command=self.start_folder_search).pack(side=tk.LEFT)
+        tk.Button(controls, text="Cancel", command=self.cancel_folder_search).pack(side=tk.LEFT)
+        tk.Button(controls, text="Close", command=self.close_search_panel).pack(side=tk.LEFT)
+
+        self.search_results = tk.Listbox(self.search_panel, height=10)
+        self.search_results.pack(fill=tk.X)
+        self.search_results.bind("<Double-1>", self.open_search_result)
+        self.search_matches = []
+
+    def close_search_panel(self):
+        self.cancel_folder_search()
+        self.search_panel.destroy()
+        self.search_panel = None
+
+    def start_folder_search(self):
+        query = self.search_query.get()
+        if not query:
+            return
+        try:
+            pattern = find_in_files.compile_query(query, self.search_regex.get() == 1, self.search_whole_word.get() == 1)
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid regular expression: {str(e)}")
+            return
+        self.cancel_folder_search()
+        root_path = self.lazy_tree.root_path
+        literal = None if self.search_regex.get() == 1 else query.encode("utf-8")
+        search = find_in_files.FolderSearch(root_path, pattern, self.tree_ignore, literal=literal)
+        work = search.run
+        index = self.trigram_index
+        if literal is not None and index is not None and index.ready and index.root == root_path:
+            def work(report):
+                index.refresh()
+                search.paths = index.candidates(query)
+                return search.run(report)
+        self.folder_search = search
+        self.search_matches = []
+        self.search_results.delete(0, tk.END)
+        self.set_status(f"Searching {root_path}...")
+        self.search_worker.submit(work,
+                                  lambda count: self.folder_search_done(search),
+                                  lambda e: self.io_failed(f"Search failed: {str(e)}"),
+                                  lambda matches: self.add_search_results(search, matches))
+
+    def cancel_folder_search(self):
+        if self.folder_search is not None:
+            self.folder_search.cancel()
+
+    def add_search_results(self, search, matches):
+        if search is not self.folder_search or self.search_panel is None:
+            return
+        room = self.max_search_results - len(self.search_matches)
+        if room <= 0:
+            search.cancel()
+            return
+        matches = matches[:room]
+        self.search_matches.extend(matches)
+        root_path = self.lazy_tree.root_path
+        self.search_results.insert(tk.END, *[f"{os.path.relpath(path, root_path)}:{line}:{column + 1}: {preview}" for path, line, column, preview in matches])
+        self.set_status(f"Searching... {len(self.search_matches)} matches in {search.files_searched} files")
+
+    def folder_search_done(self, search):
+        if search is not self.folder_search:
+            return
+        state = "cancelled" if search.cancelled.is_set() else "done"
+        self.set_status(f"Search {state}: {len(self.search_matches)} matches in {search.files_searched} files")
+
+    def index_folder(self, path):
+        index = trigram_index.TrigramIndex(path, self.tree_ignore)
+        self.trigram_index = index
+        started = time.perf_counter()
+        self.set_status(f"Indexing {path}...")
+        self.index_worker.submit(lambda report: index.refresh(),
+                                 lambda count: self.set_status(f"Indexed {count} files in {time.perf_counter() - started:.2f} s ({index.size_on_disk() // 1024} KB)"),
+                                 lambda e: self.io_failed(f"Indexing failed: {str(e)}"))
+
+    def quick_open(self):
+        root_path = self.lazy_tree.root_path
+        if self.trigram_index is None or self.trigram_index.root != root_path:
+            self.index_folder(root_path)
+        index = self.trigram_index
+
+        popup = tk.Toplevel(self.master)
+        popup.title("Quick Open")
+        query = tk.StringVar()
+        entry = tk.Entry(popup, textvariable=query, width=60)
+        entry.pack(fill=tk.X)
+        results = tk.Listbox(popup, width=80, height=15)
+        results.pack(fill=tk.BOTH, expand=True)
+
+        def update(*args):
+            results.delete(0, tk.END)
+            if not index.ready:
+                results.insert(tk.END, "Indexing...")
+                popup.after(200, update)
+                return
+            names = index.quick_open(query.get())
+            if names:
+                results.insert(tk.END, *names)
+                results.selection_set(0)
+
+        def open_selected(event=None):
+            if not index.ready or not results.size():
+                return
+            selection = results.curselection()
+            path = os.path.join(index.root, results.get(selection[0] if selection else 0))
+            popup.destroy()
+            self.load_file(path)
+
+        query.trace_add("write", update)
+        entry.bind("<Return>", open_selected)
+        entry.bind("<Escape>", lambda event: popup.destroy())
+        results.bind("<Double-1>", open_selected)
+        update()
+        entry.focus_set()
+
+    def open_search_result(self, event):
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        path, line, column, preview = self.search_matches[selection[0]]
+        for text_widget in self.text_areas:
+            if self.notebook.tab(text_widget, option="text") == path:
+                self.go_to_position(text_widget, line, column)
+                return
+        self.load_file(path, lambda text_widget: self.go_to_position(text_widget, line, column))
+
+    def go_to_position(self, text_widget, line, column):
+        view = self.large_file_views.get(text_widget)
+        if view:
+            view.show_line(line)
+            line -= view.first - 1
+        index = f"{line}.{column}"
+        self.notebook.select(text_widget)
+        self.tab = self.notebook.index("current")
+        text_widget.mark_set(tk.INSERT, index)
+        text_widget.see(index)
+        text_widget.focus_set()
+        self.update_status_bar()
+
     def handle_key_release(self, event):
         self.highlight_words(event)
         self.update_status_bar()
+        # Suggestions are only recomputed once typing pauses.
+        if self.completion_job is not None:
+            self.master.after_cancel(self.completion_job)
+        self.completion_job = self.master.after(self.completion_delay, self.update_suggestions)
+        self.schedule_outline()
+
+    def update_suggestions(self):
+        self.completion_job = None
         text_widget = self.text_areas[self.tab]
         file_path = self.notebook.tab(self.tab, option="text")
-        if not file_path.startswith("Tab"):
-            file_extension = file_path.split(".")[1]
-            if file_extension in self.highlight_rules:
-                cursor_position = text_widget.index(tk.INSERT)
-                word_start = text_widget.search(r'\s', cursor_position, backwards=True, regexp=True)
-                word_start = text_widget.index(f"{word_start} +1c")
-                current_word2 = self.text_areas[self.tab].get(word_start, cursor_position).splitlines()
-                if len(current_word2) != 0:
-                    self.current_word = current_word2[0]
-                    if current_word2 != "" or type(current_word2) != list:
-                        self.suggestions = [word for word in self.highlight_rules[file_extension].keys() if word.startswith(self.current_word)]
-                if self.suggestions:
-                    self.show_suggestions(self.suggestions)
-                else:
-                    self.hide_suggestions()
+        line, column = map(int, text_widget.index(tk.INSERT).split('.'))
+        document = self.documents[self.tab]
+        self.current_word = re.search(r'\w*$', document.get_text(document.line_start(line), document.offset(line, column))).group()
+        self.suggestions = self.completion.complete(self.current_word, os.path.splitext(file_path)[1][1:])
+        tree = self.block_trees[self.tab]
+        if self.current_word and self.is_pryzma(text_widget):
+            # Names in scope at the cursor come before the buffer-wide words.
+            scoped = tree.complete(self.current_word, line)
+            self.suggestions = (scoped + [word for word in self.suggestions if word not in scoped])[:10]
+        if self.suggestions:
+            self.show_suggestions(self.suggestions)
+        else:
+            self.hide_suggestions()
 
 
     def show_suggestions(self, suggestions):
@@ -219,10 +632,13 @@ class TextEditor:
             self.suggestions_popup.bind('<FocusOut>', lambda event: self.hide_suggestions())
             self.suggestions_listbox = tk.Listbox(self.suggestions_popup, height=min(len(suggestions), 4))
             self.suggestions_listbox.pack()
+            self.shown_suggestions = []
 
-        self.suggestions_listbox.delete(0, tk.END)
-        for suggestion in suggestions:
-            self.suggestions_listbox.insert(tk.END, suggestion)
+        if suggestions != self.shown_suggestions:
+            self.suggestions_listbox.delete(0, tk.END)
+            self.suggestions_listbox.insert(tk.END, *suggestions)
+            self.suggestions_listbox.configure(height=min(len(suggestions), 4))
+            self.shown_suggestions = suggestions
 
         x, y, _, h = self.text_areas[self.tab].bbox(tk.INSERT)
         x += self.text_areas[self.tab].winfo_rootx() + 2
@@ -237,56 +653,149 @@ class TextEditor:
 
     def load_config(self, file_path):
         try:
-            with open(file_path, "r") as file:
+            with open(file_path, "r", encoding="utf-8") as file:
                 config_data = json.load(file)
                 if "syntax_files" in config_data:
                     self.syntax_files = config_data["syntax_files"]
-                    for syntax_file in self.syntax_files:
-                        self.parse_syntax_file(syntax_file)
+                if "large_file_threshold_mb" in config_data:
+                    self.large_file_threshold = int(config_data["large_file_threshold_mb"] * 1024 * 1024)
+                if "tree_ignore" in config_data:
+                    self.tree_ignore = config_data["tree_ignore"]
+                if "watch_interval_ms" in config_data:
+                    self.watch_interval = int(config_data["watch_interval_ms"])
+                if "python_executable" in config_data:
+                    self.python_executable = config_data["python_executable"]
+                if "output_max_lines" in config_data:
+                    self.output_max_lines = int(config_data["output_max_lines"])
+                if "warm_workers" in config_data:
+                    self.warm_workers = int(config_data["warm_workers"])
+                if "worker_max_runs" in config_data:
+                    self.worker_max_runs = int(config_data["worker_max_runs"])
+                if "autosave_interval_ms" in config_data:
+                    self.autosave_interval = int(config_data["autosave_interval_ms"])
+                if "restore_session" in config_data:
+                    self.restore_session = bool(config_data["restore_session"])
+                if "session_directory" in config_data:
+                    self.session_directory = config_data["session_directory"]
+                if "tab_memory_budget_mb" in config_data:
+                    self.tab_memory_budget = int(config_data["tab_memory_budget_mb"] * 1024 * 1024)
                 if "pryzma_interpreter_path" in config_data:
                     self.pryzma_interpreter_path = config_data["pryzma_interpreter_path"]
                 else:
                     self.pryzma_interpreter_path = None
         except FileNotFoundError:
-            messagebox.showwarning("Warning", f"Configuration file not found: {file_path}.")
+            self.set_status(f"Configuration file not found: {file_path}")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load configuration file from {file_path}: {str(e)}")
+            self.set_status(f"Failed to load configuration file from {file_path}: {str(e)}")
 
-    def parse_syntax_file(self, syntax_file):
-        try:
-            with open(syntax_file, "r") as file:
-                lines = file.readlines()
-                if lines and lines[0].startswith('#'):
-                    extension = lines[0][1:].strip()
-                    self.highlight_rules[extension] = {}
-                    for line in lines[1:]:
-                        if ":" in line:
-                            word, color = line.strip().split(":")
-                            self.highlight_rules[extension][word.strip()] = color.strip()
-                else:
-                    for line in lines:
-                        if ":" in line:
-                            word, color = line.strip().split(":")
-                            self.highlight_rules[word.strip()] = color.strip()
-        except FileNotFoundError:
-            messagebox.showwarning("Warning", f"Syntax file not found: {syntax_file}. No custom highlighting will be applied.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to parse syntax file {syntax_file}: {str(e)}")
+    def first_paint(self, event=None):
+        if self.painted:
+            return
+        self.painted = True
+        self.master.unbind("<Expose>")
+        self.startup.mark("first paint")
+        self.load_syntax_files()
+        started = time.perf_counter()
+        self.populate_tree(lambda: self.startup.mark("tree", started))
+        self.load_session()
+
+    def load_syntax_files(self):
+        started = time.perf_counter()
+        syntax_files = list(self.syntax_files)
+        self.io_worker.submit(lambda progress: syntax_rules.load_rules(syntax_files),
+                              lambda result: self.syntax_loaded(result, started),
+                              lambda e: self.set_status(f"Failed to load syntax files: {str(e)}"))
+
+    def syntax_loaded(self, result, started):
+        loaded, errors = result
+        for extension, colors, rules in loaded:
+            if rules is not None:
+                self.highlight_rules[extension] = colors
+                self.compiled_rules[extension] = rules
+                self.completion.set_keywords(extension, colors.keys())
+            else:
+                self.highlight_rules.update(colors)
+        for highlighter in self.highlighters:
+            highlighter.invalidate()
+        if errors:
+            self.set_status("; ".join(errors))
+        self.startup.mark("syntax", started)
 
     def create_tab(self):
         self.text_area = ScrolledText(self.notebook, wrap=tk.NONE)
         self.text_area.bind('<KeyRelease>', self.handle_key_release)
+        self.text_area.bind('<<Undo>>', lambda event: self.undo() or "break")
+        self.text_area.bind('<<Redo>>', lambda event: self.redo() or "break")
+        self.paint_latency.attach(self.text_area)
         self.text_areas.append(self.text_area)
-        self.notebook.add(self.text_area, text=f"Tab {len(self.text_areas)}")
+        hooks = EditHooks(self.text_area)
+        document = Document()
+        words = BufferWords(self.completion, self.text_area, document)
+        journal = autosave.TabJournal(self.session, document, f"Tab {len(self.text_areas)}")
+        hooks.add_listener(words)
+        hooks.add_listener(journal)
+        hooks.add_listener(document)
+        self.buffer_words.append(words)
+        self.tab_journals.append(journal)
+        self.edit_hooks.append(hooks)
+        self.documents.append(document)
+        tree = BlockTree(hooks, document, lambda text_widget=self.text_area: self.is_pryzma(text_widget))
+        self.block_trees.append(tree)
+        self.highlighters.append(Highlighter(self.text_area, hooks, lambda text_widget=self.text_area: self.rules_for(text_widget), lambda: self.highlighting.get() == 1))
+        numbers = LineNumbers(self.text_area, hooks, lambda text_widget=self.text_area: self.line_numbering(text_widget),
+                              lambda line, text_widget=self.text_area: self.fold_marker(tree, text_widget, line),
+                              lambda line, text_widget=self.text_area: self.toggle_fold_at(tree, text_widget, line))
+        minimap = Minimap(self.text_area, hooks, document, self.highlighters[-1])
+        numbers.redraw = self.instruments.timed("line_numbers", numbers.redraw)
+        minimap.redraw = self.instruments.timed("minimap", minimap.redraw)
+        numbers.show(self.show_line_numbers.get() == 1)
+        minimap.show(self.show_minimap.get() == 1)
+        self.line_numbers.append(numbers)
+        self.minimaps.append(minimap)
+        if self.table_views:
+            # Text tabs stay in front of the table tabs, so notebook indices
+            # keep matching text_areas.
+            self.notebook.insert(len(self.text_areas) - 1, self.text_area, text=f"Tab {len(self.text_areas)}")
+        else:
+            self.notebook.add(self.text_area, text=f"Tab {len(self.text_areas)}")
         self.notebook.pack(expand=tk.YES, fill=tk.BOTH)
         self.notebook.select(self.tab)
 
     def close_tab(self):
-        if len(self.text_areas) > 1:
-            tab = self.notebook.select()
-            self.notebook.forget(tab)
-            self.text_areas.pop(self.tab)
-            self.tab = self.notebook.select()
+        table = self.current_table()
+        if table is not None:
+            if table.modified and not messagebox.askyesno("Close tab", "Discard the unsaved changes in this table?"):
+                return
+            self.notebook.forget(table.frame)
+            del self.table_views[table.frame]
+            table.frame.destroy()
+        elif len(self.text_areas) > 1:
+            title = self.notebook.tab(self.tab, option="text")
+            if self.tab_journals[self.tab].modified and not messagebox.askyesno("Close tab", f"Discard the unsaved changes in {title}?"):
+                return
+            self.remove_tab(self.tab)
+
+    def remove_tab(self, tab):
+        self.watcher.forget_file(self.notebook.tab(tab, option="text"))
+        self.notebook.forget(tab)
+        view = self.large_file_views.pop(self.text_areas[tab], None)
+        if view:
+            view.close()
+        text_widget = self.text_areas.pop(tab)
+        self.buffer_words.pop(tab).clear()
+        self.tab_journals.pop(tab).closed()
+        self.edit_hooks.pop(tab)
+        self.documents.pop(tab)
+        self.highlighters.pop(tab)
+        self.line_numbers.pop(tab)
+        self.minimaps.pop(tab)
+        self.block_trees.pop(tab)
+        self.hibernated_tabs.pop(text_widget, None)
+        self.tab_used.pop(text_widget, None)
+        self.buffer_sizes.pop(text_widget, None)
+        self.file_formats.pop(text_widget, None)
+        self.hex_previews.discard(text_widget)
+        self.tab = self.notebook.index("current")
 
     def init_menu(self):
         menu = tk.Menu(self.master)
@@ -297,18 +806,28 @@ class TextEditor:
         file_menu.add_command(label="Close Tab", command=self.close_tab)
         file_menu.add_command(label="Open", command=self.open_file)
         file_menu.add_command(label="Open Folder", command=self.open_folder)
+        file_menu.add_command(label="Open Table (CSV/TSV)", command=self.open_table)
+        file_menu.add_command(label="Quick Open", command=self.quick_open)
         file_menu.add_command(label="Save", command=self.save_file)
         file_menu.add_command(label="Save As", command=self.save_file_as)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.master.quit)
+        file_menu.add_command(label="Exit", command=self.exit)
         menu.add_cascade(label="File", menu=file_menu)
 
         edit_menu = tk.Menu(menu, tearoff=0)
+        edit_menu.add_command(label="Undo", command=self.undo)
+        edit_menu.add_command(label="Redo", command=self.redo)
         edit_menu.add_command(label="Cut", command=self.cut)
         edit_menu.add_command(label="Copy", command=self.copy)
         edit_menu.add_command(label="Paste", command=self.paste)
         edit_menu.add_command(label="Select All", command=self.select_all)
         edit_menu.add_command(label="Find Text", command=self.find_text)
+        edit_menu.add_command(label="Find in Folder", command=self.find_in_folder)
+        edit_menu.add_command(label="Replace in Files", command=self.replace_in_files)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Toggle Fold", command=self.toggle_fold_at_cursor)
+        edit_menu.add_command(label="Fold All", command=self.fold_all)
+        edit_menu.add_command(label="Unfold All", command=self.unfold_all)
         menu.add_cascade(label="Edit", menu=edit_menu)
 
         insert_menu = tk.Menu(menu, tearoff=0)
@@ -322,6 +841,8 @@ class TextEditor:
         settings_menu.add_command(label="Change background color", command=self.changeBg)
         settings_menu.add_command(label="Shortcuts", command=self.shortcuts)
         settings_menu.add_checkbutton(label="Highliting", variable = self.highlighting)
+        settings_menu.add_checkbutton(label="Line Numbers", variable=self.show_line_numbers, command=self.toggle_gutters)
+        settings_menu.add_checkbutton(label="Minimap", variable=self.show_minimap, command=self.toggle_gutters)
         settings_menu.add_command(label="Refresh File Tree", command=self.refresh_file_tree)
         menu.add_cascade(label="Settings", menu=settings_menu)
 
@@ -329,6 +850,14 @@ class TextEditor:
         tools_menu.add_command(label="Run", command=self.run)
         tools_menu.add_command(label="Debug", command=self.debug)
         tools_menu.add_command(label="Interpreter", command=self.interpreter)
+        tools_menu.add_command(label="Stop", command=self.stop_process)
+        tools_menu.add_command(label="Output Panel", command=self.show_output_panel)
+        tools_menu.add_checkbutton(label="Warm Run Workers", variable=self.use_warm_workers, command=self.toggle_warm_workers)
+        tools_menu.add_separator()
+        self.show_perf_panel = tk.IntVar(value=0)
+        tools_menu.add_checkbutton(label="Performance Panel", variable=self.show_perf_panel, command=self.toggle_perf_panel)
+        self.profiling = tk.IntVar(value=0)
+        tools_menu.add_checkbutton(label="Record Profile", variable=self.profiling, command=self.toggle_profiling)
         menu.add_cascade(label="Tools", menu=tools_menu)
 
         about_menu = tk.Menu(menu, tearoff=0)
@@ -354,76 +883,337 @@ class TextEditor:
 
     def readFile(self, filename):
         try:
-            fn = open(filename, 'r+')
-            text = fn.read()
-            return text
-        except:
-            messagebox.showerror("Oops! Something Wrong!")
+            return file_io.read_text(filename)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Failed to open file: {str(e)}")
             return None
 
     def open_file(self):
         file_path = tk.filedialog.askopenfilename(defaultextension="*.*", filetypes=[("Text Files", "*.txt"), ("All Files", "*.*"), ("Pryzma",  "*.pryzma"), ("Doc", "*.doc"), ("python file", "*.py"), ("rtf", "*.rtf"), ("docx", "*.docx"), ("odt", "*.odt"), ("css", "*.css"), ("HTML", "*.html"), ("xml", "*.xml"), ("wps", "*.wps"), ("java script", "*.js"), ("JSON", "*.json")])
 
         if file_path:
-            try:
-                with open(file_path, "r") as file:
-                    content = file.read()
-                    self.create_tab()
-                    self.text_areas[len(self.text_areas)-1].delete("1.0", tk.END)
-                    self.text_areas[len(self.text_areas)-1].insert("1.0", content)
-                    self.notebook.tab(len(self.text_areas)-1, text=file_path)
-                    self.highlight_words(event=None)
-                    messagebox.showinfo("Info", f"File opened: {file_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to open file: {str(e)}")
-        
+            self.load_file(file_path)
+
+    def load_file(self, file_path, on_loaded=None):
+        tab = self.tab_for_path(file_path)
+        if tab is not None:
+            # A file that is already open gets its tab focused instead.
+            self.notebook.select(tab)
+            self.tab = tab
+            self.wake_tab(self.text_areas[tab], on_loaded)
+            return
+        try:
+            # Compressed files are always decompressed into a normal tab.
+            text_format = file_io.sniff_file(file_path)
+            if os.path.getsize(file_path) >= self.large_file_threshold and not text_format.compression:
+                self.open_large_file(file_path, text_format)
+                if on_loaded:
+                    on_loaded(self.text_areas[len(self.text_areas)-1])
+                return
+        except file_io.BinaryFileError:
+            self.offer_hex_preview(file_path)
+            return
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to open file: {str(e)}")
+            return
+        self.show_progress(f"Opening {file_path}")
+        self.io_worker.submit(lambda progress: file_io.read_document(file_path, progress),
+                              lambda result: self.file_loaded(file_path, result, on_loaded),
+                              lambda e: self.io_failed(f"Failed to open file: {str(e)}"),
+                              self.update_progress)
+
+    def file_loaded(self, file_path, result, on_loaded=None):
+        content, text_format = result
+        self.hide_progress()
+        self.create_tab()
+        self.file_formats[self.text_areas[len(self.text_areas)-1]] = text_format
+        journal = self.tab_journals[len(self.text_areas)-1]
+        journal.recording = False
+        self.text_areas[len(self.text_areas)-1].delete("1.0", tk.END)
+        self.text_areas[len(self.text_areas)-1].insert("1.0", content)
+        journal.recording = True
+        journal.saved(file_path)
+        self.notebook.tab(len(self.text_areas)-1, text=file_path)
+        self.edit_hooks[len(self.text_areas)-1].undo.clear()
+        self.highlighters[len(self.text_areas)-1].invalidate()
+        self.highlight_words(event=None)
+        self.watcher.watch_file(file_path)
+        self.set_status(f"File opened: {file_path} ({text_format.describe()})")
+        self.schedule_outline()
+        if on_loaded:
+            on_loaded(self.text_areas[len(self.text_areas)-1])
+
+    def offer_hex_preview(self, file_path):
+        if messagebox.askyesno("Binary file", f"{file_path} looks like a binary file. Show a read-only hex preview?"):
+            self.io_worker.submit(lambda progress: file_io.hex_preview(file_path),
+                                  lambda dump: self.hex_preview_loaded(file_path, dump),
+                                  lambda e: self.io_failed(f"Failed to open file: {str(e)}"))
+
+    def hex_preview_loaded(self, file_path, dump):
+        self.create_tab()
+        tab = len(self.text_areas)-1
+        text_widget = self.text_areas[tab]
+        self.tab_journals[tab].recording = False
+        self.edit_hooks[tab].undo_enabled = False
+        text_widget.insert("1.0", dump)
+        text_widget.configure(state=tk.DISABLED)
+        self.hex_previews.add(text_widget)
+        self.notebook.tab(tab, text=f"{file_path} [hex]")
+        self.tab_journals[tab].saved(f"{file_path} [hex]")
+        self.set_status(f"Hex preview of {file_path}")
+
+    def open_large_file(self, file_path, text_format=None):
+        started = time.perf_counter()
+        self.create_tab()
+        tab = len(self.text_areas)-1
+        text_widget = self.text_areas[tab]
+        self.notebook.tab(tab, text=file_path)
+        line_index = LineIndex(file_path, text_format)
+        line_index.start()
+        self.edit_hooks[tab].undo_enabled = False
+        self.tab_journals[tab].recording = False
+        self.tab_journals[tab].saved(file_path)
+        view = LargeFileView(text_widget, self.edit_hooks[tab], line_index)
+        self.large_file_views[text_widget] = view
+        view.load(1)
+        self.poll_large_file(view, time.perf_counter() - started)
+
+    def poll_large_file(self, view, open_time):
+        line_index = view.line_index
+        memory = resident_memory()
+        memory_text = f", {memory / (1024 * 1024):.1f} MB resident" if memory else ""
+        if line_index.complete:
+            self.set_status(f"{os.path.basename(line_index.path)} (read-only): {line_index.known_lines()} lines, opened in {open_time:.2f} s{memory_text}")
+        elif not line_index.stopped:
+            self.set_status(f"{os.path.basename(line_index.path)} (read-only): indexing {line_index.progress():.0%}, opened in {open_time:.2f} s{memory_text}")
+            self.master.after(250, self.poll_large_file, view, open_time)
 
     def highlight_words(self, event):
         if self.highlighting.get() == 1:
             self.tab = self.notebook.index("current")
-            text_widget = self.text_areas[self.tab]
-            text_widget.tag_remove("highlight", "1.0", tk.END)
-            file_path = self.notebook.tab(self.tab, option="text")
-            file_extension = os.path.splitext(file_path)[1][1:]
-            if file_extension in self.highlight_rules:
-                for word, color in self.highlight_rules[file_extension].items():
-                    start = "1.0"
-                    while True:
-                        start = text_widget.search(word, start, stopindex=tk.END, nocase=True)
-                        if not start:
-                            break
-                        end = f"{start}+{len(word)}c"
-                        text_widget.tag_add(f"highlight_{word}", start, end)
-                        text_widget.tag_config(f"highlight_{word}", foreground=color)
-                        start = end
+            self.highlighters[self.tab].refresh()
+
+    def line_numbering(self, text_widget):
+        view = self.large_file_views.get(text_widget)
+        if view:
+            return view.first - 1, view.line_index.estimated_lines()
+        return 0, self.documents[self.text_areas.index(text_widget)].line_count()
+
+    def toggle_gutters(self):
+        for numbers in self.line_numbers:
+            numbers.show(self.show_line_numbers.get() == 1)
+        for minimap in self.minimaps:
+            minimap.show(self.show_minimap.get() == 1)
+
+    def is_pryzma(self, text_widget):
+        if text_widget in self.large_file_views or text_widget in self.hex_previews:
+            return False
+        try:
+            file_path = self.notebook.tab(text_widget, option="text")
+        except tk.TclError:
+            return False
+        return os.path.splitext(file_path)[1] == ".pryzma"
+
+    def fold_marker(self, tree, text_widget, line):
+        # The gutter draws from the tree as it is; a stale one is rebuilt by
+        # update_outline once typing pauses, which redraws the gutter.
+        block = tree.foldable(line) if self.is_pryzma(text_widget) else None
+        if block is None:
+            return ""
+        return "\u25b8" if is_folded(text_widget, block) else "\u25be"
+
+    def toggle_fold_at(self, tree, text_widget, line):
+        if not self.is_pryzma(text_widget) or tree.parsed() is None:
+            return
+        block = tree.block_starting(line) or tree.block_at(line)
+        if block is tree.root:
+            return
+        toggle_fold(text_widget, block)
+        self.line_numbers[self.text_areas.index(text_widget)].schedule_redraw()
+
+    def toggle_fold_at_cursor(self):
+        text_widget = self.text_areas[self.tab]
+        line = int(text_widget.index(tk.INSERT).split(".")[0])
+        self.toggle_fold_at(self.block_trees[self.tab], text_widget, line)
+
+    def fold_all(self):
+        text_widget = self.text_areas[self.tab]
+        tree = self.block_trees[self.tab]
+        if not self.is_pryzma(text_widget) or tree.parsed() is None:
+            return
+        for block in tree.root.children:
+            if not is_folded(text_widget, block):
+                toggle_fold(text_widget, block)
+        self.line_numbers[self.tab].schedule_redraw()
+
+    def unfold_all(self):
+        self.text_areas[self.tab].tag_remove("folded", "1.0", tk.END)
+        self.line_numbers[self.tab].schedule_redraw()
+
+    def schedule_outline(self):
+        # The outline follows typing only once it pauses.
+        if self.outline_job is not None:
+            self.master.after_cancel(self.outline_job)
+        self.outline_job = self.master.after(300, self.update_outline)
+
+    def update_outline(self):
+        self.outline_job = None
+        if self.tab >= len(self.text_areas):
+            return
+        text_widget = self.text_areas[self.tab]
+        tree = self.block_trees[self.tab]
+        root = tree.parsed() if self.is_pryzma(text_widget) else None
+        shown = (tree, tree.version) if root is not None else None
+        if shown == self.outline_shown:
+            return
+        self.outline_shown = shown
+        self.line_numbers[self.tab].schedule_redraw()
+        self.outline.delete(*self.outline.get_children())
+        self.outline_items = {}
+        if root is None:
+            return
+        # Functions only; nested ones under the function defining them.
+        parents = {root: ""}
+        for block in tree.functions():
+            parent = block.parent
+            while parent not in parents:
+                parent = parent.parent
+            label = f"{block.label}({', '.join(block.params)})" if block.params else block.label
+            item = self.outline.insert(parents[parent], tk.END, text=label, open=True)
+            parents[block] = item
+            self.outline_items[item] = block
+
+    def on_outline_double_click(self, event):
+        block = self.outline_items.get(self.outline.focus())
+        if block is None:
+            return
+        text_widget = self.text_areas[self.tab]
+        unfold_line(text_widget, block.start)
+        self.go_to_position(text_widget, block.start, 0)
+        self.line_numbers[self.tab].schedule_redraw()
+
+    def rules_for(self, text_widget):
+        try:
+            file_path = self.notebook.tab(text_widget, option="text")
+        except tk.TclError:
+            return None
+        file_extension = os.path.splitext(file_path)[1][1:]
+        return self.compiled_rules.get(file_extension)
 
     def save_file(self):
+        table = self.current_table()
+        if table is not None:
+            if table.path:
+                self.save_table(table, table.path)
+            else:
+                self.save_file_as()
+            return
         tab = self.text_areas[self.tab]
         tab_title = self.notebook.tab(self.tab, option="text")
-        if tab_title.startswith("Tab"):
+        if tab in self.large_file_views:
+            messagebox.showinfo("Save", "Large files are opened read-only.")
+        elif tab in self.hex_previews:
+            messagebox.showinfo("Save", "Hex previews are read-only.")
+        elif tab_title.startswith("Tab"):
             self.save_file_as()
         else:
             file_path = self.notebook.tab(self.tab, option="text")
-            try:
-                with open(file_path, "w") as file:
-                    content = tab.get("1.0", tk.END)
-                    file.write(content)
-                messagebox.showinfo("Save", "File saved successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save file: {str(e)}")
-
-    def save_file_as(self):
+            self.write_file(tab, file_path)
+
+    def save_file_as(self, on_saved=None):
+        table = self.current_table()
+        if table is not None:
+            view = False
+            if table.filtered():
+                # Only an explicit choice writes the filtered subset.
+                view = messagebox.askyesnocancel("Save As", f"The filter shows {table.row_count()} of {table.store.rows} rows. "
+                                                            "Save only the rows shown? (No saves every row.)")
+                if view is None:
+                    return
+            file_path = tk.filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("TSV", "*.tsv"), ("All Files", "*.*")])
+            if file_path:
+                self.save_table(table, file_path, view)
+            return
         tab = self.text_areas[self.tab]
         file_path = tk.filedialog.asksaveasfilename(defaultextension="*.*", filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
         if file_path:
-            try:
-                with open(file_path, "w") as file:
-                    content = tab.get("1.0", tk.END)
-                    file.write(content)
-                self.notebook.tab(self.tab, text=file_path)
-                messagebox.showinfo("Save As", "File saved successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save file: {str(e)}")
+            self.write_file(tab, file_path, retitle=True, on_written=on_saved)
+
+    def write_file(self, text_widget, file_path, retitle=False, on_written=None, text_format=None):
+        # The file keeps the encoding, newlines and compression it was opened
+        # with; a tab without a known format takes the one of the file it is
+        # saved over, and Save As follows a .gz/.xz extension.
+        state = self.hibernated_tabs.get(text_widget)
+        if state is not None:
+            # A hibernated tab is empty until it wakes, so the write waits
+            # for its text; a tab that failed to wake is never written.
+            if state.get("error"):
+                messagebox.showerror("Save", f"{state['error']}. The tab cannot be saved until it is restored.")
+                return
+            self.set_status(f"Restoring the tab before saving {file_path}")
+            self.wake_tab(text_widget, lambda woken: self.write_file(woken, file_path, retitle, on_written, text_format))
+            return
+        document = self.documents[self.text_areas.index(text_widget)]
+        chunks = list(document.chunks)
+        total = len(document)
+        version = document.version
+        if text_format is None:
+            text_format = self.file_formats.get(text_widget)
+            if text_format is not None and retitle:
+                text_format = file_io.TextFormat(text_format.encoding, text_format.bom, text_format.newline, file_io.compression_for(file_path))
+
+        def work(progress):
+            chosen = text_format
+            if chosen is None:
+                try:
+                    chosen = file_io.sniff_file(file_path)
+                except OSError:
+                    chosen = file_io.TextFormat(compression=file_io.compression_for(file_path))
+            file_io.atomic_write(file_path, file_io.encode_chunks(chunks, chosen, total, progress), binary=True)
+            return chosen
+
+        self.show_progress(f"Saving {file_path}")
+        self.watcher.begin_write(file_path)
+        self.io_worker.submit(work,
+                              lambda chosen: self.file_written(text_widget, file_path, retitle, on_written, version, chosen),
+                              lambda e: self.write_failed(text_widget, file_path, retitle, on_written, text_format, e),
+                              self.update_progress, os.path.realpath(file_path))
+
+    def write_failed(self, text_widget, file_path, retitle, on_written, text_format, error):
+        self.watcher.end_write(file_path)
+        if isinstance(error, UnicodeEncodeError) and text_widget in self.text_areas:
+            self.hide_progress()
+            newline = text_format.newline if text_format is not None else "\n"
+            compression = text_format.compression if text_format is not None else file_io.compression_for(file_path)
+            if messagebox.askyesno("Save", f"The text cannot be saved as {error.encoding}. Save it as UTF-8 instead?"):
+                self.write_file(text_widget, file_path, retitle, on_written, file_io.TextFormat("utf-8", b"", newline, compression))
+            return
+        self.io_failed(f"Failed to save file: {str(error)}")
+
+    def file_written(self, text_widget, file_path, retitle, on_written=None, version=None, text_format=None):
+        self.hide_progress()
+        if text_widget in self.text_areas and text_format is not None:
+            self.file_formats[text_widget] = text_format
+        if text_widget in self.text_areas:
+            tab = self.text_areas.index(text_widget)
+            # Edits made while the file was being written are not in it.
+            self.tab_journals[tab].saved(file_path, self.documents[tab].version == version)
+        if retitle and text_widget in self.text_areas:
+            tab = self.text_areas.index(text_widget)
+            self.watcher.forget_file(self.notebook.tab(tab, option="text"))
+            self.notebook.tab(tab, text=file_path)
+            self.highlighters[tab].invalidate()
+        self.watcher.end_write(file_path)
+        self.watcher.watch_file(file_path)
+        self.set_status(f"File saved: {file_path}")
+        if on_written:
+            on_written(file_path)
+
+    def undo(self):
+        self.edit_hooks[self.tab].undo_edit()
+
+    def redo(self):
+        self.edit_hooks[self.tab].redo_edit()
 
     def cut(self):
         self.text_areas[self.tab].event_generate("<<Cut>>")
@@ -465,24 +1255,44 @@ limitations under the License.
         """)
 
     def add_tab_with_table(self):
-        table_sizeh = simpledialog.askinteger("Table Size", "Enter table size horizontal:")
-        table_sizev = simpledialog.askinteger("Table Size", "Enter table size vertical:")
-        frame = tk.Frame(self.notebook)
-        rows = []
+        table_sizeh = simpledialog.askinteger("Table Size", "Enter table size horizontal:", minvalue=1)
+        table_sizev = simpledialog.askinteger("Table Size", "Enter table size vertical:", minvalue=1)
+        if table_sizeh is None or table_sizev is None:
+            return
+        self.add_table(ColumnStore.blank(table_sizev, table_sizeh), "Table")
+
+    def add_table(self, store, title):
+        view = TableView(self.notebook, store, self.io_worker)
+        self.table_views[view.frame] = view
+        self.notebook.add(view.frame, text=title)
+        self.notebook.select(view.frame)
+        return view
+
+    def current_table(self):
         try:
-            for i in range(int(table_sizev)):
-                cols = []
-                for j in range(int(table_sizeh)):
-                    e = tk.Entry(frame, relief=tk.GROOVE)
-                    e.grid(row=i, column=j, sticky=tk.NSEW)
-                rows.append(cols)
-            self.notebook.add(frame, text="Table")
-        except TypeError:
+            return self.table_views.get(self.notebook.nametowidget(self.notebook.select()))
+        except (KeyError, tk.TclError):
+            return None
+
+    def open_table(self):
+        file_path = tk.filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("TSV", "*.tsv"), ("All Files", "*.*")])
+        if file_path:
+            view = self.add_table(ColumnStore(), file_path)
+            view.import_file(file_path)
+
+    def save_table(self, table, file_path, view=False):
+        table.export_file(file_path, lambda table: self.table_saved(table, file_path, view), view)
+
+    def table_saved(self, table, file_path, view=False):
+        if view:
+            self.set_status(f"Exported the {table.row_count()} filtered of {table.store.rows} rows to {file_path}; the table itself is not saved")
             return
-        messagebox.showinfo("Table", "Table should be in new tab")
+        if table.frame in self.table_views:
+            self.notebook.tab(table.frame, text=file_path)
+        self.set_status(f"File saved: {file_path}")
 
     def shortcuts(self):
-        root2 = tk.Tk()
+        root2 = tk.Toplevel(self.master)
         root2.title("Shortcuts")
 
         tree = ttk.Treeview(root2, columns=('1', '2'), show='headings')
@@ -501,8 +1311,7 @@ limitations under the License.
         tree.insert('', '8', values=('Autocomplete', 'Left Alt'))
         tree.insert('', '9', values=('Replace', 'Control-Shift-L'))
         tree.insert('', '10', values=('Run', 'Control-Shift-R'))
-
-        root.mainloop()
+        tree.insert('', '11', values=('Quick open', 'Control-Shift-P'))
 
     def write_date_time(self):
         now = datetime.datetime.now()
@@ -512,63 +1321,440 @@ limitations under the License.
         text_widget.insert(cursor_pos, date_time_str)
 
     def auto_complete(self):
+        if self.completion_job is not None:
+            self.master.after_cancel(self.completion_job)
+            self.update_suggestions()
+        if not self.suggestions or not self.current_word:
+            return
         text_widget = self.text_areas[self.tab]
-        cursor_position = text_widget.index(tk.INSERT)
-        word_start = text_widget.search(r'\W', cursor_position, backwards=True, regexp=True)
-        word_start = text_widget.index(f"{word_start} +1c")
-        if self.suggestions[0].startswith(self.current_word):
-            text_widget = self.text_areas[self.tab]
-            cursor_pos = text_widget.index(tk.INSERT)
-            first_suggestion = self.suggestions_listbox.get(0)
-            cursor_pos = cursor_pos.split(".")
-            line = str(cursor_pos[0])
-            cursor_pos = int(cursor_pos[1])
-            len_current_word = int(len(self.current_word))
-            result = line + "." + str(cursor_pos - len_current_word)
-            cursor_pos = line + "." + str(cursor_pos)
-            text_widget.delete(result, cursor_pos)
-            text_widget.insert(cursor_pos, first_suggestion)
+        line, column = map(int, text_widget.index(tk.INSERT).split("."))
+        word_start = f"{line}.{column - len(self.current_word)}"
+        first_suggestion = self.suggestions[0]
+        text_widget.delete(word_start, f"{line}.{column}")
+        text_widget.insert(word_start, first_suggestion)
+        file_path = self.notebook.tab(self.tab, option="text")
+        self.completion.accept(first_suggestion, os.path.splitext(file_path)[1][1:])
+        self.hide_suggestions()
 
     def run(self):
+        self.run_current_file([])
+
+    def debug(self):
+        self.run_current_file(["-d"])
+
+    def interpreter(self):
         if self.pryzma_interpreter_path != None:
-            file_path = self.notebook.tab(self.tab, option="text")
-            if not file_path.startswith("Tab"):
-                os.system(str("python " + self.pryzma_interpreter_path + " " + file_path))
-            else:
-                self.save_file()
-                file_path = self.notebook.tab(self.tab, option="text")
-                os.system(str("python " + self.pryzma_interpreter_path + " " + file_path))
-            os.system('cls')
+            self.start_process([self.python_executable, self.pryzma_interpreter_path])
         else:
             messagebox.showerror("Error", "Pryzma interpreter path not set. Please set it in settings.")
-    
-    def debug(self):
+
+    def run_current_file(self, options):
         if self.pryzma_interpreter_path != None:
             file_path = self.notebook.tab(self.tab, option="text")
             if not file_path.startswith("Tab"):
-                os.system(str("python " + self.pryzma_interpreter_path + " " + file_path + " " + "-d"))
+                self.start_process([self.python_executable, self.pryzma_interpreter_path, file_path] + options, os.path.dirname(file_path) or None)
             else:
-                self.save_file()
-                file_path = self.notebook.tab(self.tab, option="text")
-                os.system(str("python " + self.pryzma_interpreter_path + " " + file_path + " " + "-d"))
-            os.system('cls')
+                self.save_file_as(lambda file_path: self.start_process([self.python_executable, self.pryzma_interpreter_path, file_path] + options, os.path.dirname(file_path) or None))
         else:
             messagebox.showerror("Error", "Pryzma interpreter path not set. Please set it in settings.")
-    
-    def interpreter(self):
-        if self.pryzma_interpreter_path != None:
-            os.system(str("python " + self.pryzma_interpreter_path))
-            os.system('cls')
+
+    def create_output_panel(self):
+        self.output_panel = tk.Frame(self.master, bd=1, relief=tk.SUNKEN)
+        self.output_panel.pack(side=tk.BOTTOM, fill=tk.X, after=self.status_bar)
+
+        controls = tk.Frame(self.output_panel)
+        controls.pack(fill=tk.X)
+        self.output_status = tk.Label(controls, text="", anchor=tk.W)
+        self.output_status.pack(side=tk.LEFT, expand=tk.YES, fill=tk.X)
+        tk.Button(controls, text="Stop", command=self.stop_process).pack(side=tk.LEFT)
+        tk.Button(controls, text="Restart", command=self.restart_process).pack(side=tk.LEFT)
+        tk.Button(controls, text="Clear", command=self.clear_output).pack(side=tk.LEFT)
+        tk.Button(controls, text="Close", command=self.close_output_panel).pack(side=tk.LEFT)
+
+        self.output_text = ScrolledText(self.output_panel, height=12, wrap=tk.NONE, state=tk.DISABLED)
+        self.output_text.pack(fill=tk.X)
+        self.output_text.tag_configure("stderr", foreground="red")
+        self.output_text.tag_configure("stdin", foreground="blue")
+        self.output_text.tag_configure("skipped", foreground="gray")
+        self.output_input = tk.Entry(self.output_panel)
+        self.output_input.pack(fill=tk.X)
+        self.output_input.bind("<Return>", self.send_process_input)
+
+    def show_output_panel(self):
+        if self.output_panel is None:
+            self.create_output_panel()
+
+    def close_output_panel(self):
+        self.stop_process()
+        self.output_panel.destroy()
+        self.output_panel = None
+
+    def clear_output(self):
+        self.output_text.configure(state=tk.NORMAL)
+        self.output_text.delete("1.0", tk.END)
+        self.output_text.configure(state=tk.DISABLED)
+
+    def start_process(self, args, cwd=None):
+        self.stop_process()
+        self.show_output_panel()
+        self.clear_output()
+        process_runner = None
+        if self.worker_pool is not None and self.worker_pool.failed:
+            self.set_status(f"Warm workers disabled: {self.worker_pool.error}")
+            self.use_warm_workers.set(0)
+            self.toggle_warm_workers()
+        if self.worker_pool is not None and len(args) > 2 and args[:2] == [self.python_executable, self.pryzma_interpreter_path]:
+            process_runner = self.worker_pool.run(args[2], args[3:], cwd)
+        if process_runner is None:
+            process_runner = ProcessRunner(args, cwd, self.output_max_lines)
+            try:
+                process_runner.start()
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to start {args[0]}: {str(e)}")
+                return
+        self.process_runner = process_runner
+        command = subprocess.list2cmdline(args)
+        self.output_status.config(text=f"Running: {command}")
+        self.set_status(f"Running: {command}")
+        if self.output_job is None:
+            self.output_job = self.master.after(file_io.IOWorker.poll_interval, self.poll_output)
+
+    def poll_output(self):
+        self.output_job = None
+        process_runner = self.process_runner
+        if process_runner is None or self.output_panel is None:
+            return
+        # Checked before draining, so the last lines are never left behind.
+        finished = process_runner.returncode is not None
+        lines, dropped = process_runner.take()
+        if lines or dropped:
+            self.append_output(lines, dropped)
+        if finished:
+            warm = process_runner.warm
+            self.run_times[warm] = process_runner.duration
+            message = f"Exited with code {process_runner.returncode} in {process_runner.duration:.3f} s ({'warm' if warm else 'cold'})"
+            if self.run_times[not warm] is not None:
+                message += f", last {'cold' if warm else 'warm'} run {self.run_times[not warm]:.3f} s"
+            self.output_status.config(text=message)
+            self.set_status(message)
         else:
-            messagebox.showerror("Error", "Pryzma interpreter path not set. Please set it in settings.")
+            self.output_job = self.master.after(file_io.IOWorker.poll_interval, self.poll_output)
+
+    def append_output(self, lines, dropped):
+        output_text = self.output_text
+        output_text.configure(state=tk.NORMAL)
+        if dropped:
+            output_text.insert(tk.END, f"... {dropped} lines skipped ...\n", "skipped")
+        for stream, group in itertools.groupby(lines, key=lambda line: line[0]):
+            output_text.insert(tk.END, "\n".join(line for stream, line in group) + "\n", stream)
+        excess = int(output_text.index("end-1c").split(".")[0]) - 1 - self.output_max_lines
+        if excess > 0:
+            output_text.delete("1.0", f"{excess + 1}.0")
+        output_text.configure(state=tk.DISABLED)
+        output_text.see(tk.END)
+
+    def send_process_input(self, event):
+        text = self.output_input.get()
+        self.output_input.delete(0, tk.END)
+        if self.process_runner is not None and self.process_runner.running():
+            self.process_runner.send(text + "\n")
+            self.append_output([("stdin", text)], 0)
+
+    def stop_process(self):
+        if self.process_runner is not None and self.process_runner.running():
+            self.process_runner.stop()
+            self.set_status("Stopping...")
+
+    def toggle_warm_workers(self):
+        if self.use_warm_workers.get() == 1 and self.worker_pool is None:
+            if self.pryzma_interpreter_path is None or not os.path.isfile(self.pryzma_interpreter_path):
+                self.use_warm_workers.set(0)
+                return
+            self.worker_pool = WorkerPool(self.python_executable, self.pryzma_interpreter_path, max(1, self.warm_workers or 2),
+                                          self.worker_max_runs, self.output_max_lines)
+        elif self.use_warm_workers.get() == 0 and self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+
+    def toggle_perf_panel(self):
+        if self.show_perf_panel.get() == 1 and self.perf_panel is None:
+            self.perf_panel = tk.Frame(self.master, bd=1, relief=tk.SUNKEN)
+            self.perf_panel.pack(side=tk.BOTTOM, fill=tk.X, after=self.status_bar)
+            tk.Button(self.perf_panel, text="Reset", command=self.instruments.clear).pack(side=tk.RIGHT, anchor=tk.N)
+            self.perf_label = tk.Label(self.perf_panel, text="", font="TkFixedFont", justify=tk.LEFT, anchor=tk.W)
+            self.perf_label.pack(side=tk.LEFT, fill=tk.X)
+            self.refresh_perf_panel()
+        elif self.show_perf_panel.get() == 0 and self.perf_panel is not None:
+            self.master.after_cancel(self.perf_job)
+            self.perf_panel.destroy()
+            self.perf_panel = None
+
+    def refresh_perf_panel(self):
+        lines = [f"{'':<22}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, count, p50, p99, longest in self.instruments.rows():
+            lines.append(f"{name:<22}{count:>8}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}{longest * 1000:>10.2f}")
+        self.perf_label.config(text="\n".join(lines))
+        self.perf_job = self.master.after(500, self.refresh_perf_panel)
+
+    def toggle_profiling(self):
+        # cProfile only sees the Tk thread, which is the one that stalls.
+        if self.profiling.get() == 1 and self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            self.set_status("Recording profile")
+        elif self.profiling.get() == 0 and self.profiler is not None:
+            self.profiler.disable()
+            profiler = self.profiler
+            self.profiler = None
+            file_path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("Profile", "*.prof"), ("All Files", "*.*")])
+            if file_path:
+                profiler.dump_stats(file_path)
+                self.set_status(f"Profile written to {file_path} (python -m pstats {file_path})")
+
+    def tab_for_path(self, file_path):
+        file_path = os.path.normcase(os.path.abspath(file_path))
+        for tab in range(len(self.text_areas)):
+            title = self.notebook.tab(tab, option="text")
+            if not title.startswith("Tab") and os.path.normcase(os.path.abspath(title)) == file_path:
+                return tab
+        return None
+
+    def tab_changed(self, event=None):
+        try:
+            tab = self.notebook.index("current")
+        except tk.TclError:
+            return
+        if tab >= len(self.text_areas):
+            return
+        self.tab = tab
+        text_widget = self.text_areas[tab]
+        self.use_clock += 1
+        self.tab_used[text_widget] = self.use_clock
+        self.wake_tab(text_widget)
+        self.update_buffer_memory()
+        self.schedule_outline()
+
+    def poll_buffer_memory(self):
+        self.update_buffer_memory()
+        self.memory_job = self.master.after(2000, self.poll_buffer_memory)
+
+    def update_buffer_memory(self):
+        # Inactive tabs are hibernated, least recently used first, while the
+        # awake ones exceed the budget.
+        tabs = []
+        for tab, text_widget in enumerate(self.text_areas):
+            if text_widget in self.hibernated_tabs:
+                continue
+            document = self.documents[tab]
+            size = self.buffer_sizes.get(text_widget)
+            if size is None or size[0] != document.version:
+                size = self.buffer_sizes[text_widget] = (document.version, tab_memory.buffer_memory(document))
+            eligible = tab != self.tab and text_widget not in self.large_file_views and text_widget not in self.hex_previews
+            tabs.append((text_widget, size[1], self.tab_used.get(text_widget, 0), eligible))
+        hibernated = tab_memory.hibernation_candidates(tabs, self.tab_memory_budget)
+        for text_widget in hibernated:
+            self.hibernate_tab(text_widget)
+        total = sum(memory for text_widget, memory, last_used, eligible in tabs if text_widget not in hibernated)
+        text = f"Buffers: {total / (1024 * 1024):.1f} MB"
+        if self.hibernated_tabs:
+            text += f", {len(self.hibernated_tabs)} hibernated"
+        self.memory_label.config(text=text)
+
+    def hibernate_tab(self, text_widget):
+        # Unsaved text is compressed into a spill file, and kept in memory
+        # until the file is written; a tab that matches its file on disk is
+        # simply reloaded when it wakes.
+        tab = self.text_areas.index(text_widget)
+        journal = self.tab_journals[tab]
+        file_path = self.notebook.tab(tab, option="text")
+        state = {"cursor": text_widget.index(tk.INSERT), "top": text_widget.yview()[0], "spill": None}
+        if journal.modified or not os.path.isfile(file_path):
+            if self.spill_directory is None:
+                self.spill_directory = tempfile.mkdtemp(prefix="ic-spill-")
+            # Spill files are only removed on exit: a snapshot being written
+            # may still read one after its tab woke up.
+            spill = state["spill"] = os.path.join(self.spill_directory, f"{journal.id}-{next(self.spill_count)}.z")
+            chunks = state["chunks"] = list(self.documents[tab].chunks)
+            self.io_worker.submit(lambda progress: tab_memory.write_spill(spill, chunks),
+                                  lambda result: state.pop("chunks", None),
+                                  lambda e: self.spill_failed(text_widget, e))
+        journal.recording = False
+        text_widget.delete("1.0", tk.END)
+        journal.recording = True
+        self.edit_hooks[tab].undo.clear()
+        text_widget.configure(state=tk.DISABLED)
+        self.hibernated_tabs[text_widget] = state
+        self.buffer_sizes.pop(text_widget, None)
+
+    def spill_failed(self, text_widget, error):
+        self.set_status(f"Could not hibernate a tab: {str(error)}")
+        self.wake_tab(text_widget)
+
+    def wake_tab(self, text_widget, on_woken=None):
+        state = self.hibernated_tabs.get(text_widget)
+        if state is None:
+            if on_woken:
+                on_woken(text_widget)
+            return
+        if on_woken:
+            state.setdefault("callbacks", []).append(on_woken)
+        if state.get("waking"):
+            return
+        state["waking"] = True
+        file_path = self.notebook.tab(text_widget, option="text")
+        chunks = state.get("chunks")
+        spill = state["spill"]
+        if chunks is not None:
+            self.tab_woken(text_widget, "".join(chunks))
+            return
+        if spill is not None:
+            work = lambda progress: tab_memory.read_spill(spill)
+        else:
+            work = lambda progress: file_io.read_text(file_path, progress)
+        self.io_worker.submit(work,
+                              lambda content: self.tab_woken(text_widget, content),
+                              lambda e: self.tab_woken(text_widget, "", f"Failed to restore {file_path}: {str(e)}"))
+
+    def tab_woken(self, text_widget, content, error=None):
+        state = self.hibernated_tabs.get(text_widget)
+        if state is None or text_widget not in self.text_areas:
+            return
+        if error:
+            # The tab stays empty and read-only rather than looking like an
+            # empty file; selecting it again retries, and saves are refused.
+            state["error"] = error
+            state.pop("waking", None)
+            state.pop("callbacks", None)
+            self.set_status(error)
+            return
+        del self.hibernated_tabs[text_widget]
+        tab = self.text_areas.index(text_widget)
+        journal = self.tab_journals[tab]
+        text_widget.configure(state=tk.NORMAL)
+        journal.recording = False
+        text_widget.insert("1.0", content)
+        journal.recording = True
+        self.edit_hooks[tab].undo.clear()
+        self.highlighters[tab].invalidate()
+        text_widget.mark_set(tk.INSERT, state["cursor"])
+        text_widget.after_idle(text_widget.yview_moveto, state["top"])
+        for callback in state.get("callbacks", []):
+            callback(text_widget)
+        self.update_buffer_memory()
+
+    def autosave(self):
+        if self.text_areas:
+            text_widget = self.text_areas[self.tab]
+            view = (self.tab_journals[self.tab], text_widget.index(tk.INSERT), text_widget.yview()[0])
+            if view != self.last_view:
+                if self.last_view is None or view[0] is not self.last_view[0]:
+                    self.session.record(["select", view[0].id])
+                view[0].viewed(view[1], view[2])
+                self.last_view = view
+        self.session.flush()
+        if self.session.journal_size > self.session.compact_size:
+            self.session.snapshot(*self.session_tabs())
+        if self.session.error:
+            self.set_status(f"Autosave failed: {self.session.error}")
+        self.autosave_job = self.master.after(self.autosave_interval, self.autosave)
+
+    def session_tabs(self):
+        tabs = []
+        for tab, text_widget in enumerate(self.text_areas):
+            journal = self.tab_journals[tab]
+            state = self.hibernated_tabs.get(text_widget)
+            if state is None:
+                tabs.append({"id": journal.id, "title": self.notebook.tab(tab, option="text"), "modified": journal.modified,
+                             "cursor": text_widget.index(tk.INSERT), "top": text_widget.yview()[0],
+                             "chunks": list(self.documents[tab].chunks) if journal.modified else None})
+            else:
+                tabs.append({"id": journal.id, "title": self.notebook.tab(tab, option="text"), "modified": journal.modified,
+                             "cursor": state["cursor"], "top": state["top"],
+                             "chunks": state.get("chunks") if journal.modified else None,
+                             "spill": state["spill"] if journal.modified and "chunks" not in state else None})
+        return tabs, self.tab_journals[self.tab].id if self.text_areas else None
+
+    def load_session(self):
+        if not self.restore_session:
+            self.start_session(*self.session_tabs())
+            return
+        directory = self.session.directory
+        self.io_worker.submit(lambda progress: autosave.load_session(directory, self.large_file_threshold),
+                              self.session_loaded,
+                              lambda e: self.session_failed(f"Failed to restore the last session: {str(e)}"))
+
+    def start_session(self, tabs, selected, generation=0):
+        # The journal and the autosave loop that flushes it start together,
+        # once the session is known.
+        self.session.start(tabs, selected, generation)
+        if self.autosave_job is None:
+            self.autosave_job = self.master.after(self.autosave_interval, self.autosave)
+
+    def session_failed(self, message):
+        self.set_status(message)
+        self.start_session(*self.session_tabs())
+
+    def session_loaded(self, result):
+        tabs, generation = result
+        # The empty tab opened at startup gives way to the restored ones.
+        blank = len(self.text_areas) == 1 and not self.tab_journals[0].modified and self.notebook.tab(0, option="text").startswith("Tab")
+        selected = None
+        for restored in tabs:
+            if restored["content"] is None:
+                self.open_large_file(restored["title"])
+            else:
+                self.create_tab()
+                tab = len(self.text_areas)-1
+                text_widget = self.text_areas[tab]
+                journal = self.tab_journals[tab]
+                journal.recording = False
+                text_widget.insert("1.0", restored["content"])
+                journal.recording = True
+                journal.modified = restored["modified"]
+                self.notebook.tab(tab, text=restored["title"])
+                self.edit_hooks[tab].undo.clear()
+                self.highlighters[tab].invalidate()
+                text_widget.mark_set(tk.INSERT, restored["cursor"])
+                text_widget.after_idle(text_widget.yview_moveto, restored["top"])
+                if os.path.isfile(restored["title"]):
+                    self.watcher.watch_file(restored["title"])
+            if restored["selected"]:
+                selected = self.text_areas[len(self.text_areas)-1]
+        if tabs and blank:
+            self.remove_tab(0)
+        if selected is not None:
+            self.notebook.select(self.text_areas.index(selected))
+        self.tab = self.notebook.index("current")
+        self.highlight_words(event=None)
+        self.start_session(*self.session_tabs(), generation)
+        if tabs:
+            self.set_status(f"Restored {len(tabs)} tabs from the last session")
+
+    def exit(self):
+        if any(table.modified for table in self.table_views.values()) and not messagebox.askyesno("Exit", "Discard the unsaved changes in the open tables?"):
+            return
+        self.session.close(*self.session_tabs())
+        if self.spill_directory is not None:
+            shutil.rmtree(self.spill_directory, ignore_errors=True)
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+        self.master.destroy()
+
+    def restart_process(self):
+        if self.process_runner is not None:
+            self.start_process(self.process_runner.args, self.process_runner.cwd)
 
 
+if __name__ == "__main__":
+    startup = StartupProfile(startup_started, "--profile-startup" in sys.argv, ("first paint", "syntax", "tree"))
+    startup.mark("import")
 
-root = tk.Tk()
+    root = tk.Tk()
 
-root.state('normal')
+    root.state('normal')
 
-text_editor = TextEditor(root)
+    startup.mark("tk init")
 
+    text_editor = TextEditor(root, startup)
 
-root.mainloop()
+    root.mainloop()
@@ -0,0 +1,246 @@
+import json
+import os
+import queue
+import threading
+import zlib
+
+import file_io
+import tab_memory
+from document import Document
+
+
+def session_directory():
+    return os.path.join(file_io.cache_directory(), "session")
+
+
+class TabJournal:
+    # Edit listener of one tab. It has to be registered before the tab's
+    # Document: the first edit after the tab was loaded or saved journals the
+    # text the tab had until then, which the document still holds.
+    def __init__(self, session, document, title):
+        self.session = session
+        self.document = document
+        self.id = session.new_id()
+        self.modified = False
+        self.recording = True
+        session.record(["new", self.id, title])
+
+    def touch(self):
+        if not self.modified:
+            self.modified = True
+            self.session.record(["base", self.id, list(self.document.chunks)])
+
+    def inserted(self, index, text):
+        if self.recording:
+            self.touch()
+            self.session.record(["i", self.id, index, text])
+
+    def deleted(self, start, end):
+        if self.recording:
+            self.touch()
+            self.session.record(["d", self.id, start, end])
+
+    def saved(self, title, clean=True):
+        # The tab now shows the file at title; a clean tab is restored from
+        # the file itself.
+        if clean:
+            self.modified = False
+        self.session.record(["saved" if clean else "title", self.id, title])
+
+    def viewed(self, cursor, top):
+        self.session.record(["view", self.id, cursor, top])
+
+    def closed(self):
+        self.session.record(["close", self.id])
+
+
+class Session:
+    # Write-ahead journal of the open tabs. Edits are collected in memory on
+    # the Tk thread and handed to a writer thread in batches by flush(); the
+    # writer appends them as JSON lines and fsyncs once per batch. A snapshot
+    # holds the text of every modified tab, and each snapshot starts a new
+    # journal generation, so a crash between the two writes never replays
+    # edits twice.
+    compact_size = 4 * 1024 * 1024
+
+    def __init__(self, directory=None):
+        self.directory = directory or session_directory()
+        self.snapshot_path = os.path.join(self.directory, "snapshot.json")
+        self.journal_path = os.path.join(self.directory, "journal.log")
+        self.pending = []
+        self.queue = queue.Queue()
+        self.generation = 0
+        self.journal_size = 0
+        self.next_id = 0
+        self.started = False
+        self.error = None
+        self.thread = None
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def record(self, operation):
+        self.pending.append(operation)
+
+    def flush(self):
+        if self.started and self.pending:
+            self.queue.put(("edits", self.pending))
+            self.pending = []
+
+    def snapshot(self, tabs, selected):
+        # tabs are dicts with id, title, modified, cursor, top and, for
+        # modified tabs, the document chunks or the spill file of a
+        # hibernated tab. Edits recorded so far are flushed first, so they
+        # are not lost if the snapshot cannot be written.
+        self.flush()
+        self.generation += 1
+        self.queue.put(("snapshot", self.generation, tabs, selected))
+
+    def start(self, tabs, selected, generation=0):
+        self.generation = generation
+        self.started = True
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+        self.snapshot(tabs, selected)
+
+    def close(self, tabs, selected):
+        if not self.started:
+            return
+        self.snapshot(tabs, selected)
+        self.queue.put(None)
+        self.thread.join()
+        self.started = False
+
+    def write_loop(self):
+        journal = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                if item[0] == "edits":
+                    if journal is None:
+                        continue
+                    data = "".join(json.dumps(encoded(operation)) + "\n" for operation in item[1]).encode("utf-8")
+                    journal.write(data)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    self.journal_size += len(data)
+                else:
+                    # The old journal stays in use until the snapshot that
+                    # replaces it is on disk.
+                    self.write_snapshot(*item[1:])
+                    if journal is not None:
+                        journal.close()
+                    journal = self.start_journal(item[1])
+                self.error = None
+            except (OSError, ValueError, zlib.error) as e:
+                self.error = str(e)
+        if journal is not None:
+            journal.close()
+
+    def write_snapshot(self, generation, tabs, selected):
+        os.makedirs(self.directory, exist_ok=True)
+        for tab in tabs:
+            chunks = tab.pop("chunks", None)
+            spill = tab.pop("spill", None)
+            if chunks is not None:
+                tab["content"] = "".join(chunks)
+            elif spill is not None:
+                tab["content"] = tab_memory.read_spill(spill)
+        data = json.dumps({"generation": generation, "tabs": tabs, "selected": selected})
+        file_io.atomic_write(self.snapshot_path, [data], len(data))
+
+    def start_journal(self, generation):
+        journal = open(self.journal_path, "wb")
+        journal.write(json.dumps({"generation": generation}).encode("utf-8") + b"\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+        self.journal_size = 0
+        return journal
+
+
+def encoded(operation):
+    if operation[0] == "base":
+        return ["base", operation[1], "".join(operation[2])]
+    return operation
+
+
+def read_journal(path, generation):
+    # A line cut short by a crash ends the journal.
+    try:
+        with open(path, "rb") as file:
+            lines = iter(file)
+            try:
+                if json.loads(next(lines)).get("generation") != generation:
+                    return
+                for line in lines:
+                    yield json.loads(line)
+            except (StopIteration, ValueError):
+                return
+    except OSError:
+        return
+
+
+def load_session(directory=None, max_file_size=None):
+    # Rebuilds the tabs of the last session from the snapshot and the
+    # journal. Returns (tabs, generation); tabs are dicts with title,
+    # modified, content, cursor, top and selected. Unmodified tabs of files
+    # are read from disk, or left with content None when they are larger
+    # than max_file_size; unmodified files that no longer exist are dropped.
+    directory = directory or session_directory()
+    try:
+        with open(os.path.join(directory, "snapshot.json"), "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return [], 0
+    tabs = {}
+    for tab in snapshot["tabs"]:
+        content = tab.get("content")
+        tabs[tab["id"]] = {"title": tab["title"], "modified": tab["modified"], "cursor": tab["cursor"], "top": tab["top"],
+                           "document": Document(content) if content is not None else None}
+    selected = snapshot.get("selected")
+    for operation in read_journal(os.path.join(directory, "journal.log"), snapshot["generation"]):
+        kind, tab_id = operation[0], operation[1]
+        if kind == "new":
+            tabs[tab_id] = {"title": operation[2], "modified": False, "cursor": "1.0", "top": 0.0, "document": None}
+        elif tab_id not in tabs:
+            continue
+        tab = tabs[tab_id]
+        if kind == "base":
+            tab["document"] = Document(operation[2])
+            tab["modified"] = True
+        elif kind == "i" and tab["document"] is not None:
+            tab["document"].inserted(operation[2], operation[3])
+        elif kind == "d" and tab["document"] is not None:
+            tab["document"].deleted(operation[2], operation[3])
+        elif kind == "saved":
+            tab["title"] = operation[2]
+            tab["modified"] = False
+            tab["document"] = None
+        elif kind == "title":
+            tab["title"] = operation[2]
+        elif kind == "view":
+            tab["cursor"], tab["top"] = operation[2], operation[3]
+        elif kind == "select":
+            selected = tab_id
+        elif kind == "close":
+            del tabs[tab_id]
+    restored = []
+    for tab_id, tab in tabs.items():
+        document = tab.pop("document")
+        tab["content"] = document.text() if document is not None else ""
+        if not tab["modified"] and os.path.isfile(tab["title"]):
+            try:
+                if max_file_size is not None and os.path.getsize(tab["title"]) >= max_file_size:
+                    tab["content"] = None
+                else:
+                    tab["content"] = file_io.read_text(tab["title"])
+            except OSError:
+                continue
+        elif not tab["modified"] and os.path.isabs(tab["title"]):
+            continue
+        tab["selected"] = tab_id == selected
+        restored.append(tab)
+    return restored, snapshot["generation"]
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import autosave
+from document import Document
+
+EDITS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "--child" else 200000
+BATCH = 500
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def edit(generator, document):
+    # A keystroke-sized edit at a random position, as "line.col" indices.
+    line = generator.randint(1, document.line_count())
+    column = generator.randint(0, document.line_end(line) - document.line_start(line))
+    if generator.random() < 0.7 or len(document) < 10:
+        return "i", f"{line}.{column}", generator.choice(["a", "b", " ", "\n", "word", "\u00e9"])
+    offset = document.offset(line, column)
+    end_line, end_column = document.position(min(len(document), offset + generator.randint(1, 5)))
+    return "d", f"{line}.{column}", f"{end_line}.{end_column}"
+
+
+def child(directory):
+    # Edits one tab forever, printing the hash of the text at every batch
+    # handed to the writer, until the parent kills it.
+    generator = random.Random(2)
+    session = autosave.Session(directory)
+    session.compact_size = 256 * 1024
+    document = Document("start\n")
+    journal = autosave.TabJournal(session, document, "Tab 1")
+
+    def tabs():
+        return [{"id": journal.id, "title": "Tab 1", "modified": journal.modified, "cursor": "1.0", "top": 0.0,
+                 "chunks": list(document.chunks) if journal.modified else None}], journal.id
+
+    session.start(*tabs())
+    print(digest(document.text()), flush=True)
+    while True:
+        for _ in range(BATCH):
+            kind, start, other = edit(generator, document)
+            if kind == "i":
+                journal.inserted(start, other)
+                document.inserted(start, other)
+            else:
+                journal.deleted(start, other)
+                document.deleted(start, other)
+        if session.journal_size > session.compact_size:
+            session.snapshot(*tabs())
+        else:
+            session.flush()
+        print(digest(document.text()), flush=True)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+
+    # Cost of journalling on the Tk thread, per keystroke.
+    generator = random.Random(1)
+    session = autosave.Session(directory)
+    document = Document("start\n")
+    journal = autosave.TabJournal(session, document, "Tab 1")
+    started = time.perf_counter()
+    for _ in range(EDITS):
+        journal.inserted("1.0", "a")
+    elapsed = time.perf_counter() - started
+    print(f"recording: {elapsed / EDITS * 1000000:.2f} us per edit on the Tk thread")
+    session.pending = []
+
+    recovered = 0
+    for attempt in range(5):
+        directory = tempfile.mkdtemp()
+        process = subprocess.Popen([sys.executable, __file__, "--child", directory], stdout=subprocess.PIPE, text=True)
+        time.sleep(1.0 + attempt * 0.5)
+        os.kill(process.pid, signal.SIGKILL)
+        hashes = process.stdout.read().split()
+        process.wait()
+        started = time.perf_counter()
+        tabs, generation = autosave.load_session(directory)
+        elapsed = time.perf_counter() - started
+        text = tabs[0]["content"]
+        assert digest(text) in hashes, "recovered text matches no flushed state"
+        behind = len(hashes) - 1 - hashes.index(digest(text))
+        recovered += 1
+        print(f"kill {attempt + 1}: {len(hashes) - 1} batches flushed, recovered {len(text)} characters "
+              f"{behind} batches behind, generation {generation}, loaded in {elapsed * 1000:.1f} ms")
+    print(f"{recovered} of 5 killed sessions recovered")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from completion import CompletionEngine
+
+IDENTIFIERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+def main():
+    generator = random.Random(1)
+    words = list({"".join(generator.choice("abcdefghijklmnopqrstuvwxyz_") for _ in range(generator.randint(3, 16))) for _ in range(IDENTIFIERS)})
+    text = " ".join(generator.choices(words, k=len(words) * 3) + words)
+    engine = CompletionEngine()
+    engine.set_keywords("pryzma", ["print", "input", "if", "for", "while", "func", "return", "import"])
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    engine.add_text(text)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(engine.identifiers)} identifiers indexed in {elapsed:.2f} s, {memory / 1024 / 1024:.1f} MB")
+
+    prefixes = [word[:length] for word in generator.sample(words, 1000) for length in (1, 2, 3, 5)]
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        for prefix in prefixes:
+            engine.complete(prefix, "pryzma")
+        elapsed = time.perf_counter() - started
+        print(f"{label:>6} lookup {elapsed / len(prefixes) * 1000000:>9.1f} us per prefix")
+
+    # Typing: every key changes one identifier, which invalidates its path.
+    started = time.perf_counter()
+    for word in generator.sample(words, 1000):
+        for length in range(1, len(word) + 1):
+            engine.add_text(word[:length])
+            engine.complete(word[:length], "pryzma")
+            engine.remove_text(word[:length])
+    elapsed = time.perf_counter() - started
+    keys = sum(len(word) for word in words[:1000])
+    print(f"typing {elapsed / keys * 1000000:>9.1f} us per key (update + lookup)")
+
+    started = time.perf_counter()
+    for prefix in prefixes:
+        [word for word in words if word.startswith(prefix)]
+    elapsed = time.perf_counter() - started
+    print(f"  scan {elapsed / len(prefixes) * 1000000:>9.1f} us per prefix (startswith over every word)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from document import Document
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+OPERATIONS = 1000
+
+
+def synthetic_text(size):
+    line = "value = len(items) <= 10 and print x in list\n"
+    return line * (size // len(line))
+
+
+def timed(name, function, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    elapsed = time.perf_counter() - started
+    print(f"{name:>24} {elapsed * 1000:>10.2f} ms total {elapsed / repeat * 1e6:>12.2f} us/op")
+
+
+def main():
+    text = synthetic_text(SIZE_MB * 1024 * 1024)
+    random.seed(0)
+    document = None
+
+    def build():
+        nonlocal document
+        document = Document(text)
+
+    timed(f"load {SIZE_MB} MB", build)
+    lines = document.line_count()
+    middle = len(document) // 2
+    timed("insert in middle", lambda: document.insert(middle, "x"), OPERATIONS)
+    timed("typing + line lookup", lambda: (document.insert(middle, "y"), document.position(middle)), OPERATIONS)
+    timed("delete in middle", lambda: document.delete(middle, middle + 1), OPERATIONS)
+    timed("line_start lookup", lambda: document.line_start(random.randint(1, lines)), OPERATIONS)
+    timed("offset -> position", lambda: document.position(random.randint(0, len(document))), OPERATIONS)
+    timed("full serialization", lambda: document.write_to(io.StringIO()))
+    timed("text()", document.text)
+
+
+if __name__ == "__main__":
+    main()
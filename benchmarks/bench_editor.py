@@ -0,0 +1,344 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+# Not committed until it is recorded once on the reference machine with
+#     xvfb-run -a python benchmarks/bench_editor.py --save-baseline
+# and checked with
+#     xvfb-run -a python benchmarks/bench_editor.py --baseline
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+import tkinter as tk
+from tkinter import messagebox, simpledialog
+
+# Metrics compared against the baseline, with the absolute change below
+# which a relative regression is treated as noise.
+TRACKED = {"p50_ms": 0.5, "p95_ms": 1.0, "peak_kb": 256}
+KEYWORDS = ["if", "for", "while", "print", "input", "func", "return", "import", "stop", "len"]
+WORDS = ["value", "count", "total", "index", "name", "result", "buffer", "line", "item", "data"]
+
+
+def load_editor():
+    # The editor's file name is not importable and its window is only built
+    # under its __main__ guard.
+    spec = importlib.util.spec_from_file_location("ic_text_editor", os.path.join(ROOT, "IC-Text-Editor.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summary(times, peak):
+    return {"samples": len(times),
+            "p50_ms": percentile(times, 0.5) * 1000,
+            "p95_ms": percentile(times, 0.95) * 1000,
+            "p99_ms": percentile(times, 0.99) * 1000,
+            "max_ms": max(times) * 1000,
+            "peak_kb": peak / 1024}
+
+
+def write_document(path, lines, generator):
+    with open(path, "w") as file:
+        for number in range(lines):
+            indent = "    " * generator.randint(0, 3)
+            words = generator.choices(WORDS, k=generator.randint(2, 8))
+            file.write(f"{indent}{generator.choice(KEYWORDS)} {' '.join(words)} = {number}\n")
+
+
+def write_tree(directory, entries):
+    os.makedirs(directory)
+    for number in range(entries):
+        if number % 10 == 0:
+            os.makedirs(os.path.join(directory, f"dir{number}"))
+        else:
+            with open(os.path.join(directory, f"file{number}.pryzma"), "w") as file:
+                file.write("print x\n")
+
+
+class Suite:
+    def __init__(self, root, editor, directory, repeat):
+        self.root = root
+        self.editor = editor
+        self.directory = directory
+        self.repeat = repeat
+        self.results = {}
+        self.answers = {}
+        self.generator = random.Random(1)
+
+    def pump(self, condition, timeout=120.0):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("the editor did not finish in time")
+            self.root.update()
+            time.sleep(0.0005)
+
+    def settle(self):
+        # Lets idle work (highlighting fill, IOWorker polls) run between
+        # samples, so it is not billed to the next one.
+        for _ in range(3):
+            self.root.update()
+
+    def measure(self, name, size, sample, count):
+        times = []
+        for _ in range(count):
+            times.append(sample())
+            self.settle()
+        tracemalloc.start()
+        sample()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.settle()
+        self.results[f"{name}/{size}"] = summary(times, peak)
+        result = self.results[f"{name}/{size}"]
+        print(f"{name:>22} {size:>8}: p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+              f"max {result['max_ms']:9.2f} ms  peak {result['peak_kb']:9.0f} KB", flush=True)
+
+    def current(self):
+        editor = self.editor
+        return editor.text_areas[editor.tab], editor.documents[editor.tab]
+
+    def open_file(self, path):
+        editor = self.editor
+        tabs = len(editor.text_areas)
+        started = time.perf_counter()
+        editor.open_file_from_tree(path)
+        self.pump(lambda: len(editor.text_areas) > tabs)
+        elapsed = time.perf_counter() - started
+        editor.notebook.select(len(editor.text_areas) - 1)
+        editor.tab = editor.notebook.index("current")
+        return elapsed
+
+    def close_current(self):
+        editor = self.editor
+        editor.tab_journals[editor.tab].modified = False
+        editor.close_tab()
+
+    def run_document(self, lines):
+        editor = self.editor
+        path = os.path.join(self.directory, f"document{lines}.pryzma")
+        write_document(path, lines, self.generator)
+
+        def open_sample():
+            elapsed = self.open_file(path)
+            self.close_current()
+            return elapsed
+
+        self.measure("open_file_from_tree", lines, open_sample, self.repeat)
+        self.open_file(path)
+        text_widget, document = self.current()
+        generator = self.generator
+
+        def move(line=None):
+            line = line or generator.randint(1, document.line_count())
+            text_widget.mark_set(tk.INSERT, f"{line}.0")
+            text_widget.see(tk.INSERT)
+            self.root.update_idletasks()
+
+        def highlight_sample():
+            move()
+            text_widget.insert(tk.INSERT, "x")
+            started = time.perf_counter()
+            editor.highlight_words(None)
+            return time.perf_counter() - started
+
+        self.measure("highlight_words", lines, highlight_sample, self.repeat * 10)
+
+        def fill_sample():
+            highlighter = editor.highlighters[editor.tab]
+            started = time.perf_counter()
+            highlighter.invalidate()
+            self.pump(lambda: highlighter.fill_line > len(highlighter.line_tokens))
+            return time.perf_counter() - started
+
+        self.measure("highlight_fill", lines, fill_sample, max(1, self.repeat // 2))
+
+        def type_sample():
+            text_widget.insert(tk.INSERT, generator.choice("abcdefgh "))
+            started = time.perf_counter()
+            editor.handle_key_release(None)
+            return time.perf_counter() - started
+
+        move()
+        self.measure("handle_key_release", lines, type_sample, self.repeat * 40)
+
+        def keystroke_sample():
+            started = time.perf_counter()
+            text_widget.insert(tk.INSERT, generator.choice("abcdefgh "))
+            return time.perf_counter() - started
+
+        self.measure("insert_char", lines, keystroke_sample, self.repeat * 40)
+
+        def suggestion_sample():
+            text_widget.insert(tk.INSERT, " " + generator.choice(WORDS)[:2])
+            started = time.perf_counter()
+            editor.update_suggestions()
+            return time.perf_counter() - started
+
+        self.measure("update_suggestions", lines, suggestion_sample, self.repeat * 10)
+        editor.hide_suggestions()
+
+        def find_sample():
+            move(1)
+            # Half the queries are found near the end, half are missing.
+            self.answers["askstring"] = generator.choice([f"= {lines - generator.randint(1, 10)}", "missing query"])
+            started = time.perf_counter()
+            editor.find_text()
+            return time.perf_counter() - started
+
+        self.measure("find_text", lines, find_sample, self.repeat * 4)
+
+        def replace_sample():
+            word = generator.choice(WORDS)
+            first = document.get_text().find(f" {word} ") + 1
+            line, column = document.position(first)
+            text_widget.tag_remove(tk.SEL, "1.0", tk.END)
+            text_widget.tag_add(tk.SEL, f"{line}.{column}", f"{line}.{column + len(word)}")
+            self.answers["askstring"] = word.upper()
+            started = time.perf_counter()
+            editor.edit_all_occurrences()
+            elapsed = time.perf_counter() - started
+            editor.undo()
+            return elapsed
+
+        self.measure("edit_all_occurrences", lines, replace_sample, self.repeat)
+
+        def save_sample():
+            text_widget.insert("1.0", "x")
+            editor.set_status("")
+            started = time.perf_counter()
+            editor.save_file()
+            self.pump(lambda: editor.info_label.cget("text").startswith("File saved"))
+            return time.perf_counter() - started
+
+        self.measure("save_file", lines, save_sample, self.repeat)
+        self.close_current()
+
+    def run_tree(self, entries):
+        editor = self.editor
+        directory = os.path.join(self.directory, f"tree{entries}")
+        write_tree(directory, entries)
+        os.chdir(directory)
+
+        def tree_sample():
+            done = []
+            started = time.perf_counter()
+            editor.populate_tree(lambda: done.append(time.perf_counter()))
+            self.pump(lambda: done)
+            return done[0] - started
+
+        self.measure("populate_tree", entries, tree_sample, self.repeat)
+
+
+def answer_dialogs(answers):
+    # Modal dialogs would block the run; they get scripted answers instead.
+    simpledialog.askstring = lambda *args, **kwargs: answers.get("askstring")
+    messagebox.askquestion = lambda *args, **kwargs: "yes"
+    messagebox.askyesno = lambda *args, **kwargs: True
+    messagebox.showinfo = lambda *args, **kwargs: "ok"
+    messagebox.showwarning = lambda *args, **kwargs: "ok"
+
+    def show_error(title, message, **kwargs):
+        raise RuntimeError(message)
+
+    messagebox.showerror = show_error
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, metrics in sorted(results["metrics"].items()):
+        base = baseline["metrics"].get(name)
+        if base is None:
+            continue
+        for metric, slack in TRACKED.items():
+            if metric in base and metrics[metric] > base[metric] * (1 + threshold) and metrics[metric] - base[metric] > slack:
+                regressions.append(f"{name} {metric}: {base[metric]:.2f} -> {metrics[metric]:.2f}")
+    return regressions
+
+
+def check_baseline(results, path, threshold):
+    # Exit status: 0 without regressions, 1 with, 2 without a baseline.
+    try:
+        with open(path, "r") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline at {path}; record one on the reference machine with --save-baseline (see benchmarks/README.md).", file=sys.stderr)
+        return 2
+    for key in ("python", "tk", "platform"):
+        if baseline.get(key) != results.get(key):
+            print(f"Warning: the baseline was recorded with {key} {baseline.get(key)}, this run uses {results.get(key)}", file=sys.stderr)
+    regressions = compare(results, baseline, threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        return 1
+    print(f"No regressions against {path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the editor's hot paths on a real Tk root (use xvfb-run without a display).")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="document sizes in lines")
+    parser.add_argument("--tree-sizes", default="100,1000,10000", help="directory sizes in entries")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE,
+                        help="compare with this JSON file (default benchmarks/baseline.json) and fail on regressions")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE, help="store the results as the baseline (default benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="ic-bench-")
+    # Session, index and rules caches of the run stay out of the user's.
+    os.environ["XDG_CACHE_HOME"] = os.path.join(directory, "cache")
+    syntax_file = os.path.join(directory, "pryzma.txt")
+    with open(syntax_file, "w") as file:
+        file.write("#pryzma\n" + "".join(f"{word}:blue\n" for word in KEYWORDS) + "=:orange\n")
+
+    module = load_editor()
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"No display for Tk ({e}); run under xvfb-run.", file=sys.stderr)
+        return 2
+    root.geometry("1200x800")
+    os.chdir(directory)
+    editor = module.TextEditor(root)
+    editor.restore_session = False
+    editor.syntax_files = [syntax_file]
+    suite = Suite(root, editor, directory, arguments.repeat)
+    answer_dialogs(suite.answers)
+    suite.pump(lambda: editor.painted and "pryzma" in editor.compiled_rules)
+
+    for lines in map(int, arguments.sizes.split(",")):
+        suite.run_document(lines)
+    for entries in map(int, arguments.tree_sizes.split(",")):
+        suite.run_tree(entries)
+    editor.exit()
+
+    results = {"python": platform.python_version(), "tk": str(tk.TkVersion), "platform": platform.platform(),
+               "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "metrics": suite.results}
+    for path in (arguments.output, arguments.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=2)
+    if arguments.baseline:
+        return check_baseline(results, arguments.baseline, arguments.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
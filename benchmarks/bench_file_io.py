@@ -0,0 +1,94 @@
+import gzip
+import lzma
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import file_io
+from document import Document
+
+MEGABYTES = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+WORDS = ["value", "count", "naïve", "café", "Größe", "über", "print", "total", "index", "€uro", "déjà", "result"]
+
+
+def sample_text(generator, size):
+    lines = []
+    length = 0
+    while length < size:
+        line = " ".join(generator.choices(WORDS, k=10))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def corpus(directory, text):
+    cases = {
+        "utf8-lf.txt": text.encode("utf-8"),
+        "utf8-bom-crlf.txt": b"\xef\xbb\xbf" + text.replace("\n", "\r\n").encode("utf-8"),
+        "cp1252-crlf.txt": text.replace("\n", "\r\n").encode("cp1252"),
+        "utf16le-bom.txt": b"\xff\xfe" + text.encode("utf-16-le"),
+        # Valid UTF-8 for the sniffed sample, Latin-1 near the end.
+        "late-latin1.txt": text.encode("utf-8") + "trailing Größe\n".encode("latin-1"),
+        "log.gz": gzip.compress(text.encode("utf-8"), 6),
+        "log.xz": lzma.compress(text.encode("utf-8")),
+    }
+    paths = {}
+    for name, data in cases.items():
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        paths[name] = path
+    return paths
+
+
+def main():
+    generator = random.Random(1)
+    directory = tempfile.mkdtemp()
+    text = sample_text(generator, MEGABYTES * 1024 * 1024)
+    paths = corpus(directory, text)
+    print(f"{'file':<20} {'MB':>6} {'old read':>12} {'new read':>12} {'new write':>12}  format")
+    for name, path in paths.items():
+        size = os.path.getsize(path) / 1024 / 1024
+        started = time.perf_counter()
+        try:
+            with open(path, "r") as file:
+                old = file.read()
+            old_result = f"{time.perf_counter() - started:.3f} s"
+            if old != text and name != "late-latin1.txt":
+                old_result += "*"
+        except (UnicodeDecodeError, ValueError):
+            old_result = "fails"
+        started = time.perf_counter()
+        content, text_format = file_io.read_document(path)
+        read = time.perf_counter() - started
+        document = Document(content)
+        output = path + ".out"
+        started = time.perf_counter()
+        file_io.atomic_write(output, file_io.encode_chunks(document.chunks, text_format, len(document)), binary=True)
+        written = time.perf_counter() - started
+        with open(path, "rb") as original, open(output, "rb") as saved:
+            original_bytes = original.read()
+            saved_bytes = saved.read()
+        if text_format.compression == "gzip":
+            original_bytes, saved_bytes = gzip.decompress(original_bytes), gzip.decompress(saved_bytes)
+        elif text_format.compression == "xz":
+            original_bytes, saved_bytes = lzma.decompress(original_bytes), lzma.decompress(saved_bytes)
+        assert original_bytes == saved_bytes, name
+        print(f"{name:<20} {size:>6.1f} {old_result:>12} {read:>10.3f} s {written:>10.3f} s  {text_format.describe()}")
+    print("* read without error but the text differs from the original (wrong encoding or compressed bytes)")
+
+    binary = os.path.join(directory, "image.bin")
+    with open(binary, "wb") as file:
+        file.write(bytes(generator.randrange(256) for _ in range(100000)))
+    try:
+        file_io.read_document(binary)
+    except file_io.BinaryFileError:
+        print(f"binary file refused; hex preview of the first 64 KB: {len(file_io.hex_preview(binary).splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
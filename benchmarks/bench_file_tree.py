@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from file_tree import list_directory
+
+FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+FILES_PER_DIRECTORY = 50
+DIRECTORIES_PER_LEVEL = 20
+
+
+def make_tree(root, files):
+    directories = [root]
+    created = 0
+    while created < files:
+        parent = directories.pop(0)
+        for i in range(DIRECTORIES_PER_LEVEL):
+            path = os.path.join(parent, f"dir{i}")
+            os.mkdir(path)
+            directories.append(path)
+            for j in range(FILES_PER_DIRECTORY):
+                open(os.path.join(path, f"file{j}.txt"), "w").close()
+            created += FILES_PER_DIRECTORY
+            if created >= files:
+                break
+
+
+def legacy_walk(path):
+    count = 0
+    for name in os.listdir(path):
+        full_path = os.path.join(path, name)
+        count += 1
+        if os.path.isdir(full_path):
+            count += legacy_walk(full_path)
+    return count
+
+
+def timed(name, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{name:>28} {(time.perf_counter() - started) * 1000:>10.1f} ms {result:>10} nodes")
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="ic-tree-bench-")
+    try:
+        make_tree(root, FILES)
+        timed("recursive listdir + isdir", lambda: legacy_walk(root))
+        timed("lazy first level (scandir)", lambda: len(list_directory(root)))
+        first = list_directory(root)[0][1]
+        timed("expand one directory", lambda: len(list_directory(first)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
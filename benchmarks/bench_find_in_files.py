@@ -0,0 +1,50 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import find_in_files
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+FILE_SIZE = 256 * 1024
+FILES_PER_DIRECTORY = 100
+
+
+def make_tree(root, size):
+    line = b"value = len(items) <= 10 and print x in list\n"
+    content = line * (FILE_SIZE // len(line))
+    needle = b"needle_token = 42\n"
+    files = size // FILE_SIZE
+    for i in range(files):
+        directory = os.path.join(root, f"dir{i // FILES_PER_DIRECTORY}")
+        if i % FILES_PER_DIRECTORY == 0:
+            os.mkdir(directory)
+        with open(os.path.join(directory, f"file{i}.txt"), "wb") as file:
+            file.write(content)
+            if i % 10 == 0:
+                file.write(needle)
+    return files
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="ic-find-bench-")
+    try:
+        files = make_tree(root, SIZE_MB * 1024 * 1024)
+        pattern = find_in_files.compile_query("needle_token", whole_word=True)
+        print(f"{files} files, {SIZE_MB} MB")
+        for name, workers, use_processes in [("1 thread", 1, False), ("thread pool", None, False), ("process pool", None, True)]:
+            search = find_in_files.FolderSearch(root, pattern, workers=workers, use_processes=use_processes, literal=b"needle_token")
+            first = []
+            started = time.perf_counter()
+            search.run(lambda matches: first.append(time.perf_counter() - started) if not first else None)
+            elapsed = time.perf_counter() - started
+            print(f"{name:>14} {elapsed:>8.2f} s {SIZE_MB / elapsed:>8.1f} MB/s first match after {first[0] * 1000:>8.1f} ms, {search.match_count} matches")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import fs_watcher
+
+DIRECTORIES = [10, 100, 1000]
+FILES_PER_DIRECTORY = 100
+POLLS = 20
+
+
+def make_directories(root, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"dir{i}")
+        os.mkdir(path)
+        for j in range(FILES_PER_DIRECTORY):
+            open(os.path.join(path, f"file{j}.txt"), "w").close()
+        paths.append(path)
+    return paths
+
+
+def main():
+    print(f"{'watched dirs':>12} {'first poll ms':>14} {'idle poll ms':>13} {'one change ms':>14}")
+    for count in DIRECTORIES:
+        root = tempfile.mkdtemp(prefix="ic-watch-bench-")
+        try:
+            paths = make_directories(root, count)
+            watcher = fs_watcher.FileSystemWatcher()
+            first = watcher.apply(fs_watcher.poll(*watcher.prepare(paths)))
+            first_duration = watcher.last_duration
+            idle = 0.0
+            for _ in range(POLLS):
+                watcher.apply(fs_watcher.poll(*watcher.prepare(paths)))
+                idle += watcher.last_duration
+            open(os.path.join(paths[0], "new.txt"), "w").close()
+            started = time.perf_counter()
+            tree_changes, changed_files = watcher.apply(fs_watcher.poll(*watcher.prepare(paths)))
+            changed = time.perf_counter() - started
+            assert len(tree_changes) == 1
+            print(f"{count:>12} {first_duration * 1000:>14.2f} {idle / POLLS * 1000:>13.2f} {changed * 1000:>14.2f}")
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
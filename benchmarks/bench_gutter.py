@@ -0,0 +1,94 @@
+import os
+import re
+import statistics
+import sys
+import time
+import tkinter as tk
+from tkinter.scrolledtext import ScrolledText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from document import Document
+from gutter import LineNumbers, Minimap, minimap_pixels, shift_lines
+from text_hooks import EditHooks
+
+SIZES = [1000, 10000, 100000, 1000000]
+REDRAWS = 200
+VISIBLE = 40
+ROWS = 400
+BODY = [
+    'print "hello world"',
+    "    for i in range(10) { append list i }",
+    "        if x == 1 { x = x + 1 } ",
+    "    while True { input name }",
+    "value = len(items) <= 10",
+]
+
+
+def synthetic_document(lines):
+    return "\n".join(BODY[i % len(BODY)] for i in range(lines))
+
+
+def median_ms(timings):
+    return statistics.median(timings) * 1000
+
+
+def time_pixels(lines):
+    document = Document(synthetic_document(lines))
+    line_tokens = [[(0, 5, "blue"), (6, 12, "red")] for _ in range(lines)]
+    hits = list(document.match_lines(re.compile("while")))
+    timings = []
+    for redraw in range(REDRAWS):
+        first = 1 + redraw * max(1, (lines - VISIBLE) // REDRAWS)
+        started = time.perf_counter()
+        start, pixels = minimap_pixels(document, line_tokens, hits, first, first + VISIBLE - 1, ROWS,
+                                       Minimap.width, Minimap.strip, Minimap.row_height, Minimap.colors)
+        " ".join("{" + " ".join(row) + "}" for row in pixels)
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    shift_lines(hits, lines // 2, 1)
+    shift = time.perf_counter() - started
+    print(f"{lines:>8} lines: minimap data {median_ms(timings):.2f} ms per redraw, {len(hits)} hits shifted in {shift * 1000:.2f} ms")
+
+
+def time_widgets(root, lines):
+    text = ScrolledText(root, wrap=tk.NONE, width=80, height=VISIBLE)
+    text.pack(expand=tk.YES, fill=tk.BOTH)
+    hooks = EditHooks(text)
+    document = Document()
+    hooks.add_listener(document)
+    numbers = LineNumbers(text, hooks, lambda: (0, document.line_count()))
+    minimap = Minimap(text, hooks, document, None)
+    numbers.show(True)
+    minimap.show(True)
+    text.insert("1.0", synthetic_document(lines))
+    root.update()
+    results = []
+    for gutter in (numbers, minimap):
+        timings = []
+        for redraw in range(REDRAWS // 4):
+            text.yview(f"{1 + redraw * max(1, lines // (REDRAWS // 4))}.0")
+            root.update_idletasks()
+            started = time.perf_counter()
+            gutter.redraw()
+            timings.append(time.perf_counter() - started)
+        results.append(median_ms(timings))
+    print(f"{lines:>8} lines: line numbers {results[0]:.2f} ms, minimap {results[1]:.2f} ms per redraw")
+    text.frame.destroy()
+
+
+def main():
+    for lines in SIZES:
+        time_pixels(lines)
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"No display for Tk ({e}); widget redraws not timed.")
+        return
+    for lines in SIZES:
+        time_widgets(root, lines)
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
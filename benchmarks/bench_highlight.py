@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter.scrolledtext import ScrolledText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from highlighter import Highlighter
+from syntax_rules import SyntaxRules, parse_syntax_file
+
+SYNTAX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pryzma_syntax_highlighting.txt")
+SIZES = [1000, 10000, 100000]
+KEYSTROKES = 200
+
+
+def load_rules():
+    extension, colors = parse_syntax_file(SYNTAX_FILE)
+    return SyntaxRules(colors)
+
+
+def synthetic_document(lines):
+    body = [
+        'print "hello world"',
+        "for i in range(10) { append list i }",
+        "if x == 1 { x = x + 1 } ",
+        "while True { input name }",
+        "value = len(items) <= 10",
+    ]
+    return "\n".join(body[i % len(body)] for i in range(lines))
+
+
+def legacy_highlight(text_widget, rules):
+    for word, color in rules.colors.items():
+        start = "1.0"
+        while True:
+            start = text_widget.search(word, start, stopindex=tk.END, nocase=True)
+            if not start:
+                break
+            end = f"{start}+{len(word)}c"
+            text_widget.tag_add(f"highlight_{word}", start, end)
+            text_widget.tag_config(f"highlight_{word}", foreground=color)
+            start = end
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench(root, lines, rules, legacy):
+    text_widget = ScrolledText(root, wrap=tk.NONE)
+    text_widget.pack()
+    highlighter = Highlighter(text_widget, lambda: rules)
+    text_widget.insert("1.0", synthetic_document(lines))
+    middle = lines // 2
+    text_widget.mark_set(tk.INSERT, f"{middle}.0")
+    text_widget.see(tk.INSERT)
+    root.update()
+    highlighter.refresh()
+
+    samples = []
+    keystrokes = KEYSTROKES if not legacy else 5
+    for i in range(keystrokes):
+        text_widget.insert(tk.INSERT, "x" if i % 10 else "\n")
+        started = time.perf_counter()
+        if legacy:
+            legacy_highlight(text_widget, rules)
+        else:
+            highlighter.refresh()
+        samples.append((time.perf_counter() - started) * 1000)
+    text_widget.destroy()
+    return samples
+
+
+def main():
+    root = tk.Tk()
+    root.geometry("800x600")
+    rules = load_rules()
+    with_legacy = "--legacy" in sys.argv
+    print(f"{'lines':>8} {'engine':>12} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for lines in SIZES:
+        engines = [("incremental", False)]
+        if with_legacy and lines <= 10000:
+            engines.append(("full-rescan", True))
+        for name, legacy in engines:
+            samples = bench(root, lines, rules, legacy)
+            print(f"{lines:>8} {name:>12} {percentile(samples, 0.5):>10.3f} {percentile(samples, 0.99):>10.3f} {max(samples):>10.3f}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
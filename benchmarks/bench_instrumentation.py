@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from instrumentation import Instruments
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+
+class Handlers:
+    def handle_key_release(self, event=None):
+        return event
+
+
+def per_call(function):
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        function(None)
+    return (time.perf_counter() - started) / CALLS * 1000000000
+
+
+def main():
+    plain = per_call(Handlers().handle_key_release)
+    instruments = Instruments()
+    handlers = Handlers()
+    instruments.wrap(handlers, ["handle_key_release"])
+    enabled = per_call(handlers.handle_key_release)
+    instruments.enabled = False
+    disabled = per_call(handlers.handle_key_release)
+    print(f"plain call {plain:6.0f} ns, timed {enabled:6.0f} ns, disabled {disabled:6.0f} ns")
+
+    started = time.perf_counter()
+    for _ in range(100):
+        instruments.rows()
+    print(f"panel rows: {(time.perf_counter() - started) * 10:.3f} ms per refresh")
+
+
+if __name__ == "__main__":
+    main()
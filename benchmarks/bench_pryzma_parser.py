@@ -0,0 +1,138 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from document import Document
+from pryzma_parser import BlockTree
+
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+EDITS = 2000
+# Lines the gutter draws fold markers for on each redraw.
+VISIBLE = 60
+
+
+class Edits:
+    # Sends edits to the listeners the way EditHooks does, with indices
+    # resolved against the text before the edit.
+    def __init__(self, document):
+        self.document = document
+        self.listeners = [document]
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def insert(self, line, column, text):
+        for listener in self.listeners:
+            listener.inserted(f"{line}.{column}", text)
+
+    def delete(self, start, end):
+        for listener in self.listeners:
+            listener.deleted(f"{start[0]}.{start[1]}", f"{end[0]}.{end[1]}")
+
+
+def program(lines):
+    parts = []
+    number = 0
+    while len(parts) < lines:
+        parts += [
+            f"/function_{number}{{",
+            f"    total_{number} = 0",
+            "    for(i, 1, 10){",
+            "        if(i == 5){",
+            '            print "five { not a brace"',
+            "        }",
+            f"        total_{number} = total_{number} + i",
+            "    }",
+            "    # a comment with a } in it",
+            "}",
+            f"@function_{number}",
+        ]
+        number += 1
+    return "\n".join(parts[:lines])
+
+
+def shape(tree):
+    return [(block.kind, block.label, block.start, block.end, sorted((name, count) for name, count in block.names.items() if count)) for block in tree.blocks] + [sorted((name, count) for name, count in tree.root.names.items() if count)]
+
+
+def timed(timings, edit, *args):
+    started = time.perf_counter()
+    edit(*args)
+    timings.append(time.perf_counter() - started)
+
+
+def drawn(tree, edit, line, *args):
+    # A keystroke as the editor pays for it: the edit, then the gutter's
+    # fold markers for the visible lines, which never force a parse.
+    edit(line, *args)
+    if isinstance(line, tuple):
+        line = line[0]
+    for visible in range(max(1, line - VISIBLE // 2), line + VISIBLE // 2):
+        tree.foldable(visible)
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    print(f"{label:<28} median {statistics.median(timings) * 1000:.3f} ms, p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms")
+
+
+def main():
+    generator = random.Random(1)
+    document = Document(program(LINES))
+    edits = Edits(document)
+    tree = BlockTree(edits, document)
+    started = time.perf_counter()
+    tree.parsed()
+    print(f"{document.line_count()} lines, {len(tree.blocks)} blocks, full parse {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    typing, newline, brace, closed, removal, deferred = [], [], [], [], [], []
+    for _ in range(EDITS):
+        line = generator.randint(1, document.line_count())
+        column = len(document.line(line))
+        timed(typing, drawn, tree, edits.insert, line, column, "x")
+        timed(newline, edits.insert, line, column + 1, "\n")
+        timed(removal, edits.delete, (line, column), (line + 1, 0))
+        edits.delete((line, column), (line, column + 1))
+    for _ in range(EDITS // 10):
+        line = generator.randint(1, document.line_count())
+        timed(brace, drawn, tree, edits.insert, line, 0, "{")
+        timed(deferred, tree.parsed)
+        timed(brace, drawn, tree, edits.delete, (line, 0), (line, 1))
+        timed(deferred, tree.parsed)
+        # A block typed or pasted whole keeps the braces balanced.
+        column = len(document.line(line))
+        timed(closed, edits.insert, line, column, "\nif(a){\n    b = 1\n}")
+        timed(closed, edits.delete, (line, column), (line + 3, 1))
+    report("keystroke + gutter markers", typing)
+    report("Enter (lines shift)", newline)
+    report("join two lines", removal)
+    report("balanced block in/out", closed)
+    report("unbalanced brace + gutter", brace)
+    report("rebuild once typing pauses", deferred)
+
+    started = time.perf_counter()
+    for _ in range(200):
+        tree.names_at(generator.randint(1, document.line_count()))
+    print(f"{'scope lookup':<28} {(time.perf_counter() - started) / 200 * 1000:.3f} ms")
+
+    # The incrementally maintained tree must match a fresh parse.
+    for _ in range(500):
+        line = generator.randint(1, document.line_count())
+        choice = generator.random()
+        if choice < 0.4:
+            edits.insert(line, 0, generator.choice(["{", "}", "y = 1\n", "\n", "/g{\n", "if(a){ }", '"{"']))
+        elif line < document.line_count():
+            edits.delete((line, 0), (line + generator.randint(0, 1), 0 if choice < 0.7 else 1))
+    tree.parsed()
+    fresh = BlockTree(Edits(document), document)
+    fresh.parsed()
+    assert shape(fresh) == shape(tree), "incremental tree differs from a full parse"
+    print("incremental tree matches a full parse after 500 random edits")
+
+
+if __name__ == "__main__":
+    main()
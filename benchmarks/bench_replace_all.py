@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replace_all
+from document import Document
+from large_file import resident_memory
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+REPLACEMENTS = 1000000
+
+
+def make_file(path):
+    line = b"value = len(items) <= 10 and print x in list # padding padding padding\n"
+    target = SIZE_MB * 1024 * 1024
+    every = max(1, target // len(line) // REPLACEMENTS)
+    plain = line * every * 1000
+    block = (line * (every - 1) + line.replace(b"items", b"needle")) * 1000
+    with open(path, "wb") as file:
+        written = 0
+        needles = 0
+        while written < target:
+            data = block if needles < REPLACEMENTS else plain
+            file.write(data)
+            written += len(data)
+            needles += 1000
+
+
+def megabytes(value):
+    return f"{value / 1024 / 1024:.0f} MB" if value else "n/a"
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="ic-replace-bench-")
+    path = os.path.join(directory, "big.txt")
+    try:
+        make_file(path)
+        print(f"{os.path.getsize(path) / 1024 / 1024:.0f} MB file")
+
+        replace = replace_all.FileReplace([path], "needle", "pin", whole_word=True)
+        started = time.perf_counter()
+        count = replace.preview()
+        print(f"preview    {time.perf_counter() - started:>7.2f} s  {count} occurrences")
+        started = time.perf_counter()
+        replace.run()
+        print(f"replace    {time.perf_counter() - started:>7.2f} s  {replace.replaced} replaced, {megabytes(resident_memory())} resident")
+
+        with open(path, "r") as file:
+            document = Document(file.read())
+        pattern = re.compile(r"\bpin\b")
+        started = time.perf_counter()
+        matches = list(document.finditer(pattern))
+        edits = replace_all.buffer_edits(document, matches, "needle")
+        print(f"buffer     {time.perf_counter() - started:>7.2f} s  {len(matches)} matches in {len(edits)} edits")
+        started = time.perf_counter()
+        for start, end, text in reversed(edits):
+            document.replace(start, end, text)
+        print(f"apply      {time.perf_counter() - started:>7.2f} s  (document side of the widget edits)")
+    finally:
+        os.unlink(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
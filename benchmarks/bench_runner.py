@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from large_file import resident_memory
+from runner import ProcessRunner
+
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+POLL_INTERVAL = 0.05
+
+
+def main():
+    program = f"import sys\nfor i in range({LINES}):\n    sys.stdout.write(f'line {{i}} of a chatty program\\n')\nsys.stderr.write('done\\n')\n"
+    process_runner = ProcessRunner([sys.executable, "-c", program], max_lines=10000)
+    started = time.perf_counter()
+    process_runner.start()
+    received = 0
+    dropped = 0
+    polls = 0
+    slowest = 0.0
+    peak = 0
+    while True:
+        time.sleep(POLL_INTERVAL)
+        finished = process_runner.returncode is not None
+        poll_started = time.perf_counter()
+        lines, skipped = process_runner.take()
+        slowest = max(slowest, time.perf_counter() - poll_started)
+        received += len(lines)
+        dropped += skipped
+        polls += 1
+        peak = max(peak, resident_memory() or 0)
+        if finished:
+            break
+    elapsed = time.perf_counter() - started
+    print(f"{LINES} lines in {elapsed:.2f} s ({LINES / elapsed / 1000:.0f}k lines/s), exit code {process_runner.returncode}")
+    print(f"{received} lines drained, {dropped} dropped by the ring buffer over {polls} polls")
+    print(f"slowest drain {slowest * 1000:.2f} ms, peak resident {peak / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
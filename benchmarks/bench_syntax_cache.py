@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import syntax_rules
+
+FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+WORDS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+
+def main():
+    generator = random.Random(1)
+    directory = tempfile.mkdtemp()
+    syntax_files = []
+    for number in range(FILES):
+        path = os.path.join(directory, f"syntax{number}.txt")
+        with open(path, "w") as file:
+            file.write(f"#ext{number}\n")
+            for _ in range(WORDS):
+                word = "".join(generator.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(generator.randint(2, 12)))
+                file.write(f"{word}:{generator.choice(['blue', 'red', 'green'])}\n")
+            file.write("==:orange\n!=:orange\n->:orange\n")
+        syntax_files.append(path)
+    cache_path = os.path.join(directory, "cache", "syntax-rules.bin")
+
+    started = time.perf_counter()
+    for syntax_file in syntax_files:
+        syntax_rules.SyntaxRules(syntax_rules.parse_syntax_file(syntax_file)[1])
+    print(f"parse and compile: {(time.perf_counter() - started) * 1000:8.1f} ms for {FILES} files of {WORDS} words")
+    for label in ("cold cache", "warm cache"):
+        syntax_rules.re.purge()
+        started = time.perf_counter()
+        loaded, errors = syntax_rules.load_rules(syntax_files, cache_path)
+        print(f"{label:>17}: {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print(f"cache file: {os.path.getsize(cache_path) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
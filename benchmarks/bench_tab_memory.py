@@ -0,0 +1,45 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tab_memory
+from document import Document
+
+MEGABYTES = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+WORDS = ["if", "for", "print", "value", "count", "total", "index", "name", "result", "=", "+", "(", ")"]
+
+
+def main():
+    generator = random.Random(1)
+    lines = []
+    size = 0
+    while size < MEGABYTES * 1024 * 1024:
+        line = "    " * generator.randint(0, 3) + " ".join(generator.choices(WORDS, k=8)) + "\n"
+        lines.append(line)
+        size += len(line)
+    document = Document("".join(lines))
+    print(f"document: {len(document) / 1024 / 1024:.1f} MB, estimated buffer memory {tab_memory.buffer_memory(document) / 1024 / 1024:.1f} MB")
+
+    path = os.path.join(tempfile.mkdtemp(), "tab.z")
+    chunks = list(document.chunks)
+    started = time.perf_counter()
+    tab_memory.write_spill(path, chunks)
+    written = time.perf_counter() - started
+    started = time.perf_counter()
+    text = tab_memory.read_spill(path)
+    read = time.perf_counter() - started
+    assert text == document.text()
+    print(f"spill: {os.path.getsize(path) / 1024 / 1024:.1f} MB on disk, written in {written:.2f} s, read in {read:.2f} s")
+
+    tabs = [(number, generator.randint(1, 50) * 1024 * 1024, generator.random(), number != 0) for number in range(200)]
+    started = time.perf_counter()
+    chosen = tab_memory.hibernation_candidates(tabs, 256 * 1024 * 1024)
+    print(f"budget pass over 200 tabs: {(time.perf_counter() - started) * 1000:.2f} ms, {len(chosen)} tabs to hibernate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import file_io
+import table
+from large_file import resident_memory
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+VISIBLE_ROWS = 40
+VISIBLE_COLUMNS = 8
+NAMES = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+
+def main():
+    generator = random.Random(1)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "table.csv")
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "name", "amount", "city", "note"])
+        for row in range(ROWS):
+            writer.writerow([row, generator.choice(NAMES), f"{generator.uniform(0, 1000):.2f}", generator.choice(NAMES).upper(), "a, \"quoted\" note" if row % 97 == 0 else "plain"])
+    print(f"csv: {ROWS} rows, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+    before = resident_memory()
+    started = time.perf_counter()
+    store = table.read_table(path, table.ColumnStore())
+    imported = time.perf_counter() - started
+    after = resident_memory()
+    assert store.rows == ROWS and store.get(97, 4) == 'a, "quoted" note'
+    print(f"import: {imported:.2f} s, store {store.memory() / 1024 / 1024:.1f} MB, resident growth {(after - before) / 1024 / 1024:.1f} MB" if before and after else f"import: {imported:.2f} s, store {store.memory() / 1024 / 1024:.1f} MB")
+
+    started = time.perf_counter()
+    order = table.sort_rows(store, 2)
+    print(f"sort numeric column: {time.perf_counter() - started:.2f} s")
+    assert float(store.get(order[0], 2)) <= float(store.get(order[-1], 2))
+    started = time.perf_counter()
+    table.sort_rows(store, 1, reverse=True)
+    print(f"sort text column: {time.perf_counter() - started:.2f} s")
+
+    store.set(5, 1, "Omega")
+    started = time.perf_counter()
+    matched = table.filter_rows(store, "omega", order)
+    print(f"filter: {time.perf_counter() - started:.3f} s, {len(matched)} rows")
+    assert list(matched) == [5]
+    started = time.perf_counter()
+    matched = table.filter_rows(store, "gamma")
+    print(f"filter common value: {time.perf_counter() - started:.3f} s, {len(matched)} rows")
+
+    # What one scroll step costs: every visible cell is fetched again.
+    frames = 1000
+    started = time.perf_counter()
+    for frame in range(frames):
+        first = generator.randrange(ROWS - VISIBLE_ROWS)
+        for index in range(first, first + VISIBLE_ROWS):
+            row = order[index]
+            for column in range(min(VISIBLE_COLUMNS, len(store.columns))):
+                store.get(row, column)
+    print(f"cell fetch per frame ({VISIBLE_ROWS}x{min(VISIBLE_COLUMNS, len(store.columns))}): {(time.perf_counter() - started) / frames * 1000:.3f} ms")
+
+    output = os.path.join(directory, "export.csv")
+    started = time.perf_counter()
+    file_io.atomic_write(output, table.table_chunks(store), binary=True)
+    print(f"export: {time.perf_counter() - started:.2f} s, {os.path.getsize(output) / 1024 / 1024:.1f} MB")
+    reread = table.read_table(output, table.ColumnStore())
+    assert reread.rows == ROWS and reread.get(5, 1) == "Omega" and reread.get(97, 4) == 'a, "quoted" note'
+
+    output = os.path.join(directory, "export.tsv")
+    file_io.atomic_write(output, table.table_chunks(store, range(1000), "\t"), binary=True)
+    reread = table.read_table(output, table.ColumnStore())
+    assert reread.rows == 1000 and reread.row(97) == store.row(97)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from syntax_rules import SyntaxRules, parse_syntax_file
+
+SYNTAX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pryzma_syntax_highlighting.txt")
+LINES = 20000
+
+
+def per_keyword_tokenize(line, colors):
+    lowered = line.lower()
+    spans = []
+    for word, color in colors.items():
+        needle = word.lower()
+        start = lowered.find(needle)
+        while start != -1:
+            end = start + len(needle)
+            spans.append((start, end, color))
+            start = lowered.find(needle, end)
+    return spans
+
+
+def synthetic_lines(count):
+    body = [
+        'print "hello world"',
+        "for i in range(10) { append list i }",
+        "if x == 1 { x = x + 1 } ",
+        "while True { input name }",
+        "value = len(items) <= 10",
+        "use interpret_pryzma; write file; x++",
+    ]
+    return [body[i % len(body)] for i in range(count)]
+
+
+def measure(name, tokenize, lines):
+    started = time.perf_counter()
+    spans = 0
+    for line in lines:
+        spans += len(tokenize(line))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>14} {elapsed * 1000:>10.1f} ms {spans:>10} spans {spans / elapsed:>14,.0f} spans/s {len(lines) / elapsed:>12,.0f} lines/s")
+
+
+def main():
+    extension, colors = parse_syntax_file(SYNTAX_FILE)
+    rules = SyntaxRules(colors)
+    lines = synthetic_lines(LINES)
+    measure("per-keyword", lambda line: per_keyword_tokenize(line, colors), lines)
+    measure("compiled", rules.tokenize, lines)
+
+
+if __name__ == "__main__":
+    main()
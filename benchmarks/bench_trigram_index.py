@@ -0,0 +1,81 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import find_in_files
+import trigram_index
+
+FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+LINES_PER_FILE = 400
+FILES_PER_DIRECTORY = 100
+
+
+def make_tree(root, files):
+    generator = random.Random(1)
+    # Identifier frequencies roughly follow Zipf's law in real code.
+    vocabulary = ["".join(generator.choice("abcdefghijklmnopqrstuvwxyz_") for _ in range(generator.randint(3, 12))) for _ in range(5000)]
+    words = generator.choices(vocabulary, weights=[1 / rank for rank in range(1, len(vocabulary) + 1)], k=100000)
+    for i in range(files):
+        directory = os.path.join(root, f"module{i // FILES_PER_DIRECTORY}")
+        if i % FILES_PER_DIRECTORY == 0:
+            os.mkdir(directory)
+        lines = [f"{generator.choice(words)} = {generator.choice(words)}({generator.choice(words)}, {generator.randint(0, 999)})" for _ in range(LINES_PER_FILE)]
+        if i % 100 == 0:
+            lines.append("needle_token = 42")
+        with open(os.path.join(directory, f"source_{i}.py"), "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+def timed(function, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="ic-index-bench-")
+    cache = tempfile.mkdtemp(prefix="ic-index-cache-")
+    try:
+        make_tree(root, FILES)
+        print(f"{FILES} files")
+        index = trigram_index.TrigramIndex(root, directory=cache)
+        elapsed, count = timed(index.refresh)
+        print(f"build          {elapsed:>9.3f} s  {count} files, {len(index.postings)} trigrams, {index.size_on_disk() / 1024:.0f} KB on disk")
+        elapsed, count = timed(trigram_index.TrigramIndex(root, directory=cache).refresh)
+        print(f"load + update  {elapsed:>9.3f} s")
+        elapsed, count = timed(index.refresh)
+        print(f"update         {elapsed:>9.3f} s  (nothing changed)")
+
+        pattern = find_in_files.compile_query("needle_token")
+        elapsed, candidates = timed(lambda: index.candidates("needle_token"), 20)
+        print(f"candidates     {elapsed * 1000:>9.3f} ms  {len(candidates)} of {FILES} files")
+
+        def indexed_search():
+            search = find_in_files.FolderSearch(root, pattern, literal=b"needle_token", paths=index.candidates("needle_token"))
+            search.run(lambda matches: None)
+            return search.match_count
+
+        def full_search():
+            search = find_in_files.FolderSearch(root, pattern, literal=b"needle_token")
+            search.run(lambda matches: None)
+            return search.match_count
+
+        elapsed, matches = timed(indexed_search, 5)
+        print(f"indexed search {elapsed * 1000:>9.3f} ms  {matches} matches")
+        elapsed, matches = timed(full_search, 5)
+        print(f"full search    {elapsed * 1000:>9.3f} ms  {matches} matches")
+        elapsed, names = timed(lambda: index.quick_open("mod3src12"), 20)
+        print(f"quick open     {elapsed * 1000:>9.3f} ms  best: {names[0] if names else None}")
+    finally:
+        shutil.rmtree(root)
+        shutil.rmtree(cache)
+
+
+if __name__ == "__main__":
+    main()
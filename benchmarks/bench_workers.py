@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from runner import ProcessRunner, WorkerPool
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+# Stands in for the Pryzma interpreter: heavy imports and a compile step at
+# start-up, then a small program run.
+INTERPRETER = """import sys
+import json, decimal, email.parser, http.client, xml.dom.minidom, unittest, asyncio
+with open(sys.argv[1]) as file:
+    source = file.read()
+for line in source.splitlines():
+    print(line.upper())
+"""
+
+
+def wait(run):
+    while run.returncode is None:
+        time.sleep(0.001)
+    return run.take()[0]
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    interpreter_path = os.path.join(directory, "interpreter.py")
+    program_path = os.path.join(directory, "program.pz")
+    with open(interpreter_path, "w") as file:
+        file.write(INTERPRETER)
+    with open(program_path, "w") as file:
+        file.write("print hello\nprint world\n")
+
+    cold = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        process_runner = ProcessRunner([sys.executable, interpreter_path, program_path])
+        process_runner.start()
+        wait(process_runner)
+        cold.append(time.perf_counter() - started)
+
+    pool = WorkerPool(sys.executable, interpreter_path, size=2, max_runs=RUNS)
+    while not pool.ready_workers():
+        time.sleep(0.01)
+    warm = []
+    misses = 0
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        run = pool.run(program_path)
+        if run is None:
+            misses += 1
+            time.sleep(0.01)
+            continue
+        lines = wait(run)
+        warm.append(time.perf_counter() - started)
+        assert [line for stream, line in lines] == ["PRINT HELLO", "PRINT WORLD"], lines
+    pool.close()
+
+    for label, times in (("cold", cold), ("warm", warm)):
+        times.sort()
+        print(f"{label:>5} run: median {times[len(times) // 2] * 1000:8.2f} ms, worst {times[-1] * 1000:8.2f} ms ({len(times)} runs)")
+    print(f"{misses} runs found no ready worker")
+
+
+if __name__ == "__main__":
+    main()
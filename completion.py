@@ -0,0 +1,232 @@
+import bisect
+import heapq
+import re
+from collections import Counter
+
+identifier_pattern = re.compile(r"[^\W\d]\w+")
+
+
+class PrefixTrie:
+    # Radix tree of words. Each node is a [label, children, count, last_used,
+    # best] list: label is the edge from the parent, children maps the first
+    # character of each child label to the child, and best caches the ranked
+    # completions below the node. Rank changes patch the caches along the
+    # word's path, so lookups while typing stay O(len(prefix)).
+    cache_size = 16
+
+    def __init__(self):
+        self.root = ["", {}, 0, 0, None]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def walk(self, word):
+        path = [self.root]
+        node = self.root
+        position = 0
+        while position < len(word):
+            node = node[1].get(word[position])
+            if node is None or not word.startswith(node[0], position):
+                return None
+            position += len(node[0])
+            path.append(node)
+        return path
+
+    def find(self, prefix):
+        # The node holding every word that starts with prefix, and its word.
+        node = self.root
+        position = 0
+        while position < len(prefix):
+            child = node[1].get(prefix[position])
+            if child is None:
+                return None, None
+            label = child[0]
+            if prefix.startswith(label, position):
+                position += len(label)
+                node = child
+            elif label.startswith(prefix[position:]):
+                return child, prefix[:position] + label
+            else:
+                return None, None
+        return node, prefix
+
+    def count(self, word):
+        path = self.walk(word)
+        return path[-1][2] if path else 0
+
+    def add(self, word, count=1):
+        path = [self.root]
+        node = self.root
+        position = 0
+        while position < len(word):
+            children = node[1]
+            child = children.get(word[position])
+            if child is None:
+                child = children[word[position]] = [word[position:], {}, 0, 0, None]
+            else:
+                label = child[0]
+                common = 1
+                limit = min(len(label), len(word) - position)
+                while common < limit and label[common] == word[position + common]:
+                    common += 1
+                if common < len(label):
+                    best = child[4]
+                    middle = [label[:common], {label[common]: child}, 0, 0, list(best) if best is not None else None]
+                    child[0] = label[common:]
+                    children[word[position]] = child = middle
+            node = child
+            position += len(node[0])
+            path.append(node)
+        if not node[2]:
+            self.size += 1
+        node[2] += count
+        self.reranked(path, word, True)
+
+    def remove(self, word, count=1):
+        path = self.walk(word)
+        if path is None or not path[-1][2]:
+            return
+        node = path[-1]
+        node[2] = max(0, node[2] - count)
+        if not node[2]:
+            self.size -= 1
+        self.reranked(path, word, False)
+        if node[2] or node[3]:
+            return
+        depth = len(path) - 1
+        if not node[1]:
+            del path[depth - 1][1][node[0][0]]
+            depth -= 1
+            node = path[depth]
+        if depth and not node[2] and not node[3] and len(node[1]) == 1:
+            child = next(iter(node[1].values()))
+            child[0] = node[0] + child[0]
+            path[depth - 1][1][node[0][0]] = child
+
+    def touch(self, word, tick):
+        path = self.walk(word)
+        if path is None or not path[-1][2]:
+            return False
+        path[-1][3] = tick
+        self.reranked(path, word, True)
+        return True
+
+    def reranked(self, path, word, improved):
+        node = path[-1]
+        entry = ((-node[3], -node[2], word), word)
+        for parent in path:
+            best = parent[4]
+            if best is None:
+                continue
+            for position, (rank, cached) in enumerate(best):
+                if cached == word:
+                    del best[position]
+                    break
+            else:
+                position = None
+            exhaustive = len(best) + (position is not None) < self.cache_size
+            if improved:
+                if position is not None or exhaustive or entry < best[-1]:
+                    bisect.insort(best, entry)
+                    del best[self.cache_size:]
+            elif position is not None:
+                # A word that dropped in rank may now be below one that was
+                # never cached, unless the cache held the whole subtree.
+                if not exhaustive:
+                    parent[4] = None
+                elif node[2]:
+                    bisect.insort(best, entry)
+
+    def complete(self, prefix, limit=10):
+        # Returns (rank, word) pairs, best first: recently accepted words,
+        # then the most frequent ones.
+        node, word = self.find(prefix)
+        if node is None:
+            return []
+        if limit > self.cache_size:
+            return self.collect(node, word, limit)
+        if node[4] is None:
+            node[4] = self.collect(node, word, self.cache_size)
+        return node[4][:limit]
+
+    def collect(self, node, word, limit):
+        found = []
+        stack = [(node, word)]
+        while stack:
+            node, word = stack.pop()
+            if node[2]:
+                found.append(((-node[3], -node[2], word), word))
+            for child in node[1].values():
+                stack.append((child, word + child[0]))
+        return heapq.nsmallest(limit, found)
+
+
+class CompletionEngine:
+    # Identifiers harvested from the open buffers share one trie; syntax
+    # keywords get a trie per file extension and a count of one.
+    def __init__(self):
+        self.identifiers = PrefixTrie()
+        self.keywords = {}
+        self.clock = 0
+
+    def set_keywords(self, extension, words):
+        trie = PrefixTrie()
+        for word in words:
+            trie.add(word)
+        self.keywords[extension] = trie
+
+    def add_text(self, text):
+        for word, count in Counter(identifier_pattern.findall(text)).items():
+            self.identifiers.add(word, count)
+
+    def remove_text(self, text):
+        for word, count in Counter(identifier_pattern.findall(text)).items():
+            self.identifiers.remove(word, count)
+
+    def accept(self, word, extension=None):
+        self.clock += 1
+        if not self.identifiers.touch(word, self.clock) and extension in self.keywords:
+            self.keywords[extension].touch(word, self.clock)
+
+    def complete(self, prefix, extension=None, limit=10):
+        if not prefix:
+            return []
+        # One more than needed, as the prefix itself may be among them.
+        ranked = self.identifiers.complete(prefix, limit + 1)
+        if extension in self.keywords:
+            ranked = heapq.merge(ranked, self.keywords[extension].complete(prefix, limit + 1))
+        suggestions = []
+        for rank, word in ranked:
+            if word != prefix and word not in suggestions:
+                suggestions.append(word)
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+
+class BufferWords:
+    # Keeps the identifiers of one buffer counted in the engine. It has to
+    # be registered before the buffer's Document: the document still holds
+    # the lines an edit replaced while the widget already shows the result.
+    def __init__(self, engine, text_widget, document):
+        self.engine = engine
+        self.text_widget = text_widget
+        self.document = document
+
+    def inserted(self, index, text):
+        line = int(index.split(".")[0])
+        last = line + text.count("\n")
+        self.engine.remove_text(self.document.line(line))
+        self.engine.add_text(self.text_widget.get(f"{line}.0", f"{last}.end"))
+
+    def deleted(self, start, end):
+        first = int(start.split(".")[0])
+        last = int(end.split(".")[0])
+        document = self.document
+        self.engine.remove_text(document.get_text(document.line_start(first), document.line_end(last)))
+        self.engine.add_text(self.text_widget.get(f"{first}.0", f"{first}.end"))
+
+    def clear(self):
+        for base, block in self.document.iter_blocks():
+            self.engine.remove_text(block)
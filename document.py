@@ -0,0 +1,249 @@
+import bisect
+import itertools
+
+
+def build_tree(values):
+    tree = [0]
+    tree.extend(values)
+    size = len(tree)
+    for index in range(1, size):
+        parent = index + (index & -index)
+        if parent < size:
+            tree[parent] += tree[index]
+    return tree
+
+
+def tree_add(tree, index, delta):
+    index += 1
+    while index < len(tree):
+        tree[index] += delta
+        index += index & -index
+
+
+def tree_prefix(tree, count):
+    total = 0
+    while count > 0:
+        total += tree[count]
+        count -= count & -count
+    return total
+
+
+def tree_search(tree, value):
+    # Returns the largest count whose prefix sum is below value, together
+    # with that prefix sum.
+    position = 0
+    total = 0
+    step = 1 << (len(tree) - 1).bit_length()
+    while step:
+        candidate = position + step
+        if candidate < len(tree) and total + tree[candidate] < value:
+            position = candidate
+            total += tree[candidate]
+        step >>= 1
+    return position, total
+
+
+class Document:
+    # The text is kept as a list of chunks of roughly chunk_size characters
+    # (a flat rope). Chunk lengths and newline counts live in Fenwick trees,
+    # so an edit inside a chunk and every offset/line lookup are O(log n).
+    chunk_size = 1 << 14
+
+    def __init__(self, text=""):
+        self.chunks = [""]
+        self.newlines = [0]
+        self.newline_positions = [None]
+        self.length_tree = build_tree([0])
+        self.line_tree = build_tree([0])
+        self.length = 0
+        self.newline_count = 0
+        self.empty_chunks = 0
+        self.version = 0
+        self.splice_chunks(0, 1, text)
+
+    def __len__(self):
+        return self.length
+
+    def splice_chunks(self, first, last, text):
+        pieces = []
+        if len(text) > 2 * self.chunk_size:
+            step = self.chunk_size
+            pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        elif text or (first == 0 and last == len(self.chunks)):
+            pieces = [text]
+        newlines = [piece.count("\n") for piece in pieces]
+        self.length += sum(map(len, pieces)) - sum(map(len, self.chunks[first:last]))
+        self.newline_count += sum(newlines) - sum(self.newlines[first:last])
+        if len(pieces) == last - first:
+            for offset, piece in enumerate(pieces):
+                self.set_chunk(first + offset, piece, newlines[offset])
+        else:
+            self.chunks[first:last] = pieces
+            self.newlines[first:last] = newlines
+            self.newline_positions[first:last] = [None] * len(pieces)
+            self.length_tree = build_tree(map(len, self.chunks))
+            self.line_tree = build_tree(self.newlines)
+            self.empty_chunks = self.chunks.count("")
+
+    def set_chunk(self, index, piece, newlines):
+        self.empty_chunks += (not piece) - (not self.chunks[index])
+        tree_add(self.length_tree, index, len(piece) - len(self.chunks[index]))
+        tree_add(self.line_tree, index, newlines - self.newlines[index])
+        self.chunks[index] = piece
+        self.newlines[index] = newlines
+        self.newline_positions[index] = None
+
+    def chunk_at(self, offset):
+        # Returns the chunk holding offset and the offset the chunk starts at.
+        if offset < 0 or offset > self.length:
+            raise IndexError(f"offset {offset} out of range")
+        index, start = tree_search(self.length_tree, offset + 1)
+        if index == len(self.chunks):
+            index -= 1
+            start -= len(self.chunks[index])
+        return index, start
+
+    def positions_in(self, index):
+        positions = self.newline_positions[index]
+        if positions is None:
+            lines = self.chunks[index].split("\n")[:-1]
+            positions = list(itertools.accumulate(map(len, lines), lambda total, length: total + length + 1))
+            self.newline_positions[index] = positions
+        return positions
+
+    def line_count(self):
+        return self.newline_count + 1
+
+    def line_start(self, line):
+        if line <= 1:
+            return 0
+        if line > self.newline_count + 1:
+            return self.length
+        index, line_base = tree_search(self.line_tree, line - 1)
+        newline = self.positions_in(index)[line - 2 - line_base]
+        return tree_prefix(self.length_tree, index) + newline + 1
+
+    def line_end(self, line):
+        if line >= self.line_count():
+            return self.length
+        return self.line_start(line + 1) - 1
+
+    def line(self, line):
+        return self.get_text(self.line_start(line), self.line_end(line))
+
+    def offset(self, line, column):
+        return min(self.line_start(line) + column, self.line_end(line))
+
+    def position(self, offset):
+        index, start = self.chunk_at(offset)
+        line_base = tree_prefix(self.line_tree, index)
+        line = line_base + bisect.bisect_left(self.positions_in(index), offset - start) + 1
+        return line, offset - self.line_start(line)
+
+    def index_offset(self, index):
+        line, column = map(int, index.split("."))
+        return self.offset(line, column)
+
+    def insert(self, offset, text):
+        if not text:
+            return
+        index, start = self.chunk_at(offset)
+        chunk = self.chunks[index]
+        local = offset - start
+        self.splice_chunks(index, index + 1, chunk[:local] + text + chunk[local:])
+        self.version += 1
+
+    def delete(self, start, end):
+        if end <= start:
+            return
+        first, first_start = self.chunk_at(start)
+        last, last_start = self.chunk_at(end)
+        head = self.chunks[first][:start - first_start]
+        tail = self.chunks[last][end - last_start:]
+        if first == last:
+            self.splice_chunks(first, last + 1, head + tail)
+        else:
+            # The chunks in between are emptied rather than removed, which
+            # keeps the trees valid; lookups never land on an empty chunk.
+            self.length -= end - start
+            for index in range(first, last + 1):
+                piece = head if index == first else tail if index == last else ""
+                newlines = piece.count("\n")
+                self.newline_count += newlines - self.newlines[index]
+                self.set_chunk(index, piece, newlines)
+            if self.empty_chunks > len(self.chunks) // 2:
+                self.splice_chunks(0, len(self.chunks), self.text())
+        self.version += 1
+
+    def replace(self, start, end, text):
+        self.delete(start, end)
+        self.insert(start, text)
+
+    def get_text(self, start=0, end=None):
+        if end is None or end > self.length:
+            end = self.length
+        if end <= start:
+            return ""
+        first, first_start = self.chunk_at(start)
+        last, last_start = self.chunk_at(end)
+        if first == last:
+            return self.chunks[first][start - first_start:end - first_start]
+        parts = [self.chunks[first][start - first_start:]]
+        parts.extend(self.chunks[first + 1:last])
+        parts.append(self.chunks[last][:end - last_start])
+        return "".join(parts)
+
+    def text(self):
+        return "".join(self.chunks)
+
+    def write_to(self, file):
+        for chunk in self.chunks:
+            file.write(chunk)
+
+    def iter_blocks(self):
+        # Yields (offset, text) blocks that always end on a line boundary, so
+        # single-line patterns can be matched block by block.
+        carry = ""
+        carry_start = 0
+        offset = 0
+        for chunk in self.chunks:
+            cut = chunk.rfind("\n")
+            if cut == -1:
+                carry += chunk
+            else:
+                yield carry_start, carry + chunk[:cut + 1]
+                carry = chunk[cut + 1:]
+                carry_start = offset + cut + 1
+            offset += len(chunk)
+        if carry:
+            yield carry_start, carry
+
+    def finditer(self, pattern):
+        if "\n" in pattern.pattern:
+            for match in pattern.finditer(self.text()):
+                yield match.start(), match.end()
+            return
+        for base, block in self.iter_blocks():
+            for match in pattern.finditer(block):
+                yield base + match.start(), base + match.end()
+
+    def match_lines(self, pattern):
+        # The line of every match of a single-line pattern, counting the
+        # newlines between matches instead of looking each one up.
+        for base, block in self.iter_blocks():
+            line = self.position(base)[0]
+            counted = 0
+            for match in pattern.finditer(block):
+                line += block.count("\n", counted, match.start())
+                counted = match.start()
+                yield line
+
+    def words(self):
+        for base, block in self.iter_blocks():
+            yield from block.split()
+
+    def inserted(self, index, text):
+        self.insert(self.index_offset(index), text)
+
+    def deleted(self, start, end):
+        self.delete(self.index_offset(start), self.index_offset(end))
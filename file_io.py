@@ -0,0 +1,315 @@
+import codecs
+import gzip
+import io
+import lzma
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import traceback
+import zlib
+
+chunk_size = 1 << 20
+sniff_size = 1 << 16
+preview_size = 1 << 16
+
+# Longest first: the UTF-32 LE mark starts with the UTF-16 LE one.
+byte_order_marks = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+fallback_encodings = ["utf-8", "cp1252", "latin-1"]
+text_controls = set(b"\t\n\r\f\b\x1b")
+
+# New files get the mode open() would give them. The umask can only be read
+# by setting it, so that happens once, before any worker thread creates files.
+umask = os.umask(0)
+os.umask(umask)
+
+
+def cache_directory():
+    # Where the trigram index, the syntax rule cache and the session live.
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ic-text-editor")
+
+
+class BinaryFileError(OSError):
+    pass
+
+
+class TextFormat:
+    # How a text file is stored on disk, so that saving it writes back the
+    # same encoding, byte order mark, newlines and compression.
+    def __init__(self, encoding="utf-8", bom=b"", newline="\n", compression=None):
+        self.encoding = encoding
+        self.bom = bom
+        self.newline = newline
+        self.compression = compression
+
+    def describe(self):
+        parts = [self.encoding.upper() + (" BOM" if self.bom else ""), {"\n": "LF", "\r\n": "CRLF", "\r": "CR"}[self.newline]]
+        if self.compression:
+            parts.append(self.compression)
+        return ", ".join(parts)
+
+
+def compression_of(head):
+    if head.startswith(b"\x1f\x8b"):
+        return "gzip"
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    return None
+
+
+def open_raw(file, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=file, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(file, "rb")
+    return file
+
+
+def is_binary(head):
+    if not head:
+        return False
+    if b"\0" in head:
+        return True
+    controls = sum(1 for byte in head[:4096] if byte < 32 and byte not in text_controls)
+    return controls * 10 > min(len(head), 4096)
+
+
+def guess_newline(text):
+    crlf = text.count("\r\n")
+    counts = {"\r\n": crlf, "\n": text.count("\n") - crlf, "\r": text.count("\r") - crlf}
+    newline = max(counts, key=counts.get)
+    return newline if counts[newline] else "\n"
+
+
+def sniff(head, compression=None):
+    # Works out the format from the first (decompressed) bytes of a file;
+    # raises BinaryFileError for anything that does not look like text.
+    for bom, encoding in byte_order_marks:
+        if head.startswith(bom):
+            text = head[len(bom):].decode(encoding, errors="ignore")
+            return TextFormat(encoding, bom, guess_newline(text), compression)
+    if is_binary(head):
+        raise BinaryFileError("Binary file, not opened as text")
+    for encoding in fallback_encodings:
+        try:
+            # A multi-byte character may be cut at the end of the sample.
+            text = codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+        except UnicodeDecodeError:
+            continue
+        return TextFormat(encoding, b"", guess_newline(text), compression)
+
+
+def compression_for(path):
+    return {".gz": "gzip", ".xz": "xz"}.get(os.path.splitext(path)[1].lower())
+
+
+def sniff_file(path):
+    with open(path, "rb") as file:
+        compression = compression_of(file.read(8))
+        file.seek(0)
+        return sniff(open_raw(file, compression).read(sniff_size), compression)
+
+
+def decode_file(path, text_format, progress=None):
+    # Universal newlines: the text always comes back with "\n" line ends.
+    size = os.path.getsize(path)
+    parts = []
+    with open(path, "rb", buffering=chunk_size) as file:
+        stream = open_raw(file, text_format.compression)
+        stream.read(len(text_format.bom))
+        text = io.TextIOWrapper(stream, encoding=text_format.encoding, newline=None)
+        while True:
+            chunk = text.read(chunk_size)
+            if not chunk:
+                break
+            parts.append(chunk)
+            if progress and size:
+                progress(min(1.0, file.tell() / size))
+    return "".join(parts)
+
+
+def read_document(path, progress=None):
+    # Returns (text, TextFormat). A guessed encoding that turns out to be
+    # wrong further into the file falls back to the next one.
+    text_format = sniff_file(path)
+    while True:
+        try:
+            return decode_file(path, text_format, progress), text_format
+        except UnicodeDecodeError:
+            if text_format.bom or text_format.encoding not in fallback_encodings[:-1]:
+                raise
+            text_format.encoding = fallback_encodings[fallback_encodings.index(text_format.encoding) + 1]
+
+
+def read_text(path, progress=None):
+    return read_document(path, progress)[0]
+
+
+def encode_chunks(chunks, text_format, total=None, progress=None):
+    # Turns the buffer's "\n"-separated text chunks into the file's bytes.
+    # Progress counts characters in, so it is right for compressed files too.
+    encoder = codecs.getincrementalencoder(text_format.encoding)()
+    if text_format.compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    elif text_format.compression == "xz":
+        # The default preset is about twenty times slower on logs.
+        compressor = lzma.LZMACompressor(lzma.FORMAT_XZ, preset=1)
+    else:
+        compressor = None
+    pending = [text_format.bom]
+    buffered = 0
+    done = 0
+    for chunk in chunks:
+        done += len(chunk)
+        if text_format.newline != "\n":
+            chunk = chunk.replace("\n", text_format.newline)
+        data = encoder.encode(chunk)
+        pending.append(data)
+        buffered += len(data)
+        if buffered >= chunk_size:
+            data = b"".join(pending)
+            pending = []
+            buffered = 0
+            yield compressor.compress(data) if compressor else data
+        if progress and total:
+            progress(min(1.0, done / total))
+    pending.append(encoder.encode("", final=True))
+    data = b"".join(pending)
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    yield data
+
+
+def hex_preview(path, size=preview_size):
+    # The first `size` bytes as a classic offset / hex / ASCII dump.
+    with open(path, "rb") as file:
+        data = file.read(size)
+        more = file.read(1)
+    lines = []
+    for offset in range(0, len(data), 16):
+        row = data[offset:offset + 16]
+        hex_part = " ".join(f"{byte:02x}" for byte in row)
+        text_part = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in row)
+        lines.append(f"{offset:08x}  {hex_part:<47}  |{text_part}|")
+    if more:
+        lines.append(f"... only the first {len(data)} bytes are shown")
+    return "\n".join(lines)
+
+
+def atomic_write(path, chunks, total=None, progress=None, binary=False):
+    # Writes to a temporary file next to the target and renames it over the
+    # original only once everything is on disk, so a crash mid-save leaves
+    # the previous version intact. A symlink is followed, so the file it
+    # points to is replaced rather than the link.
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb" if binary else "w") as file:
+            written = 0
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+                if progress and total:
+                    progress(min(1.0, written / total))
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            # mkstemp creates the file readable by its owner only.
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    sync_directory(directory)
+
+
+def sync_directory(directory):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+class IOWorker:
+    # Runs blocking work on background threads and hands progress, results
+    # and errors back to the Tk thread through a queue polled with after().
+    # Work submitted with the same key (the path of a save) runs one job at
+    # a time in submission order, so an older save never lands after a newer
+    # one, and its result is delivered first.
+    poll_interval = 50
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.results = queue.Queue()
+        self.active = 0
+        self.poll_job = None
+        self.last_jobs = {}
+
+    def submit(self, work, on_done, on_error, on_progress=None, key=None):
+        def report(fraction):
+            if on_progress:
+                self.results.put((on_progress, (fraction,), False))
+
+        previous = self.last_jobs.get(key) if key is not None else None
+        finished = threading.Event()
+        if key is not None:
+            self.last_jobs[key] = finished
+
+        def run():
+            if previous is not None:
+                previous.wait()
+            try:
+                result = work(report)
+            except Exception as e:
+                self.results.put((on_error, (e,), True))
+            else:
+                self.results.put((on_done, (result,), True))
+            finally:
+                finished.set()
+
+        self.active += 1
+        threading.Thread(target=run, daemon=True).start()
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        self.poll_job = None
+        while True:
+            try:
+                callback, args, finished = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if finished:
+                self.active -= 1
+            # A failing handler is reported like any Tk callback error, and
+            # the results queued behind it are still delivered.
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+        if self.active:
+            self.poll_job = self.widget.after(self.poll_interval, self.poll)
+        else:
+            self.last_jobs.clear()
@@ -0,0 +1,164 @@
+import os
+
+
+def scan_directory(path, ignore=()):
+    entries = {}
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            if entry.name in ignore:
+                continue
+            try:
+                is_dir = entry.is_dir()
+                inode = entry.inode()
+            except OSError:
+                is_dir = False
+                inode = 0
+            entries[entry.name] = (is_dir, inode)
+    return entries
+
+
+def sorted_entries(path, entries):
+    listing = [(name, os.path.join(path, name), is_dir) for name, (is_dir, inode) in entries.items()]
+    listing.sort(key=lambda entry: (not entry[2], entry[0].lower()))
+    return listing
+
+
+def list_directory(path, ignore=()):
+    return sorted_entries(path, scan_directory(path, ignore))
+
+
+class LazyFileTree:
+    # Only the first level is listed up front; every directory gets a
+    # placeholder child so it can be expanded, and its real children are
+    # listed on a worker thread the first time it is opened. Collapsing a
+    # directory drops its children again, so only expanded directories
+    # ever need to be kept up to date.
+    placeholder = "..."
+
+    def __init__(self, tree, worker, ignore=()):
+        self.tree = tree
+        self.worker = worker
+        self.ignore = set(ignore)
+        self.root_path = None
+        self.nodes = {}
+        self.loaded = {}
+        self.placeholders = {}
+        self.loading = set()
+        tree.bind("<<TreeviewOpen>>", self.on_open, add="+")
+        tree.bind("<<TreeviewClose>>", self.on_close, add="+")
+
+    def set_root(self, path, on_loaded=None):
+        self.tree.delete(*self.tree.get_children())
+        self.nodes = {}
+        self.loaded = {}
+        self.placeholders = {}
+        self.loading = set()
+        self.root_path = path
+        root_node = self.tree.insert('', 'end', text=path, open=True, values=(path,))
+        self.nodes[path] = root_node
+        self.placeholders[root_node] = self.tree.insert(root_node, 'end', text=self.placeholder, values=("",))
+        # Listed in the background like any other directory, so a large or
+        # slow root does not hold up the window.
+        self.loading.add(root_node)
+        self.worker.submit(lambda progress: list_directory(path, self.ignore),
+                           lambda entries: self.root_loaded(root_node, path, entries, on_loaded),
+                           lambda e: self.load_failed(root_node, e))
+
+    def root_loaded(self, item, path, entries, on_loaded=None):
+        self.loaded_directory(item, path, entries)
+        if on_loaded:
+            on_loaded()
+
+    def insert_entry(self, parent, name, path, is_dir, index='end'):
+        item = self.tree.insert(parent, index, text=name, open=False, values=(path,))
+        if is_dir:
+            self.nodes[path] = item
+            self.placeholders[item] = self.tree.insert(item, 'end', text=self.placeholder, values=("",))
+        return item
+
+    def fill(self, item, path, entries):
+        self.tree.delete(*self.tree.get_children(item))
+        self.placeholders.pop(item, None)
+        self.loaded[path] = item
+        for name, entry_path, is_dir in entries:
+            self.insert_entry(item, name, entry_path, is_dir)
+
+    def unload(self, item, path):
+        self.tree.delete(*self.tree.get_children(item))
+        self.forget_below(path)
+        self.loaded.pop(path, None)
+        self.placeholders[item] = self.tree.insert(item, 'end', text=self.placeholder, values=("",))
+
+    def forget_below(self, path):
+        prefix = path.rstrip(os.sep) + os.sep
+        for node_path in [node_path for node_path in self.nodes if node_path.startswith(prefix)]:
+            del self.nodes[node_path]
+            self.loaded.pop(node_path, None)
+
+    def on_open(self, event):
+        item = self.tree.focus()
+        if item not in self.placeholders or item in self.loading:
+            return
+        path = self.tree.item(item, "values")[0]
+        self.loading.add(item)
+        self.worker.submit(lambda progress: list_directory(path, self.ignore),
+                           lambda entries: self.loaded_directory(item, path, entries),
+                           lambda e: self.load_failed(item, e))
+
+    def on_close(self, event):
+        item = self.tree.focus()
+        path = self.tree.item(item, "values")[0]
+        if self.loaded.get(path) == item:
+            self.unload(item, path)
+
+    def loaded_directory(self, item, path, entries):
+        self.loading.discard(item)
+        if self.tree.exists(item) and self.nodes.get(path) == item and self.tree.item(item, "open"):
+            self.fill(item, path, entries)
+
+    def load_failed(self, item, error):
+        self.loading.discard(item)
+        placeholder = self.placeholders.get(item)
+        if placeholder and self.tree.exists(placeholder):
+            self.tree.item(placeholder, text=f"Error: {error}")
+
+    def watched_directories(self):
+        return [path for path, item in self.loaded.items() if self.tree.exists(item)]
+
+    def update_directory(self, path, entries, renamed):
+        # Patches the children of an expanded directory in place: renamed
+        # entries keep their item, vanished ones are deleted and new ones are
+        # inserted at their sorted position.
+        item = self.loaded.get(path)
+        if item is None or not self.tree.exists(item):
+            return
+        children = {self.tree.item(child, "values")[0]: child for child in self.tree.get_children(item)}
+        moved = set()
+        for old_path, new_path in renamed:
+            child = children.pop(old_path, None)
+            if child is None:
+                continue
+            self.tree.item(child, text=os.path.basename(new_path), values=(new_path,))
+            if self.nodes.get(old_path) == child:
+                if old_path in self.loaded:
+                    self.unload(child, old_path)
+                    self.tree.item(child, open=False)
+                del self.nodes[old_path]
+                self.nodes[new_path] = child
+            children[new_path] = child
+            moved.add(new_path)
+        current = {entry_path for name, entry_path, is_dir in entries}
+        for child_path, child in list(children.items()):
+            if child_path not in current:
+                if self.nodes.get(child_path) == child:
+                    self.forget_below(child_path)
+                    del self.nodes[child_path]
+                    self.loaded.pop(child_path, None)
+                self.placeholders.pop(child, None)
+                self.tree.delete(child)
+                del children[child_path]
+        for index, (name, entry_path, is_dir) in enumerate(entries):
+            if entry_path not in children:
+                self.insert_entry(item, name, entry_path, is_dir, index)
+            elif entry_path in moved:
+                self.tree.move(children[entry_path], item, index)
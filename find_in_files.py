@@ -0,0 +1,157 @@
+import concurrent.futures
+import os
+import re
+import threading
+
+block_size = 1 << 23
+batch_size = 64
+preview_length = 200
+
+
+def compile_query(query, regex=False, whole_word=False):
+    pattern = query if regex else re.escape(query)
+    if whole_word:
+        # Same word boundaries as the exact-match mode of Edit All Occurrences.
+        pattern = r'\b(?:' + pattern + r')\b'
+    return re.compile(pattern)
+
+
+def iter_files(root, ignore=()):
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            iterator = os.scandir(path)
+        except OSError:
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.name in ignore:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.path
+                except OSError:
+                    continue
+
+
+def is_binary(head):
+    return b"\0" in head
+
+
+def search_text(path, text, pattern, first_line, matches):
+    line = first_line
+    counted = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        line += text.count("\n", counted, start)
+        counted = start
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", start)
+        if line_end == -1:
+            line_end = len(text)
+        preview = text[line_start:min(line_end, line_start + preview_length)]
+        matches.append((path, line, start - line_start, preview.strip()))
+    return first_line + text.count("\n")
+
+
+def search_file(path, pattern, literal=None):
+    matches = []
+    try:
+        with open(path, "rb") as file:
+            data = file.read(block_size)
+            if is_binary(data[:8192]):
+                return matches
+            line = 1
+            carry = b""
+            while data:
+                # Blocks are cut after their last newline so that a match
+                # never straddles two blocks and UTF-8 sequences stay whole.
+                data = carry + data
+                cut = data.rfind(b"\n") + 1
+                carry = data[cut:]
+                if cut and literal is not None and literal not in data[:cut]:
+                    line += data.count(b"\n", 0, cut)
+                elif cut:
+                    line = search_text(path, data[:cut].decode("utf-8", errors="replace"), pattern, line, matches)
+                data = file.read(block_size)
+            if carry and (literal is None or literal in carry):
+                search_text(path, carry.decode("utf-8", errors="replace"), pattern, line, matches)
+    except OSError:
+        pass
+    return matches
+
+
+def search_batch(paths, pattern, literal=None):
+    matches = []
+    for path in paths:
+        matches.extend(search_file(path, pattern, literal))
+    return len(paths), matches
+
+
+class FolderSearch:
+    # Walks the folder on the calling thread and searches batches of files
+    # on a thread or process pool, reporting each batch of matches as soon
+    # as it completes. cancel() can be called from any thread. For plain-text
+    # queries `literal` holds the UTF-8 bytes every match must contain, so
+    # blocks without it are skipped before being decoded. `paths` replaces
+    # the folder walk, e.g. with the candidates of a trigram index.
+    def __init__(self, root, pattern, ignore=(), workers=None, use_processes=False, literal=None, paths=None):
+        self.root = root
+        self.pattern = pattern
+        self.literal = literal
+        self.paths = paths
+        self.ignore = set(ignore)
+        self.workers = workers or os.cpu_count() or 4
+        self.use_processes = use_processes
+        self.cancelled = threading.Event()
+        self.files_searched = 0
+        self.match_count = 0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def collect(self, futures, report):
+        for future in futures:
+            if future.cancelled():
+                continue
+            searched, matches = future.result()
+            self.files_searched += searched
+            if matches:
+                self.match_count += len(matches)
+                report(matches)
+
+    def run(self, report):
+        executor_class = concurrent.futures.ProcessPoolExecutor if self.use_processes else concurrent.futures.ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            pending = set()
+            batch = []
+            for path in iter_files(self.root, self.ignore) if self.paths is None else self.paths:
+                if self.cancelled.is_set():
+                    break
+                batch.append(path)
+                if len(batch) < batch_size:
+                    continue
+                pending.add(executor.submit(search_batch, batch, self.pattern, self.literal))
+                batch = []
+                if len(pending) >= self.workers * 2:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    self.collect(done, report)
+            if batch and not self.cancelled.is_set():
+                pending.add(executor.submit(search_batch, batch, self.pattern, self.literal))
+            while pending and not self.cancelled.is_set():
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                self.collect(done, report)
+            for future in pending:
+                future.cancel()
+        return self.match_count
+
+
+def search_folder(root, query, regex=False, whole_word=False, ignore=(), workers=None, use_processes=False):
+    matches = []
+    literal = None if regex else query.encode("utf-8")
+    search = FolderSearch(root, compile_query(query, regex, whole_word), ignore, workers, use_processes, literal)
+    search.run(matches.extend)
+    return matches
@@ -0,0 +1,101 @@
+import os
+import time
+
+from file_tree import scan_directory, sorted_entries
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def find_renames(old, new):
+    removed = {info[1]: name for name, info in old.items() if name not in new and info[1]}
+    renamed = []
+    for name, info in new.items():
+        if name not in old and info[1] in removed:
+            renamed.append((removed.pop(info[1]), name))
+    return renamed
+
+
+def poll(directories, files, ignore=()):
+    # Runs off the Tk thread. A directory is only rescanned when its own
+    # mtime moved, which is what adding, removing or renaming an entry does.
+    started = time.perf_counter()
+    changes = []
+    for path, previous in directories.items():
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if previous is not None and previous[0] == mtime:
+                continue
+            entries = scan_directory(path, ignore)
+        except OSError:
+            continue
+        renamed = find_renames(previous[1], entries) if previous is not None else []
+        changes.append((path, (mtime, entries), renamed))
+    changed_files = []
+    for path, stamp in files.items():
+        current = file_stamp(path)
+        if current != stamp:
+            changed_files.append((path, current))
+    return changes, changed_files, time.perf_counter() - started
+
+
+class FileSystemWatcher:
+    # A poll runs on a snapshot taken by prepare(). A file change it found is
+    # dropped when the file's stamp was replaced in the meantime or the
+    # editor is writing the file itself, so a save never comes back as a
+    # change on disk.
+    def __init__(self, ignore=()):
+        self.ignore = set(ignore)
+        self.directories = {}
+        self.files = {}
+        self.prepared_files = {}
+        self.writing = {}
+        self.last_duration = 0.0
+        self.last_watched = 0
+
+    def watch_file(self, path):
+        self.files[path] = file_stamp(path)
+
+    def forget_file(self, path):
+        self.files.pop(path, None)
+
+    def begin_write(self, path):
+        self.writing[path] = self.writing.get(path, 0) + 1
+
+    def end_write(self, path):
+        # The caller watches the file again once it is written.
+        count = self.writing.pop(path, 1) - 1
+        if count:
+            self.writing[path] = count
+
+    def prepare(self, directories):
+        self.directories = {path: self.directories.get(path) for path in directories}
+        self.prepared_files = dict(self.files)
+        return dict(self.directories), dict(self.files)
+
+    def apply(self, result):
+        changes, changed_files, duration = result
+        self.last_duration = duration
+        self.last_watched = len(self.directories) + len(self.files)
+        tree_changes = []
+        for path, state, renamed in changes:
+            if path not in self.directories:
+                continue
+            previous = self.directories[path]
+            self.directories[path] = state
+            if previous is not None:
+                renamed = [(os.path.join(path, old), os.path.join(path, new)) for old, new in renamed]
+                tree_changes.append((path, sorted_entries(path, state[1]), renamed))
+        reload_paths = []
+        for path, stamp in changed_files:
+            if path in self.writing or path not in self.prepared_files or self.files.get(path) != self.prepared_files[path]:
+                continue
+            if path in self.files and self.files[path] != stamp:
+                self.files[path] = stamp
+                reload_paths.append((path, stamp))
+        return tree_changes, reload_paths
@@ -0,0 +1,254 @@
+import bisect
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+def visible_range(text_widget):
+    first = int(text_widget.index("@0,0").split(".")[0])
+    last = int(text_widget.index(f"@0,{text_widget.winfo_height()}").split(".")[0])
+    return first, last
+
+
+def shift_lines(lines, line, delta, removed=0):
+    # Keeps a sorted list of line numbers in step with an edit at line that
+    # removed `removed` lines after it and changed the line count by delta.
+    start = bisect.bisect_right(lines, line)
+    end = bisect.bisect_right(lines, line + removed)
+    lines[start:] = [number + delta for number in lines[end:]]
+
+
+class LineNumbers:
+    # A canvas next to the text widget with the numbers of the lines on
+    # screen. Number items are reused between redraws, so a redraw costs
+    # the same for ten lines or a million. numbering() returns the number of
+    # the buffer's first line minus one and the total number of lines, which
+    # differ from the buffer's own for a large file window. markers(line),
+    # when given, returns a fold marker drawn after the number, and clicking
+    # a line calls on_click(line).
+    padding = 6
+
+    def __init__(self, text_widget, hooks, numbering, markers=None, on_click=None):
+        self.text_widget = text_widget
+        self.numbering = numbering
+        self.markers = markers
+        self.font_spec = None
+        self.font = None
+        self.canvas = tk.Canvas(text_widget.frame, width=self.padding * 2, highlightthickness=0, bg="#f0f0f0")
+        self.items = []
+        self.marker_items = []
+        self.digits = 0
+        self.redraw_job = None
+        hooks.add_listener(self)
+        hooks.add_scroll_listener(self.schedule_redraw)
+        text_widget.bind("<KeyRelease>", lambda event: self.schedule_redraw(), add="+")
+        text_widget.bind("<ButtonRelease-1>", lambda event: self.schedule_redraw(), add="+")
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        if on_click is not None:
+            self.canvas.bind("<Button-1>", lambda event: on_click(int(text_widget.index(f"@0,{event.y}").split(".")[0])))
+
+    def show(self, visible):
+        if visible:
+            self.canvas.pack(side=tk.LEFT, fill=tk.Y, before=self.text_widget)
+            self.schedule_redraw()
+        else:
+            self.canvas.pack_forget()
+
+    def inserted(self, index, text):
+        if "\n" in text:
+            self.schedule_redraw()
+
+    def deleted(self, start, end):
+        if start.split(".")[0] != end.split(".")[0]:
+            self.schedule_redraw()
+
+    def schedule_redraw(self):
+        if self.redraw_job is None and self.canvas.winfo_ismapped():
+            self.redraw_job = self.text_widget.after_idle(self.run_scheduled_redraw)
+
+    def run_scheduled_redraw(self):
+        self.redraw_job = None
+        self.redraw()
+
+    def redraw(self):
+        text_widget = self.text_widget
+        canvas = self.canvas
+        base, total = self.numbering()
+        digits = len(str(total))
+        if text_widget["font"] != self.font_spec:
+            self.font_spec = text_widget["font"]
+            self.font = tkfont.Font(font=self.font_spec)
+            self.digits = 0
+        marker_width = self.font.measure("\u25be ") if self.markers else 0
+        if digits != self.digits:
+            self.digits = digits
+            canvas.config(width=self.font.measure("0" * max(digits, 2)) + marker_width + self.padding * 2)
+        right = int(canvas["width"]) - self.padding
+        current = int(text_widget.index(tk.INSERT).split(".")[0])
+        height = text_widget.winfo_height()
+        # Steps by display line, so lines hidden by a fold are skipped.
+        index = text_widget.index("@0,0 linestart")
+        shown = 0
+        while True:
+            info = text_widget.dlineinfo(index)
+            if info is None or info[1] > height:
+                break
+            line = int(index.split(".")[0])
+            if shown == len(self.items):
+                self.items.append(canvas.create_text(0, 0, anchor=tk.NE))
+                self.marker_items.append(canvas.create_text(0, 0, anchor=tk.NE, fill="#888888"))
+            item = self.items[shown]
+            canvas.coords(item, right - marker_width, info[1])
+            canvas.itemconfigure(item, text=str(base + line), font=self.font, fill="black" if line == current else "#888888", state=tk.NORMAL)
+            marker = self.marker_items[shown]
+            canvas.coords(marker, right, info[1])
+            canvas.itemconfigure(marker, text=self.markers(line) if self.markers else "", font=self.font, state=tk.NORMAL)
+            shown += 1
+            following = text_widget.index(f"{index} +1 display lines linestart")
+            if following == index:
+                break
+            index = following
+        for item in self.items[shown:] + self.marker_items[shown:]:
+            canvas.itemconfigure(item, state=tk.HIDDEN)
+
+
+def minimap_start(first, visible, line_count, rows):
+    # The first line shown in a minimap of `rows` lines, scrolled so that
+    # its position follows the text widget's.
+    if line_count <= rows:
+        return 1
+    scrollable = max(1, line_count - visible)
+    return 1 + (min(first - 1, scrollable) * (line_count - rows)) // scrollable
+
+
+def hit_marks(hits, line_count, rows):
+    # For each minimap row, whether any hit falls into its share of the whole
+    # document; a bisect per row keeps this independent of the hit count.
+    marks = []
+    for row in range(rows):
+        low = 1 + row * line_count // rows
+        high = 1 + (row + 1) * line_count // rows
+        position = bisect.bisect_left(hits, low)
+        marks.append(position < len(hits) and hits[position] < max(high, low + 1))
+    return marks
+
+
+def minimap_rows(lines, tokens, width, colors):
+    # One row of pixel colors per line: a bar over the line's text, with
+    # the highlighter's token colors where they are known.
+    background, foreground, hit = colors["background"], colors["foreground"], colors["hit"]
+    rows = []
+    for text, spans, is_hit in zip(lines, tokens, colors["hits"]):
+        row = [hit if is_hit else background] * width
+        end = min(len(text.rstrip()), width)
+        start = len(text) - len(text.lstrip())
+        if start < end:
+            row[start:end] = [foreground] * (end - start)
+        if spans:
+            for span_start, span_end, color in spans:
+                span_end = min(span_end, width)
+                if span_start < span_end:
+                    row[span_start:span_end] = [color] * (span_end - span_start)
+        rows.append(row)
+    return rows
+
+
+def minimap_pixels(document, line_tokens, hits, first, last, rows, width, strip, row_height, colors):
+    # The minimap's first line and image rows for a viewport showing lines
+    # first to last; kept apart from the Tk calls so it can be timed without
+    # a display.
+    line_count = document.line_count()
+    start = minimap_start(first, last - first + 1, line_count, rows)
+    end = min(line_count, start + rows - 1)
+    lines = document.get_text(document.line_start(start), document.line_end(end)).split("\n")
+    tokens = [line_tokens[line - 1] if line <= len(line_tokens) else None for line in range(start, end + 1)]
+    shown_hits = set(hits[bisect.bisect_left(hits, start):bisect.bisect_right(hits, end)])
+    pixels = minimap_rows(lines, tokens, width, dict(colors, hits=[line in shown_hits for line in range(start, end + 1)]))
+    marks = hit_marks(hits, line_count, rows * row_height)
+    background = colors["background"]
+    image = []
+    for row in range(rows):
+        row_pixels = pixels[row] if row < len(pixels) else [background] * width
+        for part in range(row_height):
+            mark = colors["mark"] if marks[row * row_height + part] else background
+            image.append(row_pixels + [mark] * strip)
+    return start, image
+
+
+class Minimap:
+    # An overview of the buffer on the right of the text widget: a pixel row
+    # per line for the lines around the viewport, drawn into one PhotoImage,
+    # with the viewport as a frame and search hits marked in the rows and in
+    # a strip along the edge that covers the whole document. Only the lines
+    # the minimap shows are read, so a redraw costs the same at any file size.
+    width = 100
+    strip = 4
+    row_height = 2
+    colors = {"background": "#ffffff", "foreground": "#c0c0c0", "hit": "#ffe08a", "mark": "#e08000", "viewport": "#808080"}
+
+    def __init__(self, text_widget, hooks, document, highlighter):
+        self.text_widget = text_widget
+        self.document = document
+        self.highlighter = highlighter
+        self.hits = []
+        self.canvas = tk.Canvas(text_widget.frame, width=self.width + self.strip, highlightthickness=0, bg=self.colors["background"])
+        self.image = tk.PhotoImage(width=self.width + self.strip, height=1)
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.image)
+        self.viewport = self.canvas.create_rectangle(0, 0, 0, 0, outline=self.colors["viewport"])
+        self.start = 1
+        self.redraw_job = None
+        hooks.add_listener(self)
+        hooks.add_scroll_listener(self.schedule_redraw)
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<Button-1>", self.clicked)
+        self.canvas.bind("<B1-Motion>", self.clicked)
+
+    def show(self, visible):
+        if visible:
+            self.canvas.pack(side=tk.RIGHT, fill=tk.Y, before=self.text_widget)
+            self.schedule_redraw()
+        else:
+            self.canvas.pack_forget()
+
+    def set_hits(self, lines):
+        self.hits = sorted(set(lines))
+        self.schedule_redraw()
+
+    def inserted(self, index, text):
+        delta = text.count("\n")
+        if delta and self.hits:
+            shift_lines(self.hits, int(index.split(".")[0]), delta)
+        self.schedule_redraw()
+
+    def deleted(self, start, end):
+        first = int(start.split(".")[0])
+        removed = int(end.split(".")[0]) - first
+        if removed and self.hits:
+            shift_lines(self.hits, first, -removed, removed)
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        if self.redraw_job is None and self.canvas.winfo_ismapped():
+            self.redraw_job = self.text_widget.after_idle(self.run_scheduled_redraw)
+
+    def run_scheduled_redraw(self):
+        self.redraw_job = None
+        self.redraw()
+
+    def rows(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def redraw(self):
+        first, last = visible_range(self.text_widget)
+        line_tokens = self.highlighter.line_tokens if self.highlighter is not None else ()
+        self.start, pixels = minimap_pixels(self.document, line_tokens, self.hits, first, last, self.rows(),
+                                            self.width, self.strip, self.row_height, self.colors)
+        if self.image.height() != len(pixels):
+            self.image.config(height=len(pixels))
+        self.image.put(" ".join("{" + " ".join(row) + "}" for row in pixels), to=(0, 0))
+        top = (first - self.start) * self.row_height
+        self.canvas.coords(self.viewport, 0, top, self.width - 1, top + (last - first + 1) * self.row_height - 1)
+
+    def clicked(self, event):
+        first, last = visible_range(self.text_widget)
+        line = self.start + max(0, event.y) // self.row_height
+        self.text_widget.yview(f"{max(1, line - (last - first) // 2)}.0")
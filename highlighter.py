@@ -0,0 +1,132 @@
+import tkinter as tk
+
+
+class Highlighter:
+    # Lines re-tokenized per idle callback when filling in the parts of the
+    # document that are not on screen.
+    chunk_size = 500
+
+    def __init__(self, text_widget, hooks, get_rules, enabled=None):
+        self.text_widget = text_widget
+        self.get_rules = get_rules
+        self.enabled = enabled if enabled is not None else (lambda: True)
+        self.tags = {}
+        self.line_tokens = [None] * self.line_count()
+        self.fill_line = 1
+        self.fill_job = None
+        self.refresh_job = None
+        hooks.add_listener(self)
+        hooks.add_scroll_listener(self.schedule_refresh)
+
+    def line_count(self):
+        return int(self.text_widget.index("end-1c").split(".")[0])
+
+    def line_of(self, index):
+        return int(self.text_widget.index(index).split(".")[0])
+
+    def inserted(self, index, text):
+        self.lines_changed(self.line_number(index), text.count("\n"))
+
+    def deleted(self, start, end):
+        first = self.line_number(start)
+        self.lines_changed(first, first - self.line_number(end))
+
+    def line_number(self, index):
+        return int(index.split(".")[0])
+
+    def lines_changed(self, line, delta):
+        if delta > 0:
+            self.line_tokens[line:line] = [None] * delta
+        elif delta < 0:
+            del self.line_tokens[line:line - delta]
+        if line <= len(self.line_tokens):
+            self.line_tokens[line - 1] = None
+        self.fill_line = min(self.fill_line, line)
+        self.schedule_refresh()
+
+    def invalidate(self):
+        for tag in self.tags.values():
+            self.text_widget.tag_remove(tag, "1.0", tk.END)
+        self.line_tokens = [None] * self.line_count()
+        self.fill_line = 1
+        self.schedule_refresh()
+
+    def visible_lines(self):
+        first = self.line_of("@0,0")
+        last = self.line_of(f"@0,{self.text_widget.winfo_height()}")
+        return first, min(last, len(self.line_tokens))
+
+    def schedule_refresh(self):
+        if self.refresh_job is None:
+            self.refresh_job = self.text_widget.after_idle(self.run_scheduled_refresh)
+
+    def run_scheduled_refresh(self):
+        self.refresh_job = None
+        self.refresh()
+
+    def refresh(self):
+        if not self.enabled():
+            return
+        rules = self.get_rules()
+        if not rules:
+            return
+        if len(self.line_tokens) != self.line_count():
+            self.invalidate()
+        first, last = self.visible_lines()
+        start = None
+        for line in range(first, last + 2):
+            stale = line <= last and self.line_tokens[line - 1] is None
+            if stale and start is None:
+                start = line
+            elif not stale and start is not None:
+                self.highlight_range(start, line - 1, rules)
+                start = None
+        self.schedule_fill()
+
+    def schedule_fill(self):
+        if self.fill_job is None and self.fill_line <= len(self.line_tokens):
+            self.fill_job = self.text_widget.after_idle(self.fill)
+
+    def fill(self):
+        self.fill_job = None
+        if not self.enabled():
+            return
+        rules = self.get_rules()
+        if not rules:
+            return
+        line_tokens = self.line_tokens
+        line = self.fill_line
+        while line <= len(line_tokens) and line_tokens[line - 1] is not None:
+            line += 1
+        if line > len(line_tokens):
+            self.fill_line = line
+            return
+        last = min(len(line_tokens), line + self.chunk_size - 1)
+        self.highlight_range(line, last, rules)
+        self.fill_line = last + 1
+        self.schedule_fill()
+
+    def tag_for(self, color):
+        tag = self.tags.get(color)
+        if tag is None:
+            tag = f"highlight_{color}"
+            self.text_widget.tag_config(tag, foreground=color)
+            self.tags[color] = tag
+        return tag
+
+    def highlight_range(self, first, last, rules):
+        text_widget = self.text_widget
+        lines = text_widget.get(f"{first}.0", f"{last}.end").split("\n")
+        ranges = {}
+        for offset, text in enumerate(lines):
+            line = first + offset
+            spans = rules.tokenize(text)
+            self.line_tokens[line - 1] = spans
+            for start, end, color in spans:
+                ranges.setdefault(color, []).extend((f"{line}.{start}", f"{line}.{end}"))
+        for color in ranges:
+            self.tag_for(color)
+        for tag in self.tags.values():
+            text_widget.tag_remove(tag, f"{first}.0", f"{last}.end")
+        for color, indices in ranges.items():
+            text_widget.tag_add(self.tags[color], *indices)
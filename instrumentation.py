@@ -0,0 +1,124 @@
+import time
+from array import array
+
+
+class RollingHistogram:
+    # The last `size` samples, in seconds, in a ring buffer; percentiles are
+    # computed from a sorted copy when the panel asks for them.
+    def __init__(self, size=1000):
+        self.samples = array("d", bytes(8 * size))
+        self.size = size
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples[self.count % self.size] = seconds
+        self.count += 1
+
+    def values(self):
+        return self.samples[:min(self.count, self.size)]
+
+    def percentiles(self, fractions):
+        values = sorted(self.values())
+        if not values:
+            return [None] * len(fractions)
+        return [values[min(len(values) - 1, int(fraction * len(values)))] for fraction in fractions]
+
+    def clear(self):
+        self.count = 0
+
+
+class Instruments:
+    # Named rolling histograms fed by wrapped methods. A wrapper costs two
+    # perf_counter calls per call, and one attribute check while disabled.
+    def __init__(self, size=1000):
+        self.size = size
+        self.histograms = {}
+        self.enabled = True
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = RollingHistogram(self.size)
+        return histogram
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).add(seconds)
+
+    def timed(self, name, function):
+        histogram = self.histogram(name)
+
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter() - started)
+
+        return wrapper
+
+    def wrap(self, target, names):
+        # Replaces the bound methods on the instance, so it has to happen
+        # before any of them is handed to a binding or a callback.
+        for name in names:
+            setattr(target, name, self.timed(name, getattr(target, name)))
+
+    def rows(self):
+        rows = []
+        for name, histogram in sorted(self.histograms.items()):
+            if histogram.count:
+                p50, p99 = histogram.percentiles((0.5, 0.99))
+                rows.append((name, histogram.count, p50, p99, max(histogram.values())))
+        return rows
+
+    def clear(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+
+
+class PaintLatency:
+    # Keystroke-to-paint latency of a text widget: from the key event
+    # reaching the widget to an idle callback queued from an idle callback.
+    # Tk only runs idle handlers that existed when the idle pass started, so
+    # that second one runs after the redraw the key's bindings scheduled.
+    def __init__(self, instruments, name="keystroke to paint"):
+        self.instruments = instruments
+        self.name = name
+
+    def attach(self, text_widget):
+        text_widget.bind("<KeyPress>", lambda event: self.key_pressed(text_widget), add="+")
+
+    def key_pressed(self, text_widget):
+        if self.instruments.enabled:
+            started = time.perf_counter()
+            text_widget.after_idle(text_widget.after_idle, self.painted, started)
+
+    def painted(self, started):
+        self.instruments.record(self.name, time.perf_counter() - started)
+
+
+class LoopLag:
+    # Event-loop lag: how late a repeating after() callback fires.
+    def __init__(self, instruments, widget, interval=100, name="event loop lag"):
+        self.instruments = instruments
+        self.widget = widget
+        self.interval = interval
+        self.name = name
+        self.job = None
+
+    def start(self):
+        self.expected = time.perf_counter() + self.interval / 1000
+        self.job = self.widget.after(self.interval, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.instruments.record(self.name, max(0.0, now - self.expected))
+        self.expected = now + self.interval / 1000
+        self.job = self.widget.after(self.interval, self.tick)
+
+    def stop(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
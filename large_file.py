@@ -0,0 +1,187 @@
+import itertools
+import mmap
+import os
+import threading
+import tkinter as tk
+from array import array
+
+import file_io
+
+
+def resident_memory():
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LineIndex:
+    # Sparse newline index over a memory-mapped file: the start offset of
+    # every step-th line is recorded, the lines in between are found with
+    # mmap.find, so the index stays small even for huge logs. The file is
+    # read in the encoding it was sniffed as, after its byte order mark; in
+    # UTF-16/32 a newline is a whole code unit, so only aligned ones count.
+    step = 64
+    block_size = 1 << 22
+
+    def __init__(self, path, text_format=None):
+        self.path = path
+        self.text_format = text_format or file_io.sniff_file(path)
+        self.newline = "\n".encode(self.text_format.encoding)
+        self.carriage_return = "\r".encode(self.text_format.encoding)
+        self.width = len(self.newline)
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = array("Q", [len(self.text_format.bom)])
+        self.newlines = 0
+        self.scanned = 0
+        self.complete = False
+        self.stopped = False
+        self.thread = threading.Thread(target=self.build, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def find_newline(self, start, end=None):
+        end = self.size if end is None else end
+        found = self.mmap.find(self.newline, start, end)
+        while found != -1 and (found - self.offsets[0]) % self.width:
+            found = self.mmap.find(self.newline, found + 1, end)
+        return found
+
+    def build(self):
+        step = self.step
+        width = self.width
+        position = self.offsets[0]
+        while position < self.size and not self.stopped:
+            # Blocks start on a code unit, so no aligned newline straddles two.
+            end = min(self.size, position + self.block_size - self.block_size % width)
+            if width == 1:
+                block = self.mmap[position:end]
+                parts = block.split(b"\n")
+                lengths = list(itertools.accumulate(map(len, parts)))
+                first = -(self.newlines + 1) % step
+                for k in range(first, len(parts) - 1, step):
+                    self.offsets.append(position + lengths[k] + k + 1)
+                self.newlines += len(parts) - 1
+            else:
+                found = self.find_newline(position, end)
+                while found != -1:
+                    self.newlines += 1
+                    if not self.newlines % step:
+                        self.offsets.append(found + width)
+                    found = self.find_newline(found + width, end)
+            position = end
+            self.scanned = position
+        self.complete = not self.stopped
+
+    def close(self):
+        self.stopped = True
+        if self.thread.is_alive():
+            self.thread.join()
+        self.mmap.close()
+        self.file.close()
+
+    def known_lines(self):
+        if self.complete:
+            return self.newlines + 1
+        return len(self.offsets) * self.step
+
+    def estimated_lines(self):
+        if self.complete or not self.scanned:
+            return self.known_lines()
+        return max(self.known_lines(), self.newlines * self.size // self.scanned)
+
+    def progress(self):
+        return self.scanned / self.size if self.size else 1.0
+
+    def line_start(self, line):
+        if line > self.known_lines():
+            return self.size
+        block, skip = divmod(line - 1, self.step)
+        start = self.offsets[block]
+        for _ in range(skip):
+            found = self.find_newline(start)
+            if found == -1:
+                return self.size
+            start = found + self.width
+        return start
+
+    def read_lines(self, first, last):
+        start = self.line_start(first)
+        end = self.line_start(last + 1)
+        width = self.width
+        # The last line has no newline of its own to strip.
+        if end > start and last < self.known_lines() and self.mmap[end - width:end] == self.newline:
+            end -= width
+            if end > start and self.mmap[end - width:end] == self.carriage_return:
+                end -= width
+        return self.mmap[start:end].decode(self.text_format.encoding, errors="replace").replace("\r\n", "\n")
+
+
+class LargeFileView:
+    # Only `window` lines around the viewport live in the text widget; the
+    # scrollbar is driven in whole-file coordinates and the window is moved
+    # whenever the view gets close to one of its edges.
+    window = 3000
+
+    def __init__(self, text_widget, hooks, line_index):
+        self.text_widget = text_widget
+        self.line_index = line_index
+        self.scrollbar = text_widget.vbar
+        self.first = 1
+        self.count = 0
+        self.recenter_job = None
+        hooks.scroll_command = self.on_yscroll
+        self.scrollbar.configure(command=self.on_scrollbar)
+
+    def close(self):
+        self.line_index.close()
+
+    def load(self, first):
+        known = self.line_index.known_lines()
+        first = max(1, min(first, known - self.window + 1))
+        last = min(first + self.window - 1, known)
+        text = self.line_index.read_lines(first, last)
+        self.text_widget.configure(state=tk.NORMAL)
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert("1.0", text)
+        self.text_widget.configure(state=tk.DISABLED)
+        self.first = first
+        self.count = last - first + 1
+
+    def show_line(self, line):
+        if not self.first + self.window // 4 <= line <= self.first + self.count - self.window // 4:
+            self.load(line - self.window // 2)
+        self.text_widget.yview(f"{line - self.first + 1}.0")
+
+    def global_line(self, fraction):
+        return self.first + int(float(fraction) * self.count)
+
+    def on_yscroll(self, first, last):
+        top = self.global_line(first)
+        near_top = self.first > 1 and float(first) < 0.2
+        near_bottom = self.first + self.count - 1 < self.line_index.known_lines() and float(last) > 0.8
+        if (near_top or near_bottom) and self.recenter_job is None:
+            self.recenter_job = self.text_widget.after_idle(self.recenter, top)
+        total = max(1, self.line_index.estimated_lines())
+        self.scrollbar.set((top - 1) / total, (self.global_line(last) - 1) / total)
+
+    def recenter(self, top):
+        self.recenter_job = None
+        self.show_line(top)
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            total = self.line_index.estimated_lines()
+            line = min(int(float(args[1]) * total) + 1, self.line_index.known_lines())
+            self.show_line(max(1, line))
+        else:
+            self.text_widget.yview(*args)
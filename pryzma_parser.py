@@ -0,0 +1,328 @@
+import bisect
+import re
+
+function_pattern = re.compile(r"\s*/(\w+)\s*\{")
+statement_pattern = re.compile(r"\s*(if|for|foreach|while|whilen)\b\s*\(?([^{]*)")
+loop_variable_pattern = re.compile(r"\s*for(?:each)?\s*\(\s*(\w+)\s*,")
+assignment_pattern = re.compile(r"\s*(\w+)\s*(?:=(?!=)|\+\+|--)")
+braces_pattern = re.compile(r'[{}"#]')
+label_size = 40
+no_events = ()
+
+
+def scan_line(text):
+    # Returns (events, names) for one line. Events are ("open", kind, label,
+    # params) and ("close",) for the braces outside strings and comments;
+    # the first brace opened on the line belongs to its function or
+    # statement, further ones are plain blocks. Names are the variables the
+    # line assigns.
+    if "{" not in text and "}" not in text:
+        match = assignment_pattern.match(text)
+        return no_events, (match.group(1),) if match else no_events
+    match = function_pattern.match(text)
+    if match:
+        kind, label = "function", match.group(1)
+    else:
+        match = statement_pattern.match(text)
+        if match:
+            kind, label = match.group(1), (match.group(1) + " " + match.group(2).strip().rstrip(")")).strip()[:label_size]
+        else:
+            kind, label = "block", ""
+    loop = loop_variable_pattern.match(text)
+    params = (loop.group(1),) if loop else no_events
+    events = []
+    position = 0
+    while True:
+        match = braces_pattern.search(text, position)
+        if match is None:
+            break
+        character = match.group()
+        if character == "#":
+            break
+        if character == '"':
+            end = text.find('"', match.end())
+            if end == -1:
+                break
+            position = end + 1
+            continue
+        if character == "{":
+            events.append(("open", kind, label, params))
+            kind, label, params = "block", "", no_events
+        else:
+            events.append(("close",))
+        position = match.end()
+    match = assignment_pattern.match(text)
+    return tuple(events), (match.group(1),) if match else no_events
+
+
+def balance(summaries):
+    depth = 0
+    for events, names in summaries:
+        for event in events:
+            depth += 1 if event[0] == "open" else -1
+    return depth
+
+
+class Block:
+    def __init__(self, kind, label, start, parent, params=no_events):
+        self.kind = kind
+        self.label = label
+        self.start = start
+        self.end = None
+        self.parent = parent
+        self.children = []
+        self.names = dict.fromkeys(params, 1) if params else {}
+
+    def count_names(self, names, delta):
+        counts = self.names
+        for name in names:
+            counts[name] = counts.get(name, 0) + delta
+
+
+class BlockTree:
+    # The brace structure of a Pryzma buffer. Each line is scanned once and
+    # its (events, names) summary cached; an edit rescans only the lines it
+    # touched. When those lines open or close no blocks the tree is kept and
+    # only shifted and its name counts patched. Otherwise the top-level
+    # blocks around the edit are parsed again from the cached summaries,
+    # until the nesting is back at file level where it was before, and
+    # spliced into the tree. An edit that unbalances the braces re-nests
+    # everything below it, so the tree is then only marked stale and rebuilt
+    # from the summaries the next time it is asked for. enabled() is checked
+    # per edit, so other files cost nothing until they turn Pryzma.
+    def __init__(self, hooks, document, enabled=None):
+        self.document = document
+        self.enabled = enabled if enabled is not None else (lambda: True)
+        self.summaries = None
+        self.root = None
+        self.blocks = []
+        self.starts = []
+        self.version = 0
+        self.stale = False
+        hooks.add_listener(self)
+
+    def parsed(self):
+        # The tree, parsing the whole buffer first if it is out of date.
+        if self.summaries is None:
+            self.summaries = [scan_line(line) for line in self.document.text().split("\n")]
+            self.stale = True
+        if self.stale:
+            self.rebuild()
+            self.stale = False
+        return self.root
+
+    def inserted(self, index, text):
+        line = int(index.split(".")[0])
+        self.lines_changed(line, 0, text.count("\n"))
+
+    def deleted(self, start, end):
+        first = int(start.split(".")[0])
+        self.lines_changed(first, int(end.split(".")[0]) - first, 0)
+
+    def lines_changed(self, first, removed, added):
+        if self.summaries is None:
+            return
+        if not self.enabled():
+            self.summaries = None
+            return
+        document = self.document
+        old = self.summaries[first - 1:first + removed]
+        new = [scan_line(document.line(line)) for line in range(first, first + added + 1)]
+        self.summaries[first - 1:first + removed] = new
+        if self.stale:
+            return
+        if any(events for events, names in old) or any(events for events, names in new):
+            if balance(old) != balance(new):
+                self.stale = True
+            elif removed != added or [events for events, names in old] != [events for events, names in new]:
+                self.reparse(first, removed, added, old)
+            return
+        for line, (events, names) in enumerate(old, first):
+            if names:
+                self.scope_before(line).count_names(names, -1)
+        if added != removed:
+            self.shift(first + removed, added - removed)
+        for line, (events, names) in enumerate(new, first):
+            if names:
+                self.scope_before(line).count_names(names, 1)
+
+    def shift(self, after, delta):
+        # Moves every block boundary below line `after` by delta lines.
+        for block in self.blocks:
+            if block.start > after:
+                block.start += delta
+            if block.end is not None and block.end > after:
+                block.end += delta
+        self.starts = [block.start for block in self.blocks]
+        self.root.end = len(self.summaries)
+
+    def reparse(self, first, removed, added, old):
+        # The summaries already hold the edit, the tree does not yet: old
+        # line numbers are used for the tree, new ones for the summaries.
+        summaries = self.summaries
+        root = self.root
+        delta = added - removed
+        top = self.scope_before(first)
+        while top is not root and top.parent is not root:
+            top = top.parent
+        start = top.start if top is not root else first
+        children = []
+        blocks = []
+        root_names = []
+        block = root
+        line = start
+        while line <= len(summaries):
+            events, names = summaries[line - 1]
+            if names:
+                if block is root:
+                    root_names.append(names)
+                else:
+                    block.count_names(names, 1)
+            for event in events:
+                if event[0] == "open":
+                    child = Block(event[1], event[2], line, block, event[3])
+                    (children if block is root else block.children).append(child)
+                    blocks.append(child)
+                    block = child
+                elif block is not root:
+                    block.end = line
+                    block = block.parent
+            if line >= first + added and block is root and self.scope_before(line - delta + 1) is root:
+                break
+            line += 1
+        end = min(line, len(summaries)) - delta
+        # Names on the old file-level lines of the region leave the root;
+        # the lines inside top-level blocks are skipped.
+        top_blocks = root.children
+        position = bisect.bisect_left([child.start for child in top_blocks], start)
+        old_line = start
+        while old_line <= end:
+            if old_line < first:
+                names = summaries[old_line - 1][1]
+            elif old_line <= first + removed:
+                names = old[old_line - first][1]
+            else:
+                names = summaries[old_line - 1 + delta][1]
+            if names:
+                root.count_names(names, -1)
+            old_line += 1
+            while position < len(top_blocks) and top_blocks[position].start < old_line:
+                child = top_blocks[position]
+                position += 1
+                if child.end is None:
+                    old_line = end + 1
+                elif child.end >= old_line:
+                    old_line = child.end + 1
+        for names in root_names:
+            root.count_names(names, 1)
+        before = bisect.bisect_left(self.starts, start)
+        after = bisect.bisect_right(self.starts, end)
+        tail = self.blocks[after:]
+        if delta:
+            for block in tail:
+                block.start += delta
+                if block.end is not None:
+                    block.end += delta
+        root.children = [child for child in root.children if child.start < start] + children + [child for child in root.children if child.start > end]
+        self.blocks = self.blocks[:before] + blocks + tail
+        self.starts = [block.start for block in self.blocks]
+        root.end = len(summaries)
+        self.version += 1
+
+    def rebuild(self):
+        root = Block("file", "", 1, None)
+        blocks = []
+        block = root
+        for line, (events, names) in enumerate(self.summaries, 1):
+            if names:
+                block.count_names(names, 1)
+            for event in events:
+                if event[0] == "open":
+                    child = Block(event[1], event[2], line, block, event[3])
+                    block.children.append(child)
+                    blocks.append(child)
+                    block = child
+                elif block is not root:
+                    block.end = line
+                    block = block.parent
+        root.end = len(self.summaries)
+        self.root = root
+        self.blocks = blocks
+        self.starts = [block.start for block in blocks]
+        self.version += 1
+
+    def block_at(self, line):
+        # The innermost block holding the line; an unclosed block runs to the
+        # end of the buffer.
+        position = bisect.bisect_right(self.starts, line) - 1
+        block = self.blocks[position] if position >= 0 else self.root
+        while block is not self.root and block.end is not None and block.end < line:
+            block = block.parent
+        return block
+
+    def scope_before(self, line):
+        # The block a line's names belong to: the innermost one open when
+        # the line starts, so not one the line itself opens.
+        position = bisect.bisect_left(self.starts, line) - 1
+        block = self.blocks[position] if position >= 0 else self.root
+        while block is not self.root and block.end is not None and block.end < line:
+            block = block.parent
+        return block
+
+    def block_starting(self, line):
+        position = bisect.bisect_left(self.starts, line)
+        if position < len(self.blocks) and self.blocks[position].start == line:
+            return self.blocks[position]
+        return None
+
+    def foldable(self, line):
+        # The block starting on the line, if it has inner lines to fold.
+        # Only looks at the tree as it is, so drawing never forces a parse:
+        # nothing while the tree is stale or not parsed yet.
+        if self.root is None or self.stale or self.summaries is None:
+            return None
+        block = self.block_starting(line)
+        if block is None or block.end is None or block.end <= block.start + 1:
+            return None
+        return block
+
+    def functions(self):
+        return [block for block in self.blocks if block.kind == "function"]
+
+    def names_at(self, line):
+        # Variables visible on the line, innermost scope first, then every
+        # function, which Pryzma can call from anywhere.
+        if self.parsed() is None:
+            return []
+        names = {}
+        block = self.block_at(line)
+        while block is not None:
+            names.update((name, True) for name, count in block.names.items() if count > 0 and name not in names)
+            block = block.parent
+        names.update((block.label, True) for block in self.functions() if block.label not in names)
+        return list(names)
+
+    def complete(self, prefix, line, limit=10):
+        return [name for name in self.names_at(line) if name.startswith(prefix) and name != prefix][:limit]
+
+
+def is_folded(text_widget, block):
+    return "folded" in text_widget.tag_names(f"{block.start}.end")
+
+
+def toggle_fold(text_widget, block):
+    # Elides the block's inner lines, from the end of its first line to the
+    # end of the line before its closing one, so the closing line stays.
+    if block.end is None or block.end <= block.start + 1:
+        return
+    text_widget.tag_configure("folded", elide=True)
+    if is_folded(text_widget, block):
+        text_widget.tag_remove("folded", f"{block.start}.end", f"{block.end - 1}.end")
+    else:
+        text_widget.tag_add("folded", f"{block.start}.end", f"{block.end - 1}.end")
+
+
+def unfold_line(text_widget, line):
+    while "folded" in text_widget.tag_names(f"{line}.0"):
+        start, end = text_widget.tag_prevrange("folded", f"{line}.0 +1c")
+        text_widget.tag_remove("folded", start, end)
@@ -0,0 +1,88 @@
+import ast
+import json
+import os
+import sys
+import time
+import traceback
+
+# Markers end a line; the NUL keeps them apart from anything a program
+# prints, even when its last line has no newline.
+marker = "\0ic-worker "
+
+
+def imported_modules(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module
+
+
+def warm_up(interpreter_path):
+    # Compiles the interpreter once and imports everything it imports, so
+    # a run only executes the interpreter's own top-level code.
+    with open(interpreter_path, "r", encoding="utf-8") as file:
+        source = file.read()
+    tree = ast.parse(source, interpreter_path)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(interpreter_path)))
+    for name in imported_modules(tree):
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    return compile(tree, interpreter_path, "exec")
+
+
+def run(code, interpreter_path, request):
+    warm_modules = set(sys.modules)
+    saved_argv = sys.argv
+    saved_cwd = os.getcwd()
+    sys.argv = [interpreter_path, request["path"]] + request.get("args", [])
+    namespace = {"__name__": "__main__", "__file__": interpreter_path, "__builtins__": __builtins__}
+    returncode = 0
+    started = time.perf_counter()
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        exec(code, namespace)
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            returncode = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException as e:
+        # The first frame is this function; leave it out of the traceback.
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        returncode = 1
+    finally:
+        duration = time.perf_counter() - started
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+        # Modules the program imported are dropped so the next run starts
+        # from the warmed-up state.
+        for name in set(sys.modules) - warm_modules:
+            del sys.modules[name]
+    for stream in (sys.stdout, sys.stderr):
+        stream.write(f"{marker}end {returncode} {duration}\n")
+        stream.flush()
+
+
+def main():
+    interpreter_path = sys.argv[1]
+    code = warm_up(interpreter_path)
+    sys.stdout.write(f"{marker}ready\n")
+    sys.stdout.flush()
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        if line.strip():
+            run(code, interpreter_path, json.loads(line))
+
+
+if __name__ == "__main__":
+    main()
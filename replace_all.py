@@ -0,0 +1,194 @@
+import os
+import re
+
+import file_io
+from find_in_files import block_size, is_binary, iter_files
+
+max_gap = 256
+max_span = 4096
+# Encodings in which an encoded query can be matched byte for byte; other
+# files (UTF-16/32, compressed) are skipped rather than rewritten.
+byte_encodings = ("utf-8", "cp1252", "latin-1")
+
+
+def compile_query(query, whole_word=False, encoding="utf-8"):
+    # Bytes pattern in the file's own encoding, so its newlines and every
+    # other byte pass through untouched; word boundaries are ASCII-only in
+    # bytes patterns. Raises UnicodeEncodeError when the encoding cannot
+    # hold the query.
+    pattern = re.escape(query.encode(encoding))
+    if whole_word:
+        pattern = rb'\b' + pattern + rb'\b'
+    return re.compile(pattern)
+
+
+def replacement_template(replacement, encoding="utf-8"):
+    return replacement.encode(encoding).replace(b"\\", b"\\\\")
+
+
+def file_encoding(path):
+    # (encoding, None) for a file that can be rewritten byte for byte, else
+    # (None, reason); binary and unreadable files have no reason.
+    try:
+        text_format = file_io.sniff_file(path)
+    except (OSError, EOFError, ValueError):
+        return None, None
+    if text_format.compression:
+        return None, f"{text_format.compression} compressed"
+    if text_format.encoding not in byte_encodings:
+        return None, f"{text_format.encoding.upper()} encoded"
+    return text_format.encoding, None
+
+
+def buffer_edits(document, matches, replacement):
+    # Turns the match list of a buffer into (start, end, text) edits. Matches
+    # that lie close together are merged into one edit of at most max_span
+    # characters, so a replace-all touching every line does not cost two
+    # widget calls per match.
+    edits = []
+    index = 0
+    while index < len(matches):
+        first = index
+        start, end = matches[index]
+        index += 1
+        while index < len(matches) and matches[index][0] - end <= max_gap and matches[index][1] - start <= max_span:
+            end = matches[index][1]
+            index += 1
+        if index - first == 1:
+            edits.append((start, end, replacement))
+            continue
+        text = document.get_text(start, end)
+        parts = []
+        previous = start
+        for match_start, match_end in matches[first:index]:
+            parts.append(text[previous - start:match_start - start])
+            parts.append(replacement)
+            previous = match_end
+        edits.append((start, end, "".join(parts)))
+    return edits
+
+
+def blocks(path):
+    # Newline-cut blocks, as in find_in_files.search_file.
+    with open(path, "rb") as file:
+        carry = b""
+        while True:
+            data = file.read(block_size)
+            if not data:
+                break
+            data = carry + data
+            cut = data.rfind(b"\n") + 1
+            carry = data[cut:]
+            if cut:
+                yield data[:cut]
+        if carry:
+            yield carry
+
+
+def count_in_file(path, pattern):
+    count = 0
+    try:
+        for number, block in enumerate(blocks(path)):
+            if not number and is_binary(block[:8192]):
+                return 0
+            count += len(pattern.findall(block))
+    except OSError:
+        return 0
+    return count
+
+
+def replace_in_file(path, pattern, template, progress=None):
+    total = os.path.getsize(path)
+    replaced = 0
+
+    def replaced_blocks():
+        nonlocal replaced
+        for block in blocks(path):
+            block, count = pattern.subn(template, block)
+            replaced += count
+            yield block
+
+    # atomic_write counts progress in written bytes, which only roughly
+    # follows the input once replacements change the length.
+    file_io.atomic_write(path, replaced_blocks(), total, progress, binary=True)
+    return replaced
+
+
+def expand_paths(paths, ignore=()):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from iter_files(path, ignore)
+        elif os.path.isfile(path):
+            yield path
+
+
+class FileReplace:
+    # Counts the matches per file first, so the user can confirm the total,
+    # then rewrites only the files that had matches. Query and replacement
+    # are encoded in each file's own encoding. Each file is streamed block
+    # by block into a temporary file that replaces it atomically. Files in
+    # exclude (open with unsaved changes) and files that cannot be rewritten
+    # safely end up in skipped, with the reason.
+    def __init__(self, paths, query, replacement, whole_word=False, ignore=(), exclude=()):
+        self.paths = paths
+        self.ignore = set(ignore)
+        self.query = query
+        self.replacement = replacement
+        self.whole_word = whole_word
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.patterns = {}
+        self.encodings = {}
+        self.counts = {}
+        self.skipped = {}
+        self.replaced = 0
+
+    def pattern_for(self, encoding):
+        # (pattern, template) for the encoding; either is None when the
+        # encoding cannot hold it.
+        if encoding not in self.patterns:
+            try:
+                pattern = compile_query(self.query, self.whole_word, encoding)
+            except UnicodeEncodeError:
+                pattern = None
+            try:
+                template = replacement_template(self.replacement, encoding)
+            except UnicodeEncodeError:
+                template = None
+            self.patterns[encoding] = pattern, template
+        return self.patterns[encoding]
+
+    def preview(self, report=None):
+        for path in expand_paths(self.paths, self.ignore):
+            encoding, reason = file_encoding(path)
+            if encoding is None:
+                if reason:
+                    self.skipped[path] = reason
+                continue
+            pattern, template = self.pattern_for(encoding)
+            count = count_in_file(path, pattern) if pattern is not None else 0
+            if not count:
+                continue
+            if template is None:
+                self.skipped[path] = f"{encoding} cannot hold the replacement"
+            elif os.path.abspath(path) in self.exclude:
+                self.skipped[path] = "open with unsaved changes"
+            else:
+                self.counts[path] = count
+                self.encodings[path] = encoding
+        return sum(self.counts.values())
+
+    def skip(self, paths, reason):
+        # Drops files that became unsafe to rewrite after the preview.
+        for path in list(self.counts):
+            if os.path.abspath(path) in paths:
+                del self.counts[path]
+                self.skipped[path] = reason
+
+    def run(self, report=None):
+        total = sum(self.counts.values())
+        for path in self.counts:
+            pattern, template = self.pattern_for(self.encodings[path])
+            self.replaced += replace_in_file(path, pattern, template)
+            if report:
+                report(self.replaced / total)
+        return self.replaced
@@ -0,0 +1,255 @@
+import codecs
+import collections
+import json
+import os
+import subprocess
+import threading
+import time
+
+from pryzma_worker import marker
+
+worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pryzma_worker.py")
+read_size = 1 << 16
+
+
+def child_environment():
+    # Child Pythons would otherwise block-buffer their piped output.
+    return dict(os.environ, PYTHONUNBUFFERED="1")
+
+
+def read_lines(pipe, on_lines):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    carry = ""
+    while True:
+        data = pipe.read(read_size)
+        if not data:
+            break
+        lines = (carry + decoder.decode(data)).replace("\r\n", "\n").split("\n")
+        carry = lines.pop()
+        if len(carry) > read_size:
+            # Output without newlines (progress bars) is cut into pieces
+            # instead of growing one line without bound.
+            lines.append(carry)
+            carry = ""
+        if lines:
+            on_lines(lines)
+    carry += decoder.decode(b"", final=True)
+    if carry:
+        on_lines([carry])
+    pipe.close()
+
+
+def kill_after(process, timeout):
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class OutputBuffer:
+    # Lines waiting for the UI, in a bounded deque; if a program prints
+    # faster than the UI drains, the oldest lines are dropped and counted,
+    # so memory stays bounded.
+    warm = False
+
+    def __init__(self, args, cwd=None, max_lines=10000):
+        self.args = list(args)
+        self.cwd = cwd
+        self.pending = collections.deque(maxlen=max_lines)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.started = None
+        self.duration = None
+        self.returncode = None
+
+    def push(self, stream, lines):
+        with self.lock:
+            overflow = len(self.pending) + len(lines) - self.pending.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.pending.extend((stream, line) for line in lines)
+
+    def take(self):
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped = self.dropped
+            self.dropped = 0
+        return lines, dropped
+
+    def running(self):
+        return self.started is not None and self.returncode is None
+
+    def finish(self, returncode):
+        self.duration = time.perf_counter() - self.started
+        # Set last: once it is not None every line has been pushed.
+        self.returncode = returncode
+
+
+class ProcessRunner(OutputBuffer):
+    # Runs a program without a shell; two reader threads feed its stdout
+    # and stderr into the buffer.
+    def start(self):
+        self.process = subprocess.Popen(self.args, cwd=self.cwd, env=child_environment(), bufsize=0,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.started = time.perf_counter()
+        self.readers = [threading.Thread(target=read_lines, args=(self.process.stdout, lambda lines: self.lines_read("stdout", lines)), daemon=True),
+                        threading.Thread(target=read_lines, args=(self.process.stderr, lambda lines: self.lines_read("stderr", lines)), daemon=True)]
+        for reader in self.readers:
+            reader.start()
+        threading.Thread(target=self.wait, daemon=True).start()
+
+    def lines_read(self, stream, lines):
+        self.push(stream, lines)
+
+    def wait(self):
+        returncode = self.process.wait()
+        for reader in self.readers:
+            reader.join()
+        self.finish(returncode)
+
+    def send(self, text):
+        try:
+            self.process.stdin.write(text.encode("utf-8"))
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            pass
+
+    def stop(self, timeout=2.0):
+        if self.process.poll() is None:
+            self.process.terminate()
+            threading.Thread(target=kill_after, args=(self.process, timeout), daemon=True).start()
+
+
+class WarmRun(OutputBuffer):
+    warm = True
+
+    def __init__(self, worker, args, cwd=None, max_lines=10000):
+        OutputBuffer.__init__(self, args, cwd, max_lines)
+        self.worker = worker
+
+    def send(self, text):
+        self.worker.send(text)
+
+    def stop(self, timeout=2.0):
+        self.worker.stop(timeout)
+
+
+class WorkerProcess(ProcessRunner):
+    # A pre-started pryzma_worker.py with the interpreter already compiled
+    # and its imports loaded. Runs are requested as JSON lines on stdin and
+    # their output ends with an end marker on both stdout and stderr; the
+    # lines in between go to the WarmRun of the current request.
+    def __init__(self, pool):
+        ProcessRunner.__init__(self, [pool.python, worker_script, pool.interpreter_path])
+        self.pool = pool
+        self.ready = False
+        self.retired = False
+        self.runs = 0
+        self.current = None
+        self.ended = set()
+
+    def idle(self):
+        return self.ready and not self.retired and self.current is None
+
+    def request(self, path, args=(), cwd=None):
+        run = WarmRun(self, [self.pool.python, self.pool.interpreter_path, path] + list(args), cwd, self.pool.max_lines)
+        run.started = time.perf_counter()
+        self.current = run
+        self.ended = set()
+        self.send(json.dumps({"path": path, "args": list(args), "cwd": cwd}) + "\n")
+        return run
+
+    def lines_read(self, stream, lines):
+        # Output outside of a run (a failing warm-up) stays in the worker's
+        # own buffer.
+        start = 0
+        for index, line in enumerate(lines):
+            if marker in line:
+                before, _, info = line.partition(marker)
+                chunk = lines[start:index] + ([before] if before else [])
+                if chunk:
+                    (self.current or self).push(stream, chunk)
+                self.marker_read(stream, info.split())
+                start = index + 1
+        if start < len(lines):
+            (self.current or self).push(stream, lines[start:])
+
+    def marker_read(self, stream, words):
+        if words[0] == "ready":
+            self.ready = True
+            return
+        with self.lock:
+            self.ended.add(stream)
+            run = self.current
+            if len(self.ended) < 2 or run is None:
+                return
+            self.current = None
+            self.runs += 1
+        run.finish(int(words[1]))
+        if self.runs >= self.pool.max_runs:
+            self.stop()
+
+    def stop(self, timeout=2.0):
+        self.retired = True
+        ProcessRunner.stop(self, timeout)
+
+    def finish(self, returncode):
+        # The worker itself exited: recycled, stopped or crashed.
+        self.retired = True
+        run = self.current
+        self.current = None
+        if run is not None:
+            run.finish(returncode)
+        OutputBuffer.finish(self, returncode)
+        self.pool.worker_exited(self)
+
+
+class WorkerPool:
+    # Keeps `size` warm workers around. A worker is replaced after max_runs
+    # runs, so state leaking between runs cannot pile up, and whenever it
+    # exits (crash, os._exit, Stop). A worker that exits before it got ready
+    # means the interpreter cannot be warmed up, and the pool stops refilling.
+    def __init__(self, python, interpreter_path, size=2, max_runs=20, max_lines=10000):
+        self.python = python
+        self.interpreter_path = interpreter_path
+        self.size = size
+        self.max_runs = max_runs
+        self.max_lines = max_lines
+        self.lock = threading.Lock()
+        self.workers = []
+        self.closed = False
+        self.failed = False
+        self.error = ""
+        self.fill()
+
+    def fill(self):
+        with self.lock:
+            self.workers = [worker for worker in self.workers if worker.returncode is None]
+            while not self.closed and not self.failed and len(self.workers) < self.size:
+                worker = WorkerProcess(self)
+                worker.start()
+                self.workers.append(worker)
+
+    def run(self, path, args=(), cwd=None):
+        # Returns None when no worker is ready; the caller then starts the
+        # program cold.
+        with self.lock:
+            worker = next((worker for worker in self.workers if worker.idle()), None)
+            if worker is None:
+                return None
+            return worker.request(path, args, cwd)
+
+    def ready_workers(self):
+        return sum(1 for worker in self.workers if worker.idle())
+
+    def worker_exited(self, worker):
+        if not worker.ready and not self.closed:
+            self.failed = True
+            self.error = "\n".join(line for stream, line in worker.take()[0][-5:])
+        self.fill()
+
+    def close(self):
+        self.closed = True
+        for worker in self.workers:
+            worker.stop()
@@ -0,0 +1,34 @@
+import sys
+import time
+
+
+class StartupProfile:
+    # Times the startup phases. Phases on the Tk thread run one after the
+    # other and are timed from the previous mark; background phases are
+    # timed from when they were started. The breakdown is printed once every
+    # pending phase has been marked.
+    def __init__(self, started, enabled=False, pending=()):
+        self.started = started
+        self.last = started
+        self.enabled = enabled
+        self.pending = set(pending)
+        self.phases = []
+
+    def mark(self, phase, since=None):
+        now = time.perf_counter()
+        self.phases.append((phase, now - (self.last if since is None else since), now - self.started))
+        if since is None:
+            self.last = now
+        if phase in self.pending:
+            self.pending.discard(phase)
+            if not self.pending:
+                self.report()
+
+    def report(self, file=None):
+        if not self.enabled:
+            return
+        file = file or sys.stderr
+        print(f"{'phase':<14}{'took':>10}{'at':>10}", file=file)
+        for phase, took, at in self.phases:
+            print(f"{phase:<14}{took * 1000:>8.1f}ms{at * 1000:>8.1f}ms", file=file)
+        file.flush()
@@ -0,0 +1,121 @@
+import marshal
+import os
+import re
+
+from file_io import cache_directory
+
+MAGIC = b"ICSR"
+VERSION = 1
+
+
+def parse_syntax_file(syntax_file):
+    extension = None
+    colors = {}
+    with open(syntax_file, "r") as file:
+        lines = file.readlines()
+    if lines and lines[0].startswith('#'):
+        extension = lines[0][1:].strip()
+        lines = lines[1:]
+    for line in lines:
+        if ":" in line:
+            word, color = line.strip().split(":")
+            colors[word.strip()] = color.strip()
+    return extension, colors
+
+
+def pattern_source(words):
+    # Identifiers are matched whole with \w+ and looked up afterwards, so a
+    # keyword never matches inside a longer word ("in" in "print"). Operators
+    # go into the alternation longest first so that "==" wins over "=".
+    operators = sorted((word for word in words if not re.fullmatch(r"\w+", word)), key=len, reverse=True)
+    if not words:
+        return None
+    return "|".join([re.escape(word) for word in operators] + [r"\w+"])
+
+
+def compile_pattern(words):
+    source = pattern_source(words)
+    return re.compile(source, re.IGNORECASE) if source is not None else None
+
+
+def read_cache(path):
+    try:
+        with open(path, "rb") as file:
+            if file.read(8) != MAGIC + bytes([VERSION, marshal.version, 0, 0]):
+                return {}
+            cache = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + bytes([VERSION, marshal.version, 0, 0]))
+        file.write(marshal.dumps(cache))
+    os.replace(temp_path, path)
+
+
+def load_rules(syntax_files, cache_path=None):
+    # Parses the syntax files, reusing the parsed colors and pattern source
+    # of files whose mtime and size match the binary cache. Returns a list
+    # of (extension, colors, rules) and a list of error messages; rules is
+    # None for files without an extension line.
+    cache_path = cache_path or os.path.join(cache_directory(), "syntax-rules.bin")
+    cache = read_cache(cache_path)
+    fresh = {}
+    loaded = []
+    errors = []
+    for syntax_file in syntax_files:
+        try:
+            stat = os.stat(syntax_file)
+        except OSError:
+            errors.append(f"Syntax file not found: {syntax_file}")
+            continue
+        entry = cache.get(syntax_file)
+        if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            try:
+                extension, colors = parse_syntax_file(syntax_file)
+            except Exception as e:
+                errors.append(f"Failed to parse syntax file {syntax_file}: {str(e)}")
+                continue
+            lookup = {word.lower() for word in colors if word}
+            entry = (stat.st_mtime_ns, stat.st_size, extension, colors, pattern_source(lookup) if extension is not None else None)
+        fresh[syntax_file] = entry
+        mtime, size, extension, colors, source = entry
+        loaded.append((extension, colors, SyntaxRules(colors, source) if extension is not None else None))
+    if fresh != cache:
+        try:
+            write_cache(cache_path, fresh)
+        except OSError:
+            pass
+    return loaded, errors
+
+
+class SyntaxRules:
+    def __init__(self, colors, source=None):
+        self.colors = dict(colors)
+        self.lookup = {word.lower(): color for word, color in self.colors.items() if word}
+        if source is None:
+            self.pattern = compile_pattern(self.lookup)
+        else:
+            self.pattern = re.compile(source, re.IGNORECASE)
+
+    def __bool__(self):
+        return self.pattern is not None
+
+    def keys(self):
+        return self.colors.keys()
+
+    def tokenize(self, line):
+        if self.pattern is None:
+            return []
+        lookup = self.lookup
+        spans = []
+        for match in self.pattern.finditer(line):
+            color = lookup.get(match.group().lower())
+            if color is not None:
+                spans.append((match.start(), match.end(), color))
+        return spans
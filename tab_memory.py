@@ -0,0 +1,38 @@
+import sys
+import zlib
+
+
+def buffer_memory(document):
+    # Estimate: the Python chunks of the Document plus about as much again
+    # for the Tk text widget's own copy of the text.
+    return 2 * sum(map(sys.getsizeof, document.chunks))
+
+
+def write_spill(path, chunks):
+    # Level 1: the point is to get the text out of memory quickly, and
+    # source code still compresses several times over.
+    compressor = zlib.compressobj(1)
+    with open(path, "wb") as file:
+        for chunk in chunks:
+            file.write(compressor.compress(chunk.encode("utf-8", errors="surrogatepass")))
+        file.write(compressor.flush())
+
+
+def read_spill(path):
+    with open(path, "rb") as file:
+        return zlib.decompress(file.read()).decode("utf-8", errors="surrogatepass")
+
+
+def hibernation_candidates(tabs, budget):
+    # tabs are (key, memory, last_used, eligible) tuples. Returns the keys to
+    # hibernate, least recently used first, until the awake tabs fit the
+    # budget.
+    total = sum(memory for key, memory, last_used, eligible in tabs)
+    chosen = []
+    for key, memory, last_used, eligible in sorted(tabs, key=lambda tab: tab[2]):
+        if total <= budget:
+            break
+        if eligible and memory:
+            chosen.append(key)
+            total -= memory
+    return chosen
@@ -0,0 +1,495 @@
+import bisect
+import csv
+import io
+import itertools
+import os
+import tkinter as tk
+from tkinter import ttk
+from array import array
+
+import file_io
+
+report_rows = 10000
+
+
+def column_name(index):
+    name = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+class Column:
+    # The cells of one column as UTF-8 in a single bytearray, with an offset
+    # per row; edited cells are kept in a dict on top. A million short cells
+    # take a few megabytes instead of a million str objects.
+    def __init__(self, rows=0):
+        self.data = bytearray()
+        self.offsets = array("Q", bytes(8 * (rows + 1)))
+        self.edits = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, value):
+        self.data += value.encode("utf-8", errors="surrogateescape")
+        self.offsets.append(len(self.data))
+
+    def extend(self, values):
+        encoded = [value.encode("utf-8", errors="surrogateescape") for value in values]
+        ends = itertools.accumulate(map(len, encoded), initial=len(self.data))
+        next(ends)
+        self.data += b"".join(encoded)
+        self.offsets.extend(ends)
+
+    def get(self, row):
+        if self.edits and row in self.edits:
+            return self.edits[row]
+        offsets = self.offsets
+        return self.data[offsets[row]:offsets[row + 1]].decode("utf-8", errors="surrogateescape")
+
+    def set(self, row, value):
+        self.edits[row] = value
+
+    def memory(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ColumnStore:
+    def __init__(self, headers=()):
+        self.headers = []
+        self.columns = []
+        self.rows = 0
+        self.version = 0
+        for header in headers:
+            self.add_column(header)
+
+    @classmethod
+    def blank(cls, rows, columns):
+        store = cls()
+        store.headers = [column_name(index) for index in range(columns)]
+        store.columns = [Column(rows) for _ in range(columns)]
+        store.rows = rows
+        return store
+
+    def add_column(self, header=None):
+        self.headers.append(header if header is not None else column_name(len(self.columns)))
+        self.columns.append(Column(self.rows))
+
+    def extend_rows(self, rows):
+        # Appends a batch column by column, which is several times faster
+        # than appending cell by cell.
+        if not rows:
+            return
+        width = max(map(len, rows))
+        while width > len(self.columns):
+            self.add_column()
+        columns = zip(*(values + [""] * (width - len(values)) if len(values) < width else values for values in rows))
+        for column, values in zip(self.columns, columns):
+            column.extend(values)
+        for column in self.columns[width:]:
+            column.extend([""] * len(rows))
+        self.rows += len(rows)
+
+    def get(self, row, column):
+        return self.columns[column].get(row)
+
+    def set(self, row, column, value):
+        self.columns[column].set(row, value)
+        self.version += 1
+
+    def row(self, row):
+        return [column.get(row) for column in self.columns]
+
+    def memory(self):
+        return sum(column.memory() for column in self.columns)
+
+
+def guess_delimiter(path, sample):
+    if os.path.splitext(path)[1].lower() in (".tsv", ".tab"):
+        return "\t"
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def dialect_options(delimiter):
+    # Tab-separated files are not quoted; a tab or newline inside a cell is
+    # escaped instead.
+    if delimiter == "\t":
+        return {"delimiter": delimiter, "quoting": csv.QUOTE_NONE, "escapechar": "\\"}
+    return {"delimiter": delimiter}
+
+
+def read_table(path, store, report=None, delimiter=None):
+    # Streams the rows into store, which the UI may already be showing; the
+    # first row holds the column names.
+    size = os.path.getsize(path)
+    with open(path, "r", newline="", encoding="utf-8", errors="surrogateescape") as file:
+        if delimiter is None:
+            delimiter = guess_delimiter(path, file.read(65536))
+            file.seek(0)
+        reader = csv.reader(file, **dialect_options(delimiter))
+        header = next(reader, None)
+        if header is None:
+            return store
+        for name in header[len(store.headers):]:
+            store.add_column(name)
+        while True:
+            rows = list(itertools.islice(reader, report_rows))
+            if not rows:
+                break
+            store.extend_rows(rows)
+            if report and size:
+                report(min(1.0, file.buffer.tell() / size))
+    return store
+
+
+def table_chunks(store, rows=None, delimiter=","):
+    # Encoded CSV in blocks of report_rows rows, fetched column by column.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n", **dialect_options(delimiter))
+    writer.writerow(store.headers)
+    rows = iter(rows if rows is not None else range(store.rows))
+    while True:
+        block = list(itertools.islice(rows, report_rows))
+        if not block:
+            break
+        writer.writerows(zip(*([column.get(row) for row in block] for column in store.columns)))
+        yield buffer.getvalue().encode("utf-8", errors="surrogateescape")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8", errors="surrogateescape")
+
+
+def sort_rows(store, column, reverse=False):
+    # Numeric columns sort by value with empty cells last, others
+    # case-insensitively.
+    values = [store.get(row, column) for row in range(store.rows)]
+    try:
+        keys = [float(value) if value else float("inf") for value in values]
+    except ValueError:
+        keys = [value.lower() for value in values]
+    rows = sorted(range(store.rows), key=keys.__getitem__, reverse=reverse)
+    return array("I", rows)
+
+
+def matching_rows(column, needle):
+    # Searches the column buffer itself instead of decoding every cell; a
+    # match that runs past the end of its cell is skipped.
+    data = bytes(column.data).lower()
+    offsets = column.offsets
+    rows = set()
+    position = data.find(needle)
+    while position != -1:
+        row = bisect.bisect_right(offsets, position) - 1
+        end = offsets[row + 1]
+        if position + len(needle) <= end:
+            rows.add(row)
+            position = data.find(needle, end)
+        else:
+            position = data.find(needle, position + 1)
+    query = needle.decode("utf-8", errors="surrogateescape")
+    for row, value in column.edits.items():
+        if query in value.lower():
+            rows.add(row)
+        else:
+            rows.discard(row)
+    return rows
+
+
+def filter_rows(store, query, rows=None):
+    needle = query.lower().encode("utf-8", errors="surrogateescape")
+    matched = set()
+    for column in store.columns:
+        matched |= matching_rows(column, needle)
+    return array("I", [row for row in (rows if rows is not None else range(store.rows)) if row in matched])
+
+
+class TableView:
+    # Virtualized grid over a ColumnStore: only the cells that fit on screen
+    # exist as Entry widgets, and scrolling reassigns their text. Imports,
+    # exports, sorting and filtering run on the IOWorker.
+    column_width = 14
+
+    def __init__(self, master, store, worker):
+        self.store = store
+        self.worker = worker
+        self.path = None
+        self.modified = False
+        self.order = None
+        self.sorted = None
+        self.sort_column = None
+        self.reverse = False
+        self.query = ""
+        self.job = 0
+        self.first_row = 0
+        self.first_column = 0
+        self.headers = []
+        self.row_labels = []
+        self.cells = []
+        self.positions = {}
+
+        self.frame = tk.Frame(master)
+        toolbar = tk.Frame(self.frame)
+        toolbar.pack(side=tk.TOP, fill=tk.X)
+        tk.Label(toolbar, text="Filter:").pack(side=tk.LEFT)
+        self.filter_entry = tk.Entry(toolbar)
+        self.filter_entry.pack(side=tk.LEFT)
+        self.filter_entry.bind("<Return>", lambda event: self.apply_filter())
+        self.status = tk.Label(toolbar, text="", anchor=tk.W)
+        self.status.pack(side=tk.LEFT, expand=tk.YES, fill=tk.X)
+
+        body = tk.Frame(self.frame)
+        body.pack(expand=tk.YES, fill=tk.BOTH)
+        self.grid_frame = tk.Frame(body)
+        self.grid_frame.grid(row=0, column=0, sticky=tk.NSEW)
+        # The cells follow the frame's size, never the other way round.
+        self.grid_frame.grid_propagate(False)
+        self.vbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.vbar.grid(row=0, column=1, sticky=tk.NS)
+        self.hbar = ttk.Scrollbar(body, orient=tk.HORIZONTAL, command=self.xview)
+        self.hbar.grid(row=1, column=0, sticky=tk.EW)
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+        self.grid_frame.bind("<Configure>", self.resized)
+        self.bind_wheel(self.grid_frame)
+
+        probe = tk.Entry(self.grid_frame, width=self.column_width)
+        self.row_height = probe.winfo_reqheight()
+        self.cell_width = probe.winfo_reqwidth()
+        probe.destroy()
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda event: self.scroll_rows(-3 if event.delta > 0 else 3))
+        widget.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        widget.bind("<Button-5>", lambda event: self.scroll_rows(3))
+
+    def set_status(self, text):
+        self.status.config(text=text)
+
+    def row_count(self):
+        return len(self.order) if self.order is not None else self.store.rows
+
+    def row_id(self, index):
+        return self.order[index] if self.order is not None else index
+
+    def resized(self, event):
+        rows = max(1, event.height // self.row_height - 1)
+        columns = max(1, (event.width - self.cell_width // 2) // self.cell_width)
+        if rows != len(self.cells) or columns != len(self.headers):
+            self.build(rows, columns)
+
+    def build(self, rows, columns):
+        self.commit_focus()
+        for widget in self.grid_frame.winfo_children():
+            widget.destroy()
+        self.positions = {}
+        tk.Label(self.grid_frame, text="").grid(row=0, column=0)
+        self.headers = []
+        for column in range(columns):
+            header = tk.Label(self.grid_frame, text="", relief=tk.RAISED, width=self.column_width)
+            header.grid(row=0, column=column + 1, sticky=tk.EW)
+            header.bind("<Button-1>", lambda event, column=column: self.sort_by(self.first_column + column))
+            self.bind_wheel(header)
+            self.headers.append(header)
+        self.row_labels = []
+        self.cells = []
+        for row in range(rows):
+            label = tk.Label(self.grid_frame, text="", anchor=tk.E, width=8)
+            label.grid(row=row + 1, column=0, sticky=tk.EW)
+            self.bind_wheel(label)
+            self.row_labels.append(label)
+            entries = []
+            for column in range(columns):
+                entry = tk.Entry(self.grid_frame, relief=tk.GROOVE, width=self.column_width)
+                entry.grid(row=row + 1, column=column + 1, sticky=tk.NSEW)
+                entry.bind("<Return>", lambda event, row=row, column=column: self.move_focus(row + 1, column))
+                entry.bind("<Down>", lambda event, row=row, column=column: self.move_focus(row + 1, column))
+                entry.bind("<Up>", lambda event, row=row, column=column: self.move_focus(row - 1, column))
+                entry.bind("<FocusOut>", lambda event, entry=entry: self.commit(entry))
+                self.bind_wheel(entry)
+                self.positions[entry] = (row, column)
+                entries.append(entry)
+            self.cells.append(entries)
+        self.render()
+
+    def render(self):
+        self.commit_focus()
+        store = self.store
+        count = self.row_count()
+        self.first_row = max(0, min(self.first_row, count - len(self.cells)))
+        self.first_column = max(0, min(self.first_column, len(store.columns) - len(self.headers)))
+        for offset, header in enumerate(self.headers):
+            column = self.first_column + offset
+            text = store.headers[column] if column < len(store.headers) else ""
+            if column == self.sort_column:
+                text += " \u25bc" if self.reverse else " \u25b2"
+            header.config(text=text)
+        for offset, entries in enumerate(self.cells):
+            index = self.first_row + offset
+            row = self.row_id(index) if index < count else None
+            self.row_labels[offset].config(text=str(row + 1) if row is not None else "")
+            for column_offset, entry in enumerate(entries):
+                column = self.first_column + column_offset
+                entry.delete(0, tk.END)
+                if row is not None and column < len(store.columns):
+                    entry.insert(0, store.get(row, column))
+        visible = max(1, len(self.cells))
+        self.vbar.set(self.first_row / max(1, count), min(1.0, (self.first_row + visible) / max(1, count)))
+        columns = max(1, len(store.columns))
+        self.hbar.set(self.first_column / columns, min(1.0, (self.first_column + len(self.headers)) / columns))
+
+    def commit(self, entry):
+        position = self.positions.get(entry)
+        if position is None:
+            return
+        index = self.first_row + position[0]
+        column = self.first_column + position[1]
+        if index >= self.row_count() or column >= len(self.store.columns):
+            return
+        row = self.row_id(index)
+        value = entry.get()
+        if value != self.store.get(row, column):
+            self.store.set(row, column, value)
+            self.modified = True
+            if column == self.sort_column:
+                self.sorted = None
+
+    def commit_focus(self):
+        try:
+            focus = self.frame.focus_get()
+        except (KeyError, tk.TclError):
+            return
+        if focus in self.positions:
+            self.commit(focus)
+
+    def move_focus(self, row, column):
+        if row < 0:
+            self.scroll_rows(-1)
+            row = 0
+        elif row >= len(self.cells):
+            self.scroll_rows(1)
+            row = len(self.cells) - 1
+        self.cells[row][column].focus_set()
+        return "break"
+
+    def scroll_rows(self, delta):
+        self.first_row += delta
+        self.render()
+
+    def yview(self, *args):
+        count = self.row_count()
+        if args[0] == "moveto":
+            self.first_row = int(float(args[1]) * count)
+        else:
+            step = max(1, len(self.cells) - 1) if args[2].startswith("page") else 1
+            self.first_row += int(args[1]) * step
+        self.render()
+
+    def xview(self, *args):
+        columns = len(self.store.columns)
+        if args[0] == "moveto":
+            self.first_column = int(float(args[1]) * columns)
+        else:
+            self.first_column += int(args[1])
+        self.render()
+
+    def update_view(self):
+        # Sorts (once per column and direction) and filters on the worker;
+        # results of a job that was overtaken by a newer one are dropped.
+        self.commit_focus()
+        self.job += 1
+        job = self.job
+        store = self.store
+        sort_column = self.sort_column
+        reverse = self.reverse
+        query = self.query
+        sorted_rows = self.sorted
+
+        def work(report):
+            rows = sorted_rows
+            if rows is None and sort_column is not None:
+                rows = sort_rows(store, sort_column, reverse)
+            order = filter_rows(store, query, rows) if query else rows
+            return rows, order
+
+        self.set_status("Sorting and filtering...")
+        self.worker.submit(work, lambda result: self.view_updated(job, result),
+                           lambda e: self.set_status(f"Failed: {str(e)}"))
+
+    def view_updated(self, job, result):
+        if job != self.job:
+            return
+        self.sorted, self.order = result
+        self.first_row = 0
+        self.set_status(f"{self.row_count()} of {self.store.rows} rows" if self.query else f"{self.store.rows} rows")
+        self.render()
+
+    def sort_by(self, column):
+        if column >= len(self.store.columns):
+            return
+        self.reverse = not self.reverse if column == self.sort_column else False
+        self.sort_column = column
+        self.sorted = None
+        self.update_view()
+
+    def apply_filter(self):
+        self.query = self.filter_entry.get()
+        self.update_view()
+
+    def import_file(self, path, on_done=None):
+        self.path = path
+        self.set_status(f"Loading {os.path.basename(path)}...")
+        self.worker.submit(lambda report: read_table(path, self.store, report),
+                           lambda store: self.imported(on_done),
+                           lambda e: self.set_status(f"Failed to load {path}: {str(e)}"),
+                           self.import_progress)
+
+    def import_progress(self, fraction):
+        self.set_status(f"Loading {os.path.basename(self.path)}: {self.store.rows} rows ({fraction:.0%})")
+        if self.order is None:
+            self.render()
+
+    def imported(self, on_done=None):
+        self.modified = False
+        self.sorted = None
+        if self.sort_column is not None or self.query:
+            self.update_view()
+        else:
+            self.set_status(f"{self.store.rows} rows")
+            self.render()
+        if on_done:
+            on_done(self)
+
+    def filtered(self):
+        return bool(self.query) and self.order is not None
+
+    def export_file(self, path, on_done=None, view=False):
+        # Writes every row, in the order shown. With view only the rows the
+        # filter shows are written; that file is an export, so the table
+        # keeps its own path and stays modified.
+        self.commit_focus()
+        delimiter = "\t" if os.path.splitext(path)[1].lower() in (".tsv", ".tab") else ","
+        view = view and self.filtered()
+        rows = self.order if view else self.sorted
+        written = len(rows) if rows is not None else self.store.rows
+        chunks = table_chunks(self.store, rows, delimiter)
+        self.set_status(f"Saving {os.path.basename(path)}...")
+        self.worker.submit(lambda report: file_io.atomic_write(path, chunks, None, None, binary=True),
+                           lambda result: self.exported(path, written, view, on_done),
+                           lambda e: self.set_status(f"Failed to save {path}: {str(e)}"), None, os.path.realpath(path))
+
+    def exported(self, path, written, view, on_done=None):
+        if view:
+            self.set_status(f"Exported the {written} filtered of {self.store.rows} rows to {os.path.basename(path)}")
+        else:
+            self.path = path
+            self.modified = False
+            self.set_status(f"Saved {written} rows to {os.path.basename(path)}")
+        if on_done:
+            on_done(self)
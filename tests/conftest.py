@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def editor_module():
+    # The editor's file name is not importable and its window is only built
+    # under its __main__ guard.
+    spec = importlib.util.spec_from_file_location("ic_text_editor", os.path.join(ROOT, "IC-Text-Editor.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,135 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+import autosave
+from conftest import ROOT
+from document import Document
+
+
+class Master:
+    # Stands in for the Tk root: after() only queues the callback.
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def run_pending(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+@pytest.fixture
+def editor(editor_module, tmp_path):
+    editor = editor_module.TextEditor.__new__(editor_module.TextEditor)
+    editor.master = Master()
+    editor.session = autosave.Session(str(tmp_path))
+    editor.text_areas = []
+    editor.tab_journals = []
+    editor.hibernated_tabs = {}
+    editor.restore_session = False
+    editor.autosave_interval = 500
+    editor.autosave_job = None
+    editor.watch_interval = 1000
+    editor.watch_polling = True
+    editor.status = []
+    editor.set_status = editor.status.append
+    yield editor
+    # The writer thread is stopped even when the test failed.
+    editor.session.close([], None)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_editor_autosave_flushes_the_journal(editor, tmp_path):
+    editor.load_session()
+    assert editor.master.scheduled == [editor.autosave]
+    document = Document("start\n")
+    journal = autosave.TabJournal(editor.session, document, "Tab 1")
+    journal.inserted("1.5", " typed")
+    document.inserted("1.5", " typed")
+    editor.master.run_pending()
+    # autosave handed the edits to the writer and scheduled itself again.
+    assert editor.session.pending == []
+    assert editor.master.scheduled == [editor.autosave]
+
+    def restored():
+        tabs, generation = autosave.load_session(str(tmp_path))
+        return [tab["content"] for tab in tabs] == ["start typed\n"]
+    wait_for(restored)
+
+
+def test_failed_restore_still_starts_autosave(editor):
+    editor.session_failed("failed")
+    assert editor.status == ["failed"]
+    assert editor.master.scheduled == [editor.autosave]
+    editor.master.run_pending()
+    assert editor.master.scheduled == [editor.autosave]
+
+
+def test_poll_failure_does_not_start_autosave(editor):
+    editor.file_system_poll_failed(OSError("gone"))
+    editor.file_system_poll_failed(OSError("gone"))
+    assert editor.autosave not in editor.master.scheduled
+    assert editor.master.scheduled == [editor.poll_file_system] * 2
+
+
+# Journals edits to one tab. After the first batch it waits until that batch
+# is on disk, says so, and keeps editing without flushing until it is killed.
+child = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import autosave
+from document import Document
+
+session = autosave.Session(sys.argv[2])
+session.start([], None)
+document = Document("one\\ntwo\\n")
+journal = autosave.TabJournal(session, document, "Tab 1")
+
+def edit(start, text):
+    journal.inserted(start, text)
+    document.inserted(start, text)
+
+edit("1.3", "!")
+journal.deleted("2.0", "2.1")
+document.deleted("2.0", "2.1")
+edit("3.0", "three")
+session.flush()
+deadline = time.time() + 10
+while time.time() < deadline and [tab["content"] for tab in autosave.load_session(sys.argv[2])[0]] != [document.text()]:
+    time.sleep(0.01)
+print(document.text().replace("\\n", "|"), flush=True)
+while True:
+    edit("1.0", "unflushed ")
+    time.sleep(0.001)
+"""
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_journal_replays_after_the_process_is_killed(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", child, ROOT, str(tmp_path)], stdout=subprocess.PIPE, text=True)
+    try:
+        flushed = process.stdout.readline().strip().replace("|", "\n")
+        time.sleep(0.1)
+        os.kill(process.pid, signal.SIGKILL)
+    finally:
+        process.wait()
+        process.stdout.close()
+    assert process.returncode == -signal.SIGKILL
+    assert flushed == "one!\nwo\nthree"
+    tabs, generation = autosave.load_session(str(tmp_path))
+    assert [tab["content"] for tab in tabs] == [flushed]
+    assert tabs[0]["modified"] and generation == 1
@@ -0,0 +1,38 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_editor", os.path.join(ROOT, "benchmarks", "bench_editor.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def results(p50, p95=10.0, peak=1000.0):
+    return {"python": "3", "tk": "8.6", "platform": "test",
+            "metrics": {"highlight_words/1000": {"p50_ms": p50, "p95_ms": p95, "peak_kb": peak}}}
+
+
+def test_compare_ignores_noise_and_reports_regressions(bench):
+    assert bench.compare(results(2.2), results(2.0), 0.25) == []
+    assert bench.compare(results(0.3), results(0.1), 0.25) == []
+    assert bench.compare(results(4.0), results(2.0), 0.25) == ["highlight_words/1000 p50_ms: 2.00 -> 4.00"]
+    assert bench.compare(results(2.0, peak=2000.0), results(2.0), 0.25) == ["highlight_words/1000 peak_kb: 1000.00 -> 2000.00"]
+
+
+def test_check_baseline_exit_status(bench, tmp_path, capsys):
+    path = str(tmp_path / "baseline.json")
+    assert bench.check_baseline(results(2.0), path, 0.25) == 2
+    assert "--save-baseline" in capsys.readouterr().err
+    with open(path, "w") as file:
+        json.dump(results(2.0), file)
+    assert bench.check_baseline(results(2.1), path, 0.25) == 0
+    assert bench.check_baseline(results(9.0), path, 0.25) == 1
+    assert "REGRESSION highlight_words/1000 p50_ms" in capsys.readouterr().out
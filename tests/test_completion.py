@@ -0,0 +1,87 @@
+import random
+
+from completion import CompletionEngine, PrefixTrie, BufferWords
+from document import Document
+
+
+def ranked(model, prefix, limit):
+    # Recently used first, then by count, then alphabetically. A word keeps
+    # its recency while its count is zero.
+    words = [word for word, (count, used) in model.items() if count and word.startswith(prefix)]
+    return sorted(words, key=lambda word: (-model[word][1], -model[word][0], word))[:limit]
+
+
+def test_trie_matches_a_dict_model():
+    generator = random.Random(11)
+    vocabulary = ["a", "ab", "abc", "abd", "b", "ba", "bab", "counter", "count", "country", "co", "value", "values", "val"]
+    trie = PrefixTrie()
+    model = {}
+    tick = 0
+    for step in range(3000):
+        word = generator.choice(vocabulary)
+        count, used = model.get(word, (0, 0))
+        choice = generator.random()
+        if choice < 0.5:
+            amount = generator.randint(1, 3)
+            trie.add(word, amount)
+            model[word] = (count + amount, used)
+        elif choice < 0.85:
+            amount = generator.randint(1, 3)
+            trie.remove(word, amount)
+            if count:
+                model[word] = (max(0, count - amount), used)
+        else:
+            tick += 1
+            if trie.touch(word, tick):
+                model[word] = (count, tick)
+            else:
+                assert not count
+        prefix = generator.choice(["", "a", "ab", "c", "co", "cou", "coun", "v", "val", "x", "b"])
+        limit = generator.choice([1, 3, 10, 20])
+        assert [word for rank, word in trie.complete(prefix, limit)] == ranked(model, prefix, limit)
+        assert len(trie) == sum(1 for count, used in model.values() if count)
+
+
+def test_engine_merges_keywords_and_skips_the_prefix():
+    engine = CompletionEngine()
+    engine.set_keywords("pryzma", ["print", "printf"])
+    engine.add_text("printer print printer pri")
+    assert engine.complete("pri", "pryzma") == ["printer", "print", "printf"]
+    assert engine.complete("pri") == ["printer", "print"]
+    assert engine.complete("") == []
+    engine.accept("printf", "pryzma")
+    assert engine.complete("pri", "pryzma")[0] == "printf"
+    engine.remove_text("printer printer")
+    assert "printer" not in engine.complete("pri", "pryzma")
+
+
+class Widget:
+    # The text widget as BufferWords sees it: already showing the edit.
+    def __init__(self, document):
+        self.document = document
+
+    def offset(self, index):
+        line, column = index.split(".")
+        if column == "end":
+            return self.document.line_end(int(line))
+        return self.document.offset(int(line), int(column))
+
+    def get(self, start, end):
+        return self.document.get_text(self.offset(start), self.offset(end))
+
+
+def test_buffer_words_follow_edits():
+    engine = CompletionEngine()
+    shown = Document("alpha beta\ngamma\n")
+    document = Document(shown.text())
+    words = BufferWords(engine, Widget(shown), document)
+    engine.add_text(document.text())
+    for listener in (shown, words, document):
+        listener.inserted("2.5", " delta\nepsilon")
+    assert engine.complete("de") == ["delta"]
+    for listener in (shown, words, document):
+        listener.deleted("1.6", "3.0")
+    assert engine.complete("de") == [] and engine.complete("ep") == ["epsilon"]
+    assert engine.complete("ga") == []
+    words.clear()
+    assert len(engine.identifiers) == 0
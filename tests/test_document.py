@@ -0,0 +1,82 @@
+import random
+import re
+
+from document import Document
+
+
+class SmallDocument(Document):
+    # Tiny chunks, so edits cross chunk boundaries all the time.
+    chunk_size = 8
+
+
+def check(document, text):
+    assert document.text() == text
+    assert len(document) == len(text)
+    lines = text.split("\n")
+    assert document.line_count() == len(lines)
+    offset = 0
+    for number, line in enumerate(lines, 1):
+        assert document.line_start(number) == offset
+        assert document.line_end(number) == offset + len(line)
+        assert document.line(number) == line
+        for column in (0, len(line) // 2, len(line)):
+            assert document.position(offset + column) == (number, column)
+            assert document.offset(number, column) == offset + column
+        offset += len(line) + 1
+    blocks = list(document.iter_blocks())
+    assert "".join(block for base, block in blocks) == text
+    assert all(block.endswith("\n") for base, block in blocks[:-1])
+
+
+def test_edits_match_a_string_model():
+    generator = random.Random(7)
+    text = "first line\nsecond\n\nfourth line here\n" * 5
+    document = SmallDocument(text)
+    check(document, text)
+    for step in range(600):
+        if generator.random() < 0.55 or not text:
+            offset = generator.randint(0, len(text))
+            piece = generator.choice(["a", "\n", "word ", "é\n\n", "x" * 40, "line\nline\nline\n" * 3])
+            document.insert(offset, piece)
+            text = text[:offset] + piece + text[offset:]
+        else:
+            start = generator.randint(0, len(text))
+            end = min(len(text), start + generator.choice([1, 3, 20, 200]))
+            document.delete(start, end)
+            text = text[:start] + text[end:]
+        if step % 25 == 0:
+            check(document, text)
+            start = generator.randint(0, len(text))
+            end = generator.randint(start, len(text))
+            assert document.get_text(start, end) == text[start:end]
+    check(document, text)
+
+
+def test_line_col_listener_indices():
+    document = Document("ab\ncd\n")
+    document.inserted("2.1", "X\nY")
+    assert document.text() == "ab\ncX\nYd\n"
+    document.deleted("1.1", "2.2")
+    assert document.text() == "a\nYd\n"
+    # A column past the end of the line is clamped, as the text widget does.
+    document.inserted("1.9", "!")
+    assert document.text() == "a!\nYd\n"
+
+
+def test_search_helpers():
+    text = "one two\nthree two\n\ntwo\n" * 40
+    document = SmallDocument(text)
+    pattern = re.compile("two")
+    assert list(document.finditer(pattern)) == [(match.start(), match.end()) for match in pattern.finditer(text)]
+    assert list(document.match_lines(pattern)) == [text.count("\n", 0, match.start()) + 1 for match in pattern.finditer(text)]
+    assert list(document.finditer(re.compile("two\nthree"))) == [(match.start(), match.end()) for match in re.finditer("two\nthree", text)]
+    assert list(document.words()) == text.split()
+
+
+def test_version_counts_edits():
+    document = Document("abc")
+    document.insert(1, "")
+    document.delete(2, 2)
+    assert document.version == 0
+    document.replace(0, 1, "z")
+    assert document.version == 2 and document.text() == "zbc"
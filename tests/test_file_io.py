@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+
+import file_io
+
+
+class Widget:
+    # after() only queues the callback; run_pending() plays the Tk loop.
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def run_pending(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+def drain(worker, widget, timeout=5.0):
+    deadline = time.time() + timeout
+    while worker.active:
+        assert time.time() < deadline
+        time.sleep(0.01)
+        widget.run_pending()
+
+
+def test_worker_delivers_results_and_errors():
+    widget = Widget()
+    worker = file_io.IOWorker(widget)
+    results = []
+    worker.submit(lambda report: report(0.5) or 42, results.append, lambda e: results.append(("error", str(e))), lambda fraction: results.append(fraction))
+    worker.submit(lambda report: 1 / 0, results.append, lambda e: results.append(("error", type(e).__name__)))
+    drain(worker, widget)
+    assert sorted(map(str, results)) == sorted(map(str, [0.5, 42, ("error", "ZeroDivisionError")]))
+    assert worker.poll_job is None
+
+
+def test_failing_handler_does_not_stall_later_results(capsys):
+    widget = Widget()
+    worker = file_io.IOWorker(widget)
+    results = []
+
+    def fail(result):
+        raise RuntimeError("handler failed")
+
+    worker.submit(lambda report: 1, fail, results.append)
+    worker.submit(lambda report: 2, results.append, results.append)
+    deadline = time.time() + 5.0
+    while worker.results.qsize() < 2:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    widget.run_pending()
+    assert results == [2]
+    assert worker.active == 0
+    assert "handler failed" in capsys.readouterr().err
+
+
+def test_atomic_write_replaces_the_file_and_keeps_its_mode(tmp_path):
+    path = str(tmp_path / "file.txt")
+    with open(path, "w") as file:
+        file.write("old")
+    os.chmod(path, 0o640)
+    progress = []
+    file_io.atomic_write(path, ["new ", "text"], 8, progress.append)
+    with open(path) as file:
+        assert file.read() == "new text"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert progress[-1] == 1.0
+    assert os.listdir(str(tmp_path)) == ["file.txt"]
+
+
+def test_new_files_follow_the_umask(tmp_path):
+    path = str(tmp_path / "new.txt")
+    file_io.atomic_write(path, ["text"])
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~file_io.umask
+
+
+def test_atomic_write_through_a_symlink_keeps_the_link(tmp_path):
+    target = str(tmp_path / "target.txt")
+    link = str(tmp_path / "link.txt")
+    with open(target, "w") as file:
+        file.write("old")
+    os.symlink(target, link)
+    file_io.atomic_write(link, ["new"])
+    assert os.path.islink(link)
+    with open(target) as file:
+        assert file.read() == "new"
+    assert sorted(os.listdir(str(tmp_path))) == ["link.txt", "target.txt"]
+
+
+def test_writes_to_one_path_land_in_submission_order(tmp_path):
+    widget = Widget()
+    worker = file_io.IOWorker(widget)
+    path = str(tmp_path / "file.txt")
+    started = []
+    release = threading.Event()
+    done = []
+
+    def slow(report):
+        started.append("old")
+        # The older save is still writing when the newer one is submitted.
+        release.wait(5.0)
+        file_io.atomic_write(path, ["old"])
+
+    worker.submit(slow, lambda result: done.append("old"), done.append, None, path)
+    worker.submit(lambda report: file_io.atomic_write(path, ["new"]), lambda result: done.append("new"), done.append, None, path)
+    deadline = time.time() + 5.0
+    while not started:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert not os.path.exists(path)
+    release.set()
+    drain(worker, widget)
+    assert done == ["old", "new"]
+    with open(path) as file:
+        assert file.read() == "new"
+    assert worker.last_jobs == {}
+
+
+def test_failed_atomic_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "file.txt")
+    with open(path, "w") as file:
+        file.write("old")
+
+    def chunks():
+        yield "partial"
+        raise OSError("disk full")
+
+    try:
+        file_io.atomic_write(path, chunks())
+    except OSError:
+        pass
+    with open(path) as file:
+        assert file.read() == "old"
+    assert os.listdir(str(tmp_path)) == ["file.txt"]
+
+
+def save(path, text, text_format):
+    file_io.atomic_write(path, file_io.encode_chunks([text[:5], text[5:]], text_format), binary=True)
+
+
+def test_formats_round_trip(tmp_path):
+    text = "café line\nsecond – line\n"
+    cases = [("utf8.txt", file_io.TextFormat()),
+             ("bom.txt", file_io.TextFormat("utf-8", b"\xef\xbb\xbf", "\r\n")),
+             ("utf16.txt", file_io.TextFormat("utf-16-le", b"\xff\xfe")),
+             ("cp1252.txt", file_io.TextFormat("cp1252", newline="\r\n")),
+             ("mac.txt", file_io.TextFormat(newline="\r")),
+             ("log.gz", file_io.TextFormat(compression="gzip")),
+             ("log.xz", file_io.TextFormat("cp1252", compression="xz"))]
+    for name, text_format in cases:
+        path = str(tmp_path / name)
+        save(path, text, text_format)
+        content, found = file_io.read_document(path)
+        assert content == text, name
+        assert (found.encoding, found.bom, found.newline, found.compression) == \
+            (text_format.encoding, text_format.bom, text_format.newline, text_format.compression), name
+
+
+def test_late_invalid_utf8_falls_back(tmp_path):
+    path = str(tmp_path / "late.txt")
+    with open(path, "wb") as file:
+        file.write(b"a" * (file_io.sniff_size + 10) + "é\n".encode("cp1252"))
+    content, found = file_io.read_document(path)
+    assert found.encoding == "cp1252" and content.endswith("é\n")
+
+
+def test_binary_files_are_refused(tmp_path):
+    path = str(tmp_path / "image.bin")
+    with open(path, "wb") as file:
+        file.write(bytes(range(256)) * 4)
+    try:
+        file_io.read_document(path)
+    except file_io.BinaryFileError:
+        pass
+    else:
+        raise AssertionError("binary file read as text")
+    preview = file_io.hex_preview(path, 32)
+    assert preview.splitlines()[0].startswith("00000000  00 01 02")
+    assert preview.splitlines()[-1] == "... only the first 32 bytes are shown"
@@ -0,0 +1,80 @@
+import os
+import random
+
+import find_in_files
+from find_in_files import FolderSearch, compile_query, search_file, search_folder
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def expected(path, text, pattern):
+    # Searching the whole text one line at a time.
+    matches = []
+    for number, line in enumerate(text.split("\n"), 1):
+        for match in pattern.finditer(line):
+            matches.append((path, number, match.start(), line[:find_in_files.preview_length].strip()))
+    return matches
+
+
+def test_matches_across_block_boundaries(tmp_path, monkeypatch):
+    generator = random.Random(5)
+    words = ["needle", "need", "le", "café", "x", " ", "needléé", "a" * 30]
+    lines = ["".join(generator.choice(words) for _ in range(generator.randint(0, 12))) for _ in range(300)]
+    text = "\n".join(lines)
+    path = write(tmp_path / "file.txt", text.encode("utf-8"))
+    for query in ["needle", "é", "ee", "a" * 40]:
+        pattern = compile_query(query)
+        for size in [1, 2, 7, 64, 1000, 1 << 20]:
+            # Blocks smaller than a line make the carry hold several reads.
+            monkeypatch.setattr(find_in_files, "block_size", size)
+            assert search_file(path, pattern) == expected(path, text, pattern), (query, size)
+            assert search_file(path, pattern, query.encode("utf-8")) == expected(path, text, pattern), (query, size)
+
+
+def test_last_line_without_newline(tmp_path, monkeypatch):
+    monkeypatch.setattr(find_in_files, "block_size", 4)
+    path = write(tmp_path / "file.txt", b"one\ntwo\nlast needle")
+    assert search_file(path, compile_query("needle"), b"needle") == [(path, 3, 5, "last needle")]
+
+
+def test_binary_files_and_ignored_folders_are_skipped(tmp_path):
+    text = write(tmp_path / "text.txt", b"needle\n")
+    write(tmp_path / "image.bin", b"\x00\x01needle\n")
+    write(tmp_path / "node_modules" / "lib.js", b"needle\n")
+    nested = write(tmp_path / "src" / "main.py", b"# needle\n")
+    matches = search_folder(str(tmp_path), "needle", ignore={"node_modules"})
+    assert sorted(path for path, line, column, preview in matches) == sorted([text, nested])
+
+
+def test_whole_word_and_regex(tmp_path):
+    path = write(tmp_path / "file.txt", b"cat concat cat_ cat.\nx = 12 + 345\n")
+    assert [(line, column) for _, line, column, _ in search_folder(str(tmp_path), "cat", whole_word=True)] == [(1, 0), (1, 16)]
+    assert [(line, column) for _, line, column, _ in search_folder(str(tmp_path), "cat")] == [(1, 0), (1, 7), (1, 11), (1, 16)]
+    assert [(line, column) for _, line, column, _ in search_folder(str(tmp_path), r"\d+", regex=True)] == [(2, 4), (2, 9)]
+    assert [(line, column) for _, line, column, _ in search_folder(str(tmp_path), r"\d", regex=True, whole_word=True)] == []
+    # Regex characters are literal in a plain query.
+    assert search_folder(str(tmp_path), "cat.") == [(path, 1, 16, "cat concat cat_ cat.")]
+
+
+def test_cancel_stops_the_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(find_in_files, "batch_size", 1)
+    for number in range(200):
+        write(tmp_path / f"file{number:03}.txt", b"needle\n")
+    search = FolderSearch(str(tmp_path), compile_query("needle"), workers=1)
+    reports = []
+
+    def report(matches):
+        reports.append(matches)
+        search.cancel()
+
+    search.run(report)
+    # Batches already finished may still be reported; nothing new starts.
+    assert reports and search.files_searched < 10
+    cancelled = FolderSearch(str(tmp_path), compile_query("needle"), workers=1)
+    cancelled.cancel()
+    assert cancelled.run(reports.append) == 0 and cancelled.files_searched == 0
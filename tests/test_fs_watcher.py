@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+
+import fs_watcher
+from fs_watcher import FileSystemWatcher
+
+
+def write(path, text):
+    with open(path, "w") as file:
+        file.write(text)
+    return str(path)
+
+
+def poll_now(watcher):
+    return fs_watcher.poll(*watcher.prepare([]))
+
+
+def test_changed_and_deleted_files_are_reported_once(tmp_path):
+    path = write(tmp_path / "a.txt", "one")
+    watcher = FileSystemWatcher()
+    watcher.watch_file(path)
+    assert watcher.apply(poll_now(watcher))[1] == []
+    write(path, "longer")
+    changed = watcher.apply(poll_now(watcher))[1]
+    assert [changed_path for changed_path, stamp in changed] == [path]
+    assert watcher.apply(poll_now(watcher))[1] == []
+    os.remove(path)
+    assert watcher.apply(poll_now(watcher))[1] == [(path, None)]
+
+
+def test_new_entries_in_a_watched_directory(tmp_path):
+    watcher = FileSystemWatcher()
+    directory = str(tmp_path)
+    watcher.apply(fs_watcher.poll(*watcher.prepare([directory])))
+    write(tmp_path / "new.txt", "x")
+    os.utime(directory, ns=(0, os.stat(directory).st_mtime_ns + 10 ** 9))
+    tree_changes = watcher.apply(fs_watcher.poll(*watcher.prepare([directory])))[0]
+    assert [path for path, entries, renamed in tree_changes] == [directory]
+
+
+def test_own_save_applied_before_it_finished_is_not_a_change(tmp_path):
+    path = write(tmp_path / "a.txt", "one")
+    watcher = FileSystemWatcher()
+    watcher.watch_file(path)
+    watcher.begin_write(path)
+    write(path, "saved by the editor")
+    # The poll saw the saved file before file_written ran.
+    assert watcher.apply(poll_now(watcher))[1] == []
+    watcher.end_write(path)
+    watcher.watch_file(path)
+    assert watcher.apply(poll_now(watcher))[1] == []
+
+
+def test_poll_started_before_a_save_is_not_a_change(tmp_path):
+    path = write(tmp_path / "a.txt", "one")
+    watcher = FileSystemWatcher()
+    watcher.watch_file(path)
+    prepared = watcher.prepare([])
+    write(path, "saved by the editor")
+    result = fs_watcher.poll(*prepared)
+    watcher.watch_file(path)
+    assert watcher.apply(result)[1] == []
+    write(path, "changed by someone else")
+    assert [changed_path for changed_path, stamp in watcher.apply(poll_now(watcher))[1]] == [path]
+
+
+class Notebook:
+    def __init__(self, titles):
+        self.titles = titles
+
+    def tab(self, widget, option=None):
+        return self.titles[widget]
+
+
+def prompted_editor(editor_module, monkeypatch, modified, answer):
+    editor = editor_module.TextEditor.__new__(editor_module.TextEditor)
+    editor.text_areas = ["widget"]
+    editor.tab_journals = [SimpleNamespace(modified=modified)]
+    editor.notebook = Notebook({"widget": "/tmp/file.txt"})
+    editor.large_file_views = {}
+    editor.hibernated_tabs = {}
+    editor.status = []
+    editor.set_status = editor.status.append
+    editor.reloads = []
+    editor.io_worker = SimpleNamespace(submit=lambda *args: editor.reloads.append(args))
+    editor.questions = []
+    monkeypatch.setattr(editor_module.messagebox, "askyesno", lambda title, message, **options: editor.questions.append(message) or answer)
+    return editor
+
+
+def test_reload_prompt_warns_about_unsaved_changes(editor_module, monkeypatch):
+    editor = prompted_editor(editor_module, monkeypatch, True, False)
+    editor.file_changed_on_disk("/tmp/file.txt", (1, 1))
+    assert "unsaved changes" in editor.questions[0] and "discard" in editor.questions[0]
+    assert editor.reloads == [] and "Kept your changes" in editor.status[0]
+    editor = prompted_editor(editor_module, monkeypatch, True, True)
+    editor.file_changed_on_disk("/tmp/file.txt", (1, 1))
+    assert len(editor.questions) == 1 and len(editor.reloads) == 1
+
+
+def test_reload_prompt_for_a_clean_tab(editor_module, monkeypatch):
+    editor = prompted_editor(editor_module, monkeypatch, False, True)
+    editor.file_changed_on_disk("/tmp/file.txt", (1, 1))
+    assert editor.questions == ["/tmp/file.txt was changed on disk. Reload it?"]
+    assert len(editor.reloads) == 1
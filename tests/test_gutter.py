@@ -0,0 +1,59 @@
+import gutter
+from gutter import LineNumbers, Minimap
+from text_hooks import EditHooks
+
+
+class Canvas:
+    # Enough of a mapped canvas for the gutters to be built without a display.
+    def __init__(self, *args, **options):
+        pass
+
+    def bind(self, sequence, callback):
+        pass
+
+    def create_image(self, *args, **options):
+        return 1
+
+    def create_rectangle(self, *args, **options):
+        return 2
+
+    def winfo_ismapped(self):
+        return True
+
+
+class PhotoImage:
+    def __init__(self, **options):
+        pass
+
+
+class TextWidget:
+    frame = None
+
+    def __init__(self):
+        self.idle = []
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+        return len(self.idle)
+
+
+def test_scrolling_schedules_a_redraw(monkeypatch):
+    monkeypatch.setattr(gutter.tk, "Canvas", Canvas)
+    monkeypatch.setattr(gutter.tk, "PhotoImage", PhotoImage)
+    text_widget = TextWidget()
+    hooks = EditHooks.__new__(EditHooks)
+    hooks.listeners = []
+    hooks.scroll_listeners = []
+    scrolled = []
+    hooks.scroll_command = lambda first, last: scrolled.append((first, last))
+    line_numbers = LineNumbers(text_widget, hooks, lambda: (0, 1))
+    minimap = Minimap(text_widget, hooks, None, None)
+    hooks.on_scroll("0.0", "0.5")
+    assert scrolled == [("0.0", "0.5")]
+    assert text_widget.idle == [line_numbers.run_scheduled_redraw, minimap.run_scheduled_redraw]
+    # A second scroll before the redraw ran does not queue another.
+    hooks.on_scroll("0.1", "0.6")
+    assert len(text_widget.idle) == 2
@@ -0,0 +1,55 @@
+import random
+
+import file_io
+from large_file import LineIndex
+
+
+def built(path, step, block_size):
+    index = LineIndex(path, file_io.sniff_file(path))
+    index.step = step
+    index.block_size = block_size
+    index.build()
+    return index
+
+
+def write(tmp_path, name, lines, encoding, bom=b"", newline="\n"):
+    path = str(tmp_path / name)
+    encoded = [line.encode(encoding) for line in lines]
+    separator = newline.encode(encoding)
+    with open(path, "wb") as file:
+        file.write(bom + separator.join(encoded))
+    # The byte offset every line starts at.
+    starts = [len(bom)]
+    for line in encoded[:-1]:
+        starts.append(starts[-1] + len(line) + len(separator))
+    return path, starts
+
+
+def test_lines_across_step_and_block_boundaries(tmp_path):
+    generator = random.Random(3)
+    # In UTF-16-LE "ੁ一" holds the bytes of a newline one byte off.
+    words = ["alpha", "é", "ੁ一", "  ", "x" * 20, "tab\there"]
+    lines = ["".join(generator.choice(words) for _ in range(generator.randint(0, 6))) for _ in range(200)]
+    cases = [("utf8.txt", "utf-8", b"", "\n"),
+             ("bom.txt", "utf-8", b"\xef\xbb\xbf", "\r\n"),
+             ("utf16le.txt", "utf-16-le", b"\xff\xfe", "\n"),
+             ("utf16be.txt", "utf-16-be", b"\xfe\xff", "\r\n")]
+    for name, encoding, bom, newline in cases:
+        for ending in ["", "\n"]:
+            path, starts = write(tmp_path, name, lines + ([""] if ending else []), encoding, bom, newline)
+            for step, block_size in [(1, 8), (3, 8), (4, 1 << 10), (64, 1 << 22)]:
+                index = built(path, step, block_size)
+                assert index.complete and index.known_lines() == len(starts), (name, step, block_size)
+                assert [index.line_start(line) for line in range(1, len(starts) + 2)] == starts + [index.size]
+                for first, last in [(1, 1), (1, 7), (2, 9), (60, 130), (190, 200), (1, len(starts))]:
+                    expected = "\n".join((lines + [""])[first - 1:last])
+                    assert index.read_lines(first, last) == expected, (name, step, block_size, first, last)
+                index.close()
+
+
+def test_code_page_files_are_decoded_in_their_encoding(tmp_path):
+    path, starts = write(tmp_path, "cp1252.txt", ["déjà vu", "naïve – café"] * 50, "cp1252")
+    index = built(path, 16, 64)
+    assert index.text_format.encoding == "cp1252"
+    assert index.read_lines(2, 3) == "naïve – café\ndéjà vu"
+    index.close()
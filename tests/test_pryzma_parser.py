@@ -0,0 +1,116 @@
+import random
+
+from document import Document
+from pryzma_parser import BlockTree, scan_line
+
+
+class Edits:
+    # Sends edits the way EditHooks does, the document first.
+    def __init__(self, document):
+        self.listeners = [document]
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def insert(self, index, text):
+        for listener in self.listeners:
+            listener.inserted(index, text)
+
+    def delete(self, start, end):
+        for listener in self.listeners:
+            listener.deleted(start, end)
+
+
+source = "\n".join([
+    "count = 0",
+    "/outer{",
+    "    total = 0",
+    "    for(i, 1, 3){",
+    '        print "{ not a brace"',
+    "        step = i",
+    "    }",
+    "    /inner{",
+    "        # } in a comment",
+    "        deep = 1",
+    "    }",
+    "}",
+    "@outer",
+])
+
+
+def tree_for(text):
+    document = Document(text)
+    edits = Edits(document)
+    tree = BlockTree(edits, document)
+    return document, edits, tree
+
+
+def shape(tree):
+    return [(block.kind, block.label, block.start, block.end, sorted((name, count) for name, count in block.names.items() if count))
+            for block in tree.blocks] + [sorted((name, count) for name, count in tree.root.names.items() if count)]
+
+
+def test_scan_line_skips_strings_and_comments():
+    assert scan_line('print "{" # }') == ((), ())
+    assert scan_line("x = 1") == ((), ("x",))
+    assert scan_line("x == 1") == ((), ())
+    assert scan_line("/f{") == ((("open", "function", "f", ()),), ())
+    assert scan_line("if(a){ }") == ((("open", "if", "if a", ()), ("close",)), ())
+    assert scan_line("for(i, 1, 10){")[0][0][3] == ("i",)
+
+
+def test_blocks_and_scopes():
+    document, edits, tree = tree_for(source)
+    root = tree.parsed()
+    assert [(block.kind, block.start, block.end) for block in tree.blocks] == [("function", 2, 12), ("for", 4, 7), ("function", 8, 11)]
+    assert [block.label for block in root.children] == ["outer"]
+    assert [block.label for block in tree.functions()] == ["outer", "inner"]
+    assert tree.block_at(6).kind == "for"
+    assert tree.names_at(6)[:4] == ["i", "step", "total", "count"]
+    assert "deep" not in tree.names_at(6)
+    assert tree.complete("to", 6) == ["total"]
+    assert tree.complete("in", 1) == ["inner"]
+
+
+def test_foldable_never_parses():
+    document, edits, tree = tree_for(source)
+    assert tree.foldable(2) is None and tree.root is None
+    tree.parsed()
+    assert tree.foldable(2).label == "outer"
+    assert tree.foldable(3) is None
+    edits.insert("1.0", "{")
+    assert tree.stale and tree.foldable(3) is None
+    tree.parsed()
+    # The unclosed block runs to the end, so only the one inside folds.
+    assert not tree.stale and tree.block_starting(1).end is None
+    assert tree.foldable(1) is None and tree.foldable(2).label == "outer"
+
+
+def test_disabled_tree_drops_its_summaries():
+    enabled = [True]
+    document = Document(source)
+    edits = Edits(document)
+    tree = BlockTree(edits, document, lambda: enabled[0])
+    tree.parsed()
+    enabled[0] = False
+    edits.insert("3.0", "x = 1\n")
+    assert tree.summaries is None
+
+
+def test_incremental_tree_matches_a_full_parse():
+    generator = random.Random(5)
+    document, edits, tree = tree_for(source * 5)
+    tree.parsed()
+    for step in range(400):
+        line = generator.randint(1, document.line_count())
+        choice = generator.random()
+        if choice < 0.5:
+            column = generator.randint(0, len(document.line(line)))
+            edits.insert(f"{line}.{column}", generator.choice(["{", "}", "y = 1\n", "\n", "/g{\n", "if(a){ }", '"{"', "x", "}\n"]))
+        elif line < document.line_count():
+            edits.delete(f"{line}.0", f"{line + generator.randint(0, 1)}.{0 if choice < 0.75 else 1}")
+        if step % 20 == 0:
+            tree.parsed()
+            fresh = tree_for(document.text())[2]
+            fresh.parsed()
+            assert shape(tree) == shape(fresh)
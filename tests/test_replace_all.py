@@ -0,0 +1,80 @@
+import gzip
+import random
+import re
+
+from document import Document
+from replace_all import FileReplace, buffer_edits
+
+
+def write(path, data):
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_files_are_matched_and_rewritten_in_their_own_encoding(tmp_path):
+    utf8 = write(tmp_path / "utf8.txt", "café\r\ncafé au lait\r\n".encode("utf-8"))
+    cp1252 = write(tmp_path / "cp1252.txt", "un café noir\r\n".encode("cp1252"))
+    bom = write(tmp_path / "bom.txt", b"\xef\xbb\xbf" + "café".encode("utf-8"))
+    replace = FileReplace([str(tmp_path)], "café", "thé")
+    assert replace.preview() == 4
+    assert replace.encodings == {utf8: "utf-8", cp1252: "cp1252", bom: "utf-8"}
+    assert replace.run() == 4
+    assert read(utf8) == "thé\r\nthé au lait\r\n".encode("utf-8")
+    assert read(cp1252) == "un thé noir\r\n".encode("cp1252")
+    assert read(bom) == b"\xef\xbb\xbf" + "thé".encode("utf-8")
+
+
+def test_files_that_cannot_be_rewritten_are_skipped(tmp_path):
+    utf16 = write(tmp_path / "utf16.txt", "﻿café".encode("utf-16-le"))
+    compressed = write(tmp_path / "log.gz", gzip.compress(b"cafe"))
+    cp1252 = write(tmp_path / "cp1252.txt", "déjà cafe".encode("cp1252"))
+    write(tmp_path / "binary.bin", bytes(range(256)))
+    replace = FileReplace([str(tmp_path)], "cafe", "中")
+    assert replace.preview() == 0
+    assert replace.skipped == {utf16: "UTF-16-LE encoded", compressed: "gzip compressed", cp1252: "cp1252 cannot hold the replacement"}
+    assert read(cp1252) == "déjà cafe".encode("cp1252")
+
+
+def test_query_missing_from_the_encoding_matches_nothing(tmp_path):
+    write(tmp_path / "cp1252.txt", "déjà vu".encode("cp1252"))
+    replace = FileReplace([str(tmp_path)], "中", "x")
+    assert replace.preview() == 0 and not replace.skipped
+
+
+def test_files_with_unsaved_changes_are_skipped(tmp_path):
+    edited = write(tmp_path / "edited.txt", b"needle")
+    later = write(tmp_path / "later.txt", b"needle")
+    other = write(tmp_path / "other.txt", b"needle")
+    replace = FileReplace([str(tmp_path)], "needle", "pin", exclude=[edited])
+    assert replace.preview() == 2
+    replace.skip({later}, "open with unsaved changes")
+    assert replace.run() == 1
+    assert replace.skipped == {edited: "open with unsaved changes", later: "open with unsaved changes"}
+    assert (read(edited), read(later), read(other)) == (b"needle", b"needle", b"pin")
+
+
+def test_whole_word_and_backslashes(tmp_path):
+    path = write(tmp_path / "file.txt", b"cat concat cat_ cat.")
+    replace = FileReplace([path], "cat", r"d\1g", whole_word=True)
+    assert replace.preview() == 2
+    replace.run()
+    assert read(path) == rb"d\1g concat cat_ d\1g."
+
+
+def test_buffer_edits_match_a_plain_replace():
+    generator = random.Random(17)
+    text = "".join(generator.choice(["ab", "x", " ", "\n", "abab"]) for _ in range(3000))
+    document = Document(text)
+    matches = [(match.start(), match.end()) for match in re.finditer("ab", text)]
+    edits = buffer_edits(document, matches, "Z")
+    assert len(edits) < len(matches)
+    result = text
+    for start, end, replacement in reversed(edits):
+        result = result[:start] + replacement + result[end:]
+    assert result == text.replace("ab", "Z")
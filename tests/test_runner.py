@@ -0,0 +1,127 @@
+import sys
+import time
+
+from runner import OutputBuffer, ProcessRunner, WorkerPool
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def finished(runner):
+    wait_for(lambda: runner.returncode is not None)
+    return runner.take()
+
+
+def test_output_of_both_streams_and_the_exit_code():
+    program = "import sys, time\nprint('out 1')\nprint('err 1', file=sys.stderr)\ntime.sleep(0.2)\nprint('out 2')\nsys.exit(3)"
+    runner = ProcessRunner([sys.executable, "-c", program])
+    runner.start()
+    # The first lines arrive while the program is still running.
+    wait_for(lambda: len(runner.pending) == 2)
+    assert runner.running()
+    assert sorted(runner.take()[0]) == [("stderr", "err 1"), ("stdout", "out 1")]
+    assert finished(runner) == ([("stdout", "out 2")], 0)
+    assert runner.returncode == 3 and not runner.running()
+    assert 0.2 <= runner.duration < 5.0
+
+
+def test_stdout_and_stderr_lines_keep_their_stream():
+    program = "import sys\nsys.stdout.write('a\\nb\\npartial')\nsys.stderr.write('e\\r\\n')"
+    runner = ProcessRunner([sys.executable, "-c", program])
+    runner.start()
+    lines, dropped = finished(runner)
+    assert [line for line in lines if line[0] == "stdout"] == [("stdout", "a"), ("stdout", "b"), ("stdout", "partial")]
+    assert [line for line in lines if line[0] == "stderr"] == [("stderr", "e")]
+    assert dropped == 0 and runner.returncode == 0
+
+
+def test_ring_buffer_counts_dropped_lines():
+    buffer = OutputBuffer(["program"], max_lines=5)
+    buffer.push("stdout", [str(number) for number in range(3)])
+    buffer.push("stdout", [str(number) for number in range(3, 12)])
+    lines, dropped = buffer.take()
+    assert [line for stream, line in lines] == ["7", "8", "9", "10", "11"] and dropped == 7
+    assert buffer.take() == ([], 0)
+    runner = ProcessRunner([sys.executable, "-c", "for number in range(1000): print(number)"], max_lines=100)
+    runner.start()
+    lines, dropped = finished(runner)
+    assert len(lines) == 100 and dropped == 900
+    assert lines[-1] == ("stdout", "999")
+
+
+def test_stop_terminates_the_program():
+    runner = ProcessRunner([sys.executable, "-c", "import time\nprint('started')\ntime.sleep(60)"])
+    runner.start()
+    wait_for(lambda: runner.pending)
+    runner.stop()
+    finished(runner)
+    assert runner.returncode != 0 and runner.duration < 10.0
+
+
+# Runs the program named on its command line, like the Pryzma interpreter.
+interpreter = """import sys
+with open(sys.argv[1]) as file:
+    source = file.read()
+exec(compile(source, sys.argv[1], "exec"), {"__name__": "__main__"})
+"""
+
+
+def pool_for(tmp_path, source=interpreter, **options):
+    path = tmp_path / "interpreter.py"
+    path.write_text(source)
+    return WorkerPool(sys.executable, str(path), **options)
+
+
+def program(tmp_path, name, source):
+    path = tmp_path / name
+    path.write_text(source)
+    return str(path)
+
+
+def test_warm_run_returns_output_and_exit_code(tmp_path):
+    pool = pool_for(tmp_path, size=1)
+    try:
+        wait_for(lambda: pool.ready_workers() == 1)
+        run = pool.run(program(tmp_path, "hello.pz", "import sys\nprint('hello', sys.argv[2:])\nsys.exit(4)"), ["a"])
+        assert run.warm and pool.run(program(tmp_path, "busy.pz", "")) is None
+        lines, dropped = finished(run)
+        assert lines == [("stdout", "hello ['a']")] and run.returncode == 4
+        failing = pool.run(program(tmp_path, "fail.pz", "raise ValueError('bad input')"))
+        lines, dropped = finished(failing)
+        assert failing.returncode == 1
+        assert lines[-1] == ("stderr", "ValueError: bad input")
+    finally:
+        pool.close()
+
+
+def test_worker_is_recycled_after_max_runs(tmp_path):
+    pool = pool_for(tmp_path, size=1, max_runs=2)
+    try:
+        wait_for(lambda: pool.ready_workers() == 1)
+        first = pool.workers[0]
+        for number in range(2):
+            finished(pool.run(program(tmp_path, f"run{number}.pz", f"print({number})")))
+        wait_for(lambda: first.returncode is not None)
+        assert first.retired and first.runs == 2
+        wait_for(lambda: pool.ready_workers() == 1)
+        assert pool.workers[0] is not first and not pool.failed
+        run = pool.run(program(tmp_path, "again.pz", "print('fresh')"))
+        assert finished(run) == ([("stdout", "fresh")], 0)
+    finally:
+        pool.close()
+
+
+def test_pool_fails_when_warm_up_crashes(tmp_path):
+    pool = pool_for(tmp_path, "def broken(:\n", size=2)
+    try:
+        wait_for(lambda: pool.failed)
+        assert "SyntaxError" in pool.error
+        wait_for(lambda: all(worker.returncode is not None for worker in pool.workers))
+        pool.fill()
+        assert pool.workers == [] and pool.run(program(tmp_path, "any.pz", "")) is None
+    finally:
+        pool.close()
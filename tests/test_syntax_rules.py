@@ -0,0 +1,77 @@
+import os
+
+import syntax_rules
+from syntax_rules import SyntaxRules, load_rules
+
+colors = {"if": "blue", "in": "purple", "print": "cyan", "=": "orange", "==": "red", "++": "green", "<": "orange", "<=": "red", "True": "magenta"}
+
+
+def words(rules, line):
+    return [(line[start:end], color) for start, end, color in rules.tokenize(line)]
+
+
+def test_keyword_inside_a_word_is_not_matched():
+    assert words(SyntaxRules(colors), "print in") == [("print", "cyan"), ("in", "purple")]
+    assert words(SyntaxRules(colors), "inside printer") == []
+
+
+def test_longest_operator_wins():
+    rules = SyntaxRules(colors)
+    assert words(rules, "a == b = c") == [("==", "red"), ("=", "orange")]
+    assert words(rules, "i++ <= 3 < 4") == [("++", "green"), ("<=", "red"), ("<", "orange")]
+
+
+def test_matching_ignores_case():
+    assert words(SyntaxRules(colors), "IF true Print") == [("IF", "blue"), ("true", "magenta"), ("Print", "cyan")]
+
+
+def test_no_words_means_no_rules():
+    rules = SyntaxRules({})
+    assert not rules
+    assert rules.tokenize("if x") == []
+
+
+def write(path, text):
+    with open(path, "w") as file:
+        file.write(text)
+    return str(path)
+
+
+def test_load_rules(tmp_path):
+    with_extension = write(tmp_path / "pryzma.txt", "#pryzma\nif:blue\n==:red\n")
+    without = write(tmp_path / "plain.txt", "TODO:red\n")
+    loaded, errors = load_rules([with_extension, without, str(tmp_path / "missing.txt")], str(tmp_path / "cache.bin"))
+    assert len(errors) == 1 and "missing.txt" in errors[0]
+    (extension, found, rules), (no_extension, plain, no_rules) = loaded
+    assert extension == "pryzma" and found == {"if": "blue", "==": "red"}
+    assert words(rules, "if a == b") == [("if", "blue"), ("==", "red")]
+    # A file without an extension line only adds plain colors.
+    assert no_extension is None and plain == {"TODO": "red"} and no_rules is None
+
+
+def test_cache_hit_and_miss_after_mtime_change(tmp_path, monkeypatch):
+    path = write(tmp_path / "pryzma.txt", "#pryzma\nif:blue\n")
+    cache_path = str(tmp_path / "cache.bin")
+    parsed = []
+    parse = syntax_rules.parse_syntax_file
+    monkeypatch.setattr(syntax_rules, "parse_syntax_file", lambda syntax_file: parsed.append(syntax_file) or parse(syntax_file))
+    load_rules([path], cache_path)
+    assert parsed == [path]
+    loaded, errors = load_rules([path], cache_path)
+    assert parsed == [path]
+    assert words(loaded[0][2], "if") == [("if", "blue")]
+    # Same size, new mtime: the file is parsed again.
+    write(path, "#pryzma\nif:cyan\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    loaded, errors = load_rules([path], cache_path)
+    assert parsed == [path, path]
+    assert words(loaded[0][2], "if") == [("if", "cyan")]
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = write(tmp_path / "pryzma.txt", "#pryzma\nif:blue\n")
+    cache_path = write(tmp_path / "cache.bin", "not a cache")
+    loaded, errors = load_rules([path], cache_path)
+    assert not errors and loaded[0][0] == "pryzma"
+    assert syntax_rules.read_cache(cache_path)[path][2] == "pryzma"
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import tab_memory
+from document import Document
+
+
+def test_spill_round_trip(tmp_path):
+    path = str(tmp_path / "tab.z")
+    tab_memory.write_spill(path, ["café\n", "\udc80 lone surrogate\n"])
+    assert tab_memory.read_spill(path) == "café\n\udc80 lone surrogate\n"
+
+
+def test_hibernation_candidates_fit_the_budget():
+    tabs = [("a", 50, 3, True), ("b", 40, 1, True), ("c", 30, 2, False), ("d", 20, 0, True)]
+    assert tab_memory.hibernation_candidates(tabs, 200) == []
+    assert tab_memory.hibernation_candidates(tabs, 100) == ["d", "b"]
+    assert tab_memory.hibernation_candidates(tabs, 0) == ["d", "b", "a"]
+
+
+class TextWidget:
+    # Inserts go straight to the tab's Document, as EditHooks would.
+    def __init__(self, document):
+        self.document = document
+        self.state = "disabled"
+
+    def configure(self, state):
+        self.state = state
+
+    def insert(self, index, text):
+        self.document.inserted(index, text)
+
+    def mark_set(self, mark, index):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def after_idle(self, *args):
+        pass
+
+
+def hibernated_editor(editor_module, monkeypatch, path):
+    editor = editor_module.TextEditor.__new__(editor_module.TextEditor)
+    document = Document("")
+    text_widget = TextWidget(document)
+    editor.text_areas = [text_widget]
+    editor.documents = [document]
+    editor.tab_journals = [SimpleNamespace(recording=True, saved=lambda path, clean: editor.saved.append((path, clean)))]
+    editor.edit_hooks = [SimpleNamespace(undo=SimpleNamespace(clear=lambda: None))]
+    editor.highlighters = [SimpleNamespace(invalidate=lambda: None)]
+    editor.hibernated_tabs = {text_widget: {"cursor": "1.0", "top": 0.0, "spill": None}}
+    editor.file_formats = {}
+    editor.notebook = SimpleNamespace(tab=lambda widget, option=None: path)
+    editor.watcher = SimpleNamespace(begin_write=lambda path: None, end_write=lambda path: None, watch_file=lambda path: None)
+    editor.submitted = []
+    editor.io_worker = SimpleNamespace(submit=lambda work, on_done, on_error, on_progress=None, key=None: editor.submitted.append((work, on_done, on_error)))
+    editor.saved = []
+    editor.status = []
+    editor.set_status = editor.status.append
+    editor.show_progress = editor.hide_progress = lambda *args: None
+    editor.update_buffer_memory = lambda: None
+    editor.errors = []
+    monkeypatch.setattr(editor_module.messagebox, "showerror", lambda title, message: editor.errors.append(message))
+    return editor, text_widget
+
+
+def run(editor):
+    work, on_done, on_error = editor.submitted.pop(0)
+    try:
+        result = work(lambda fraction: None)
+    except OSError as error:
+        on_error(error)
+    else:
+        on_done(result)
+
+
+def test_saving_a_hibernated_tab_waits_for_its_text(editor_module, monkeypatch, tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("on disk\n")
+    editor, text_widget = hibernated_editor(editor_module, monkeypatch, str(path))
+    editor.write_file(text_widget, str(path))
+    # Only the wake was submitted: the empty buffer is not written.
+    assert len(editor.submitted) == 1
+    run(editor)
+    assert text_widget not in editor.hibernated_tabs and text_widget.state == "normal"
+    assert len(editor.submitted) == 1
+    run(editor)
+    assert path.read_text() == "on disk\n"
+    assert editor.saved == [(str(path), True)]
+
+
+def test_a_tab_that_failed_to_wake_is_not_saved(editor_module, monkeypatch, tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("on disk\n")
+    editor, text_widget = hibernated_editor(editor_module, monkeypatch, str(path))
+    # The spill file holding the tab's text is gone.
+    editor.hibernated_tabs[text_widget]["spill"] = str(tmp_path / "missing.z")
+    editor.write_file(text_widget, str(path))
+    run(editor)
+    assert text_widget in editor.hibernated_tabs and text_widget.state == "disabled"
+    assert editor.submitted == [] and editor.saved == []
+    editor.write_file(text_widget, str(path))
+    assert editor.submitted == [] and "cannot be saved" in editor.errors[0]
+    assert path.read_text() == "on disk\n"
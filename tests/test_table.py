@@ -0,0 +1,118 @@
+import random
+
+from table import ColumnStore, TableView, column_name, filter_rows, read_table, sort_rows, table_chunks
+
+
+class Worker:
+    # Runs submitted work at once, on the calling thread.
+    def submit(self, work, on_done=None, on_error=None, on_progress=None, key=None):
+        on_done(work(on_progress))
+
+
+def headless_view(store):
+    view = TableView.__new__(TableView)
+    view.store = store
+    view.worker = Worker()
+    view.path = None
+    view.modified = True
+    view.order = None
+    view.sorted = None
+    view.query = ""
+    view.status_text = []
+    view.set_status = view.status_text.append
+    view.commit_focus = lambda: None
+    return view
+
+
+def sample_store():
+    store = ColumnStore(["name", "count"])
+    store.extend_rows([["apple", "3"], ["Banana", "10"], ["cherry"], ["date", "", "extra"]])
+    return store
+
+
+def test_column_names():
+    assert [column_name(index) for index in (0, 25, 26, 27, 701, 702)] == ["A", "Z", "AA", "AB", "ZZ", "AAA"]
+
+
+def test_extend_rows_pads_short_rows_and_adds_columns():
+    store = sample_store()
+    assert store.rows == 4
+    assert store.headers == ["name", "count", "C"]
+    assert store.row(2) == ["cherry", "", ""]
+    assert store.row(3) == ["date", "", "extra"]
+
+
+def test_column_store_matches_a_list_model():
+    generator = random.Random(3)
+    store = ColumnStore.blank(0, 3)
+    model = []
+    for _ in range(20):
+        rows = [[generator.choice(["", "x", "été", "a,b", "12"]) for _ in range(generator.randint(0, 3))] for _ in range(generator.randint(1, 50))]
+        store.extend_rows(rows)
+        model.extend(row + [""] * (3 - len(row)) for row in rows)
+        for _ in range(10):
+            row, column = generator.randrange(len(model)), generator.randrange(3)
+            value = generator.choice(["new", "", "中"])
+            store.set(row, column, value)
+            model[row][column] = value
+    assert [store.row(row) for row in range(store.rows)] == model
+
+
+def test_sort_rows_numeric_and_text():
+    store = sample_store()
+    assert list(sort_rows(store, 1)) == [0, 1, 2, 3]
+    assert list(sort_rows(store, 1, reverse=True))[-2:] == [1, 0]
+    assert list(sort_rows(store, 0, reverse=True)) == [3, 2, 1, 0]
+
+
+def test_filter_rows_is_case_insensitive_and_sees_edits():
+    store = sample_store()
+    assert list(filter_rows(store, "AN")) == [1]
+    assert list(filter_rows(store, "a", [3, 1, 0])) == [3, 1, 0]
+    store.set(2, 0, "Grape")
+    assert list(filter_rows(store, "rap")) == [2]
+    store.set(1, 0, "kiwi")
+    assert list(filter_rows(store, "banana")) == []
+
+
+def test_filter_rows_skips_matches_across_cells():
+    store = ColumnStore(["a"])
+    store.extend_rows([["ab"], ["cd"]])
+    assert list(filter_rows(store, "bc")) == []
+
+
+def test_round_trip(tmp_path):
+    store = sample_store()
+    store.set(0, 2, 'quote "and" comma,')
+    for name in ("table.csv", "table.tsv"):
+        path = tmp_path / name
+        path.write_bytes(b"".join(table_chunks(store, delimiter="\t" if name.endswith(".tsv") else ",")))
+        loaded = read_table(str(path), ColumnStore())
+        assert loaded.headers == store.headers
+        assert [loaded.row(row) for row in range(loaded.rows)] == [store.row(row) for row in range(store.rows)]
+
+
+def test_save_writes_every_row_even_when_filtered(tmp_path):
+    view = headless_view(sample_store())
+    view.sorted = sort_rows(view.store, 0, reverse=True)
+    view.query = "an"
+    view.order = filter_rows(view.store, view.query, view.sorted)
+    path = str(tmp_path / "table.csv")
+    view.export_file(path)
+    saved = read_table(path, ColumnStore())
+    assert [saved.get(row, 0) for row in range(saved.rows)] == ["date", "cherry", "Banana", "apple"]
+    assert view.path == path and not view.modified
+
+
+def test_view_export_writes_the_filtered_rows_only(tmp_path):
+    view = headless_view(sample_store())
+    view.path = "original.csv"
+    view.query = "an"
+    view.order = filter_rows(view.store, view.query)
+    path = str(tmp_path / "view.csv")
+    view.export_file(path, view=True)
+    saved = read_table(path, ColumnStore())
+    assert [saved.get(row, 0) for row in range(saved.rows)] == ["Banana"]
+    # An export is not the table's file.
+    assert view.path == "original.csv" and view.modified
+    assert "filtered" in view.status_text[-1]
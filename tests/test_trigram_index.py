@@ -0,0 +1,80 @@
+import os
+import random
+
+from trigram_index import TrigramIndex, fuzzy_score
+
+
+def write(root, relative_path, text):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return path
+
+
+def matching(root, query):
+    # Brute force: every file whose text holds the query, ignoring case.
+    found = []
+    for directory, names, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as file:
+                if query.lower().encode("utf-8") in file.read().lower():
+                    found.append(path)
+    return found
+
+
+def test_candidates_never_miss_a_match(tmp_path):
+    generator = random.Random(13)
+    root = str(tmp_path / "root")
+    words = ["alpha", "beta", "gamma", "x+=1", "café", "==>", "delta_epsilon", "zeta"]
+    for number in range(60):
+        write(root, f"dir{number % 5}/file{number}.txt", " ".join(generator.choice(words) for _ in range(20)))
+    index = TrigramIndex(root, directory=str(tmp_path / "cache"))
+    assert index.refresh() == 60
+    for query in ["alpha", "ALPHA beta", "ta_ep", "café", "x+=", "==>", "mm", "not there", "a"]:
+        candidates = set(index.candidates(query))
+        assert set(matching(root, query)) <= candidates, query
+
+
+def test_index_follows_changes_and_persists(tmp_path):
+    root = str(tmp_path / "root")
+    cache = str(tmp_path / "cache")
+    kept = write(root, "kept.txt", "needle here")
+    changed = write(root, "changed.txt", "nothing")
+    removed = write(root, "removed.txt", "needle too")
+    index = TrigramIndex(root, directory=cache)
+    index.refresh()
+    assert sorted(index.candidates("needle")) == sorted([kept, removed])
+    with open(changed, "w") as file:
+        file.write("a needle now, longer")
+    os.remove(removed)
+    index.refresh()
+    assert sorted(index.candidates("needle")) == sorted([kept, changed])
+    # A new instance loads the saved index.
+    reloaded = TrigramIndex(root, directory=cache)
+    reloaded.refresh()
+    assert sorted(reloaded.candidates("needle")) == sorted([kept, changed])
+    assert sorted(reloaded.names) == ["changed.txt", "kept.txt"]
+
+
+def test_large_files_are_always_candidates(tmp_path):
+    root = str(tmp_path / "root")
+    large = write(root, "large.txt", "x" * 100)
+    write(root, "small.txt", "small")
+    index = TrigramIndex(root, directory=str(tmp_path / "cache"))
+    index.max_file_size = 50
+    index.refresh()
+    assert index.candidates("anything") == [large]
+
+
+def test_quick_open_prefers_name_matches(tmp_path):
+    root = str(tmp_path / "root")
+    for path in ["src/editor/main.py", "docs/maintenance.md", "src/table.py", "tests/test_main.py"]:
+        write(root, path, "")
+    index = TrigramIndex(root, directory=str(tmp_path / "cache"))
+    index.refresh()
+    assert index.quick_open("main")[0] == os.path.join("src", "editor", "main.py")
+    assert index.quick_open("tbl") == [os.path.join("src", "table.py")]
+    assert index.quick_open("qqq") == []
+    assert fuzzy_score("abc", "a/b/c") is not None and fuzzy_score("abc", "cba") is None
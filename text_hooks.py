@@ -0,0 +1,160 @@
+from idlelib.redirector import WidgetRedirector
+
+
+class UndoStack:
+    # Steps are lists of ("insert" | "delete", index, text) edits. Edits
+    # made between begin_group() and end_group() form a single step, and a
+    # typed character joins the step of the character typed right before it.
+    limit = 1000
+
+    def __init__(self):
+        self.undo_steps = []
+        self.redo_steps = []
+        self.depth = 0
+        self.group = None
+        self.typing_end = None
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.typing_end = None
+
+    def begin_group(self):
+        if not self.depth:
+            self.group = []
+        self.depth += 1
+
+    def end_group(self):
+        self.depth -= 1
+        if not self.depth:
+            if self.group:
+                self.push(self.group)
+            self.group = None
+
+    def push(self, step):
+        self.undo_steps.append(step)
+        del self.undo_steps[:-self.limit]
+        self.redo_steps.clear()
+        self.typing_end = None
+
+    def record(self, kind, index, text):
+        edit = (kind, index, text)
+        if self.depth:
+            self.group.append(edit)
+            return
+        typed = kind == "insert" and len(text) == 1 and text != "\n"
+        if typed and self.typing_end == index and self.undo_steps:
+            self.undo_steps[-1].append(edit)
+            self.redo_steps.clear()
+        else:
+            self.push([edit])
+        if typed:
+            line, column = index.split(".")
+            self.typing_end = f"{line}.{int(column) + 1}"
+
+
+class EditHooks:
+    # Intercepts the Tcl insert/delete commands of a text widget, so every
+    # edit (typing, paste, programmatic inserts) is reported to the
+    # listeners with indices resolved before the edit was applied.
+    def __init__(self, text_widget):
+        self.text_widget = text_widget
+        self.listeners = []
+        self.scroll_listeners = []
+        self.undo = UndoStack()
+        self.undo_enabled = True
+        self.replaying = False
+
+        self.redirector = WidgetRedirector(text_widget)
+        self.orig_insert = self.redirector.register("insert", self.on_insert)
+        self.orig_delete = self.redirector.register("delete", self.on_delete)
+        self.redirector.register("replace", self.on_replace)
+
+        self.yscrollcommand = str(text_widget.cget("yscrollcommand"))
+        self.scroll_command = self.forward_scroll
+        text_widget.configure(yscrollcommand=self.on_scroll)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_scroll_listener(self, callback):
+        self.scroll_listeners.append(callback)
+
+    def resolve(self, index):
+        text_widget = self.text_widget
+        if text_widget.compare(index, ">", "end-1c"):
+            return text_widget.index("end-1c")
+        return text_widget.index(index)
+
+    def editable(self):
+        return str(self.text_widget.cget("state")) != "disabled"
+
+    def on_insert(self, index, chars, *args):
+        if not self.editable():
+            return ""
+        index = self.resolve(index)
+        result = self.orig_insert(index, chars, *args)
+        text = chars + "".join(args[1::2])
+        if self.undo_enabled and not self.replaying:
+            self.undo.record("insert", index, text)
+        for listener in self.listeners:
+            listener.inserted(index, text)
+        return result
+
+    def on_delete(self, index1, index2=None):
+        if not self.editable():
+            return ""
+        start = self.resolve(index1)
+        end = self.resolve(index2 if index2 is not None else f"{start}+1c")
+        if not self.text_widget.compare(start, "<", end):
+            return ""
+        if self.undo_enabled and not self.replaying:
+            self.undo.record("delete", start, self.text_widget.get(start, end))
+        result = self.orig_delete(start, end)
+        for listener in self.listeners:
+            listener.deleted(start, end)
+        return result
+
+    def on_replace(self, index1, index2, chars, *args):
+        start = self.resolve(index1)
+        self.undo.begin_group()
+        try:
+            self.on_delete(start, index2)
+            return self.on_insert(start, chars, *args)
+        finally:
+            self.undo.end_group()
+
+    def replay(self, source, target, undo):
+        if not source:
+            return False
+        step = source.pop()
+        text_widget = self.text_widget
+        self.replaying = True
+        try:
+            for kind, index, text in (reversed(step) if undo else step):
+                if (kind == "insert") == undo:
+                    text_widget.delete(index, f"{index}+{len(text)}c")
+                else:
+                    text_widget.insert(index, text)
+                text_widget.mark_set("insert", index if undo or kind == "delete" else f"{index}+{len(text)}c")
+        finally:
+            self.replaying = False
+        target.append(step)
+        self.undo.typing_end = None
+        text_widget.see("insert")
+        return True
+
+    def undo_edit(self):
+        return self.replay(self.undo.undo_steps, self.undo.redo_steps, True)
+
+    def redo_edit(self):
+        return self.replay(self.undo.redo_steps, self.undo.undo_steps, False)
+
+    def forward_scroll(self, first, last):
+        if self.yscrollcommand:
+            self.text_widget.tk.eval(f"{self.yscrollcommand} {first} {last}")
+
+    def on_scroll(self, first, last):
+        self.scroll_command(first, last)
+        for callback in self.scroll_listeners:
+            callback()
@@ -0,0 +1,267 @@
+import hashlib
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from file_io import cache_directory
+from find_in_files import iter_files, is_binary
+
+MAGIC = b"ICTI"
+VERSION = 1
+
+INDEXED = 0
+UNINDEXED = 1
+BINARY = 2
+DELETED = 3
+
+
+# Trigrams are only taken inside runs of word or punctuation characters.
+# A run in a query is always part of a run in a matching file, so no file
+# is missed, and distinct runs are far fewer than distinct lines.
+token_pattern = re.compile(rb"\w{3,}|[^\w\s]{3,}")
+
+
+def token_trigrams(data):
+    trigrams = set()
+    for token in set(token_pattern.findall(data.lower())):
+        trigrams.update([token[i:i + 3] for i in range(len(token) - 2)])
+    return trigrams
+
+
+def file_trigrams(path, max_size):
+    with open(path, "rb") as file:
+        data = file.read(max_size + 1)
+    if is_binary(data[:8192]):
+        return BINARY, None
+    if len(data) > max_size:
+        return UNINDEXED, None
+    return INDEXED, token_trigrams(data)
+
+
+def query_trigrams(query):
+    return token_trigrams(query.encode("utf-8"))
+
+
+def fuzzy_score(query, candidate):
+    text = candidate.lower()
+    name_start = len(text) - len(os.path.basename(text))
+    score = 0
+    position = 0
+    previous = -2
+    for char in query.lower():
+        found = text.find(char, position)
+        if found == -1:
+            return None
+        score += 1
+        if found == previous + 1:
+            score += 5
+        if found == 0 or text[found - 1] in "/\\_-. ":
+            score += 3
+        if found >= name_start:
+            score += 2
+        previous = found
+        position = found + 1
+    return score - len(text) * 0.01
+
+
+class TrigramIndex:
+    # Inverted trigram index of a folder, persisted under the cache
+    # directory. Files are keyed by mtime and size; a changed file gets a new
+    # id and its old id becomes a tombstone that is dropped when the index is
+    # compacted before saving.
+    max_file_size = 16 * 1024 * 1024
+
+    def __init__(self, root, ignore=(), directory=None):
+        self.root = os.path.abspath(root)
+        self.ignore = set(ignore)
+        digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()
+        self.path = os.path.join(directory or cache_directory(), f"{digest}.idx")
+        self.files = []
+        self.by_path = {}
+        self.postings = {}
+        self.deleted = 0
+        self.loaded = False
+        self.ready = False
+        self.names = []
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+            if self.update():
+                self.save()
+            self.names = [entry[0] for entry in self.files if entry[3] != DELETED]
+            self.ready = True
+            return len(self.names)
+
+    def add(self, relative_path, stat):
+        file_id = len(self.files)
+        try:
+            state, trigrams = file_trigrams(os.path.join(self.root, relative_path), self.max_file_size)
+        except OSError:
+            state, trigrams = UNINDEXED, None
+        self.files.append([relative_path, stat.st_mtime_ns, stat.st_size, state])
+        self.by_path[relative_path] = file_id
+        if trigrams:
+            postings = self.postings
+            for trigram in trigrams:
+                posting = postings.get(trigram)
+                if posting is None:
+                    postings[trigram] = posting = array("I")
+                posting.append(file_id)
+
+    def remove(self, file_id):
+        entry = self.files[file_id]
+        del self.by_path[entry[0]]
+        entry[3] = DELETED
+        self.deleted += 1
+
+    def update(self):
+        changed = False
+        seen = set()
+        for path in iter_files(self.root, self.ignore):
+            relative_path = os.path.relpath(path, self.root)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            seen.add(relative_path)
+            file_id = self.by_path.get(relative_path)
+            if file_id is not None:
+                entry = self.files[file_id]
+                if entry[1] == stat.st_mtime_ns and entry[2] == stat.st_size:
+                    continue
+                self.remove(file_id)
+            self.add(relative_path, stat)
+            changed = True
+        for relative_path in [relative_path for relative_path in self.by_path if relative_path not in seen]:
+            self.remove(self.by_path[relative_path])
+            changed = True
+        return changed
+
+    def compact(self):
+        mapping = array("i", [-1]) * len(self.files)
+        files = []
+        for file_id, entry in enumerate(self.files):
+            if entry[3] != DELETED:
+                mapping[file_id] = len(files)
+                files.append(entry)
+        postings = {}
+        for trigram, posting in self.postings.items():
+            kept = array("I", [mapping[file_id] for file_id in posting if mapping[file_id] != -1])
+            if kept:
+                postings[trigram] = kept
+        self.files = files
+        self.by_path = {entry[0]: file_id for file_id, entry in enumerate(files)}
+        self.postings = postings
+        self.deleted = 0
+
+    def candidates(self, query):
+        # Files that may contain query; matches still have to be verified.
+        with self.lock:
+            trigrams = query_trigrams(query)
+            if trigrams:
+                postings = sorted((self.postings.get(trigram, ()) for trigram in trigrams), key=len)
+                ids = set(postings[0])
+                for posting in postings[1:]:
+                    if not ids:
+                        break
+                    ids.intersection_update(posting)
+                ids.update(file_id for file_id, entry in enumerate(self.files) if entry[3] == UNINDEXED)
+            else:
+                ids = {file_id for file_id, entry in enumerate(self.files) if entry[3] in (INDEXED, UNINDEXED)}
+            files = self.files
+            return [os.path.join(self.root, files[file_id][0]) for file_id in sorted(ids) if files[file_id][3] != DELETED]
+
+    def quick_open(self, query, limit=50):
+        if not query:
+            return self.names[:limit]
+        scored = []
+        for name in self.names:
+            score = fuzzy_score(query, name)
+            if score is not None:
+                scored.append((-score, name))
+        scored.sort()
+        return [name for score, name in scored[:limit]]
+
+    def save(self):
+        if self.deleted:
+            self.compact()
+        parts = []
+        root = self.root.encode("utf-8")
+        parts.append(struct.pack("<I", len(root)))
+        parts.append(root)
+        parts.append(struct.pack("<I", len(self.files)))
+        for relative_path, mtime, size, state in self.files:
+            name = relative_path.encode("utf-8", errors="surrogateescape")
+            parts.append(struct.pack("<BqqH", state, mtime, size, len(name)))
+            parts.append(name)
+        parts.append(struct.pack("<I", len(self.postings)))
+        for trigram, posting in self.postings.items():
+            if sys.byteorder == "big":
+                posting = array("I", posting)
+                posting.byteswap()
+            parts.append(struct.pack("<B", len(trigram)))
+            parts.append(trigram)
+            parts.append(struct.pack("<I", len(posting)))
+            parts.append(posting.tobytes())
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(struct.pack("<4sI", MAGIC, VERSION))
+            file.write(zlib.compress(b"".join(parts), 6))
+        os.replace(temp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as file:
+                magic, version = struct.unpack("<4sI", file.read(8))
+                if magic != MAGIC or version != VERSION:
+                    return False
+                data = zlib.decompress(file.read())
+        except (OSError, struct.error, zlib.error):
+            return False
+        offset = 0
+
+        def take(size):
+            nonlocal offset
+            chunk = data[offset:offset + size]
+            offset += size
+            return chunk
+
+        (length,) = struct.unpack("<I", take(4))
+        if take(length).decode("utf-8") != self.root:
+            return False
+        (count,) = struct.unpack("<I", take(4))
+        files = []
+        for _ in range(count):
+            state, mtime, size, length = struct.unpack("<BqqH", take(19))
+            files.append([take(length).decode("utf-8", errors="surrogateescape"), mtime, size, state])
+        (count,) = struct.unpack("<I", take(4))
+        postings = {}
+        for _ in range(count):
+            (length,) = struct.unpack("<B", take(1))
+            trigram = take(length)
+            (size,) = struct.unpack("<I", take(4))
+            posting = array("I")
+            posting.frombytes(take(size * 4))
+            if sys.byteorder == "big":
+                posting.byteswap()
+            postings[trigram] = posting
+        self.files = files
+        self.by_path = {entry[0]: file_id for file_id, entry in enumerate(files)}
+        self.postings = postings
+        self.deleted = 0
+        return True
+
+    def size_on_disk(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0